@@ -0,0 +1,154 @@
+import os
+import hmac
+import tempfile
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+
+import repositorio
+from models import SessionLocal
+
+# --- Agenda em iCalendar (.ics) ---
+# Exporta os compromissos no formato iCalendar (RFC 5545), para que os advogados vejam a
+# agenda no Google Agenda, Outlook ou no calendário do celular. Os compromissos são lidos em
+# lotes pela paginação por chave de repositorio.compromissos_da_janela (cada lote em uma
+# sessão curta) e escritos conforme chegam: nem a tabela inteira nem o arquivo inteiro ficam
+# em memória. Para assinar (o aplicativo de calendário busca o endereço periodicamente), rode
+# "python cli.py servir-agenda", que publica o feed com um token de acesso.
+
+# Compromissos anteriores a hoje que ainda entram no feed
+DIAS_PASSADOS = int(os.environ.get("JURIS_AGENDA_ICS_DIAS_PASSADOS", "90"))
+TAMANHO_LOTE = int(os.environ.get("JURIS_AGENDA_ICS_LOTE", "500"))
+FUSO_HORARIO = os.environ.get("JURIS_AGENDA_FUSO", "America/Sao_Paulo")
+DURACAO_PADRAO = timedelta(hours=1)
+
+# Token exigido pelo servidor do feed ('?token='); sem ele, o servidor gera um ao iniciar
+TOKEN_FEED = os.environ.get("JURIS_AGENDA_TOKEN") or None
+CAMINHO_FEED = "/agenda.ics"
+
+# Prazos vencem no fim do dia: no calendário viram eventos de dia inteiro
+TIPOS_DIA_INTEIRO = ("Prazo",)
+
+def _escapar(texto):
+    """Escapa um valor de texto do iCalendar (barra, vírgula, ponto e vírgula e quebras de linha)."""
+    texto = (texto or "").replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,")
+    return texto.replace("\r\n", "\\n").replace("\n", "\\n").replace("\r", "\\n")
+
+def _dobrar(linha):
+    """Quebra a linha em partes de até 75 bytes (RFC 5545, 3.1), sem partir caracteres UTF-8."""
+    partes, atual, tamanho = [], [], 0
+    for caractere in linha:
+        bytes_caractere = len(caractere.encode("utf-8"))
+        if tamanho + bytes_caractere > 75:
+            partes.append("".join(atual))
+            atual, tamanho = [" "], 1
+        atual.append(caractere)
+        tamanho += bytes_caractere
+    partes.append("".join(atual))
+    return "\r\n".join(partes) + "\r\n"
+
+def _evento(item, carimbo):
+    """Linhas do VEVENT de um compromisso (item de compromissos_da_janela)."""
+    titulo = f"{item.tipo}: {item.titulo}" if item.tipo else item.titulo
+    if item.concluido:
+        titulo = f"✅ {titulo}"
+    descricao = f"Processo {item.numero_processo} - {item.cliente_nome}"
+    if item.observacoes:
+        descricao += f"\n{item.observacoes}"
+
+    if item.tipo in TIPOS_DIA_INTEIRO:
+        dia = item.data_hora.date()
+        periodo = [f"DTSTART;VALUE=DATE:{dia:%Y%m%d}", f"DTEND;VALUE=DATE:{dia + timedelta(days=1):%Y%m%d}"]
+    else:
+        # Hora local "flutuante": o calendário mostra no fuso do aparelho (X-WR-TIMEZONE)
+        periodo = [f"DTSTART:{item.data_hora:%Y%m%dT%H%M%S}", f"DTEND:{item.data_hora + DURACAO_PADRAO:%Y%m%dT%H%M%S}"]
+
+    linhas = ["BEGIN:VEVENT", f"UID:audiencia-{item.id}@jurisflow", f"DTSTAMP:{carimbo}", *periodo,
+              f"SUMMARY:{_escapar(titulo)}", f"DESCRIPTION:{_escapar(descricao)}",
+              f"CATEGORIES:{_escapar(item.tipo or 'Outro')}", "END:VEVENT"]
+    return "".join(_dobrar(linha) for linha in linhas)
+
+def compromissos_em_lotes(desde, tamanho_lote=None):
+    """Gera listas de compromissos a partir de 'desde', em ordem cronológica, um lote por consulta."""
+    cursor = None
+    while True:
+        db = SessionLocal()
+        try:
+            lote, cursor = repositorio.compromissos_da_janela(
+                db, desde, apos=cursor, limite=tamanho_lote or TAMANHO_LOTE, incluir_concluidos=True
+            )
+        finally:
+            db.close()
+        if lote:
+            yield lote
+        if cursor is None:
+            return
+
+def gerar_ics(desde=None, tamanho_lote=None):
+    """
+    Gera o calendário .ics em partes (bytes UTF-8), uma por lote de compromissos. Por padrão
+    começa DIAS_PASSADOS dias antes de hoje.
+    """
+    if desde is None:
+        desde = datetime.combine(datetime.now().date() - timedelta(days=DIAS_PASSADOS), datetime.min.time())
+    carimbo = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    yield "".join(_dobrar(linha) for linha in [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//JurisFlow//Agenda Juridica//PT-BR", "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH", "X-WR-CALNAME:JurisFlow - Agenda", f"X-WR-TIMEZONE:{FUSO_HORARIO}",
+    ]).encode("utf-8")
+    for lote in compromissos_em_lotes(desde, tamanho_lote):
+        yield "".join(_evento(item, carimbo) for item in lote).encode("utf-8")
+    yield _dobrar("END:VCALENDAR").encode("utf-8")
+
+def escrever_ics(saida, desde=None):
+    """Escreve o calendário em 'saida' (arquivo, pipe ou qualquer objeto com write). Retorna o número de bytes."""
+    total = 0
+    for parte in gerar_ics(desde):
+        saida.write(parte)
+        total += len(parte)
+    return total
+
+def arquivo_ics(desde=None):
+    """Gera o .ics em um temporário anônimo e o devolve aberto no início, para o download do Streamlit."""
+    saida = tempfile.TemporaryFile()
+    try:
+        escrever_ics(saida, desde)
+    except BaseException:
+        saida.close()
+        raise
+    saida.seek(0)
+    return saida
+
+# --- Servidor do Feed ---
+
+class _ServidorFeed(BaseHTTPRequestHandler):
+    token = None
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path != CAMINHO_FEED:
+            self.send_error(404)
+            return
+        token = parse_qs(url.query).get("token", [""])[0]
+        if not hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8")):
+            self.send_error(403)
+            return
+
+        # HTTP/1.0 sem Content-Length: o corpo vai sendo enviado lote a lote até o fim da conexão
+        self.send_response(200)
+        self.send_header("Content-Type", "text/calendar; charset=utf-8")
+        self.send_header("Content-Disposition", 'inline; filename="agenda.ics"')
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        for parte in gerar_ics():
+            self.wfile.write(parte)
+
+    def log_message(self, formato, *args):
+        # O token não vai para o log de acessos
+        super().log_message("%s", (formato % args).replace(self.token, "***"))
+
+def criar_servidor(host, porta, token):
+    """Servidor HTTP (uma thread por pedido) que publica o feed em CAMINHO_FEED?token=<token>."""
+    manipulador = type("ServidorFeed", (_ServidorFeed,), {"token": token})
+    return ThreadingHTTPServer((host, porta), manipulador)
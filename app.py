@@ -1,18 +1,28 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date, timedelta
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, desc, func
 import base64
 import mimetypes
 import io
+import tempfile
 import time  # Biblioteca time para controle de delay nas mensagens
+from pathlib import Path
 
 # Importações Locais
+# pandas, holidays, prazos (NumPy) e documentos (docxtpl) são importados nas telas que os usam,
+# como em services: carregar o app não paga por telas que a sessão ainda não abriu
 import models
-from models import Cliente, Processo, Audiencia, DiarioProcessual, Financeiro, Advogado, get_db, init_db, SessionLocal
+from models import Cliente, Processo, Audiencia, DiarioProcessual, Financeiro, Advogado, get_db, init_db, SessionLocal, confirmar
 import auth
 import services
+import backup
+import extracao
+import repositorio
+import busca
+import resumo_lote
+import visualizacao
+import instrumentacao
+import agenda_ics
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -22,9 +32,42 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Inicialização do Banco de Dados e Usuário Admin
-init_db()
-auth.criar_usuario_inicial()
+@st.cache_resource(show_spinner=False)
+def inicializar():
+    """
+    Inicialização do Banco de Dados e Usuário Admin, uma única vez por processo do servidor
+    (o Streamlit reexecuta este arquivo a cada interação).
+    """
+    init_db()
+    auth.criar_usuario_inicial()
+    extracao.iniciar_worker()  # Retoma a extração de PDFs pendentes em segundo plano
+    return True
+
+inicializar()
+
+# Opções de status e tamanho de página da lista de processos
+LISTA_STATUS_PROCESSO = ["Em andamento", "Suspenso", "Sentenciado", "Arquivado"]
+PROCESSOS_POR_PAGINA = 25
+COMPROMISSOS_POR_PAGINA = 20
+OPCOES_PROCESSOS_AGENDA = 50  # Processos listados no seletor do novo compromisso
+
+# Ícones do status da extração de texto em segundo plano
+ICONES_EXTRACAO = {
+    extracao.NA_FILA: "🕒",
+    extracao.PROCESSANDO: "⚙️",
+    extracao.PRONTO: "✅",
+    extracao.FALHOU: "⚠️",
+}
+
+# Filtros do catálogo de documentos: rótulo -> prefixo do tipo MIME / coluna de ordenação
+TIPOS_DOCUMENTO = {
+    "Todos": None,
+    "PDF": "application/pdf",
+    "Imagens": "image/",
+    "Word": "application/vnd.openxmlformats-officedocument.wordprocessingml",
+    "Texto": "text/",
+}
+ORDENACAO_DOCUMENTOS = {"Nome": "nome", "Mais recentes": "enviado_em", "Maiores": "tamanho"}
 
 # --- Funções Auxiliares de Interface (UI) ---
 
@@ -38,21 +81,47 @@ def format_moeda(valor):
     """Formata valor float para moeda Real (R$)."""
     return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
 
-def render_file_preview(filepath, filename):
-    """Renderiza visualização de arquivos ou botão de download."""
+def format_tamanho(num_bytes):
+    """Formata um tamanho em bytes (ex: 1,5 MB)."""
+    if num_bytes is None:
+        return "-"
+    for unidade in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unidade}" if unidade == "B" else f"{num_bytes:.1f} {unidade}".replace(".", ",")
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB".replace(".", ",")
+
+def render_file_preview(filepath, filename, chave):
+    """
+    Renderiza a pré-visualização de um anexo (página a página para PDFs) e o botão de download.
+    Só a imagem reduzida da página escolhida vai para o navegador; o arquivo original só é
+    lido quando o usuário clica em baixar.
+    """
     try:
-        mime_type, _ = mimetypes.guess_type(filepath)
-        
-        with open(filepath, "rb") as f:
-            file_data = f.read()
+        # O tipo vem do nome original: o conteúdo fica no armazenamento sem extensão
+        mime_type, _ = mimetypes.guess_type(filename)
+        sha256 = services.sha256_do_arquivo(filepath)
 
         st.markdown(f"**Visualizando:** `{filename}`")
         
         with st.container(border=True):
             if mime_type and mime_type.startswith("image"):
-                st.image(file_data, caption=filename, use_container_width=True)
+                st.image(str(visualizacao.miniatura_imagem(filepath, sha256)), caption=filename, use_container_width=True)
+            elif mime_type == "application/pdf" and visualizacao.suporta_pdf():
+                total_paginas = visualizacao.numero_paginas(filepath)
+                pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, value=1, key=f"pagina_{chave}")
+                st.image(str(visualizacao.pagina_pdf(filepath, sha256, pagina)), use_container_width=True)
+                
+                with st.expander("🗂️ Miniaturas"):
+                    # Miniaturas das páginas vizinhas à atual, renderizadas sob demanda
+                    inicio = max(1, pagina - 4)
+                    paginas = list(range(inicio, min(total_paginas, inicio + 7) + 1))
+                    colunas = st.columns(4)
+                    for i, numero in enumerate(paginas):
+                        colunas[i % 4].image(str(visualizacao.pagina_pdf(filepath, sha256, numero, visualizacao.LARGURA_MINIATURA)), caption=f"Página {numero}")
             elif mime_type == "application/pdf":
-                base64_pdf = base64.b64encode(file_data).decode('utf-8')
+                # Sem o pypdfium2: visualizador de PDF do próprio navegador (envia o arquivo inteiro)
+                base64_pdf = base64.b64encode(Path(filepath).read_bytes()).decode('utf-8')
                 pdf_display = f'<iframe src="data:application/pdf;base64,{base64_pdf}" width="100%" height="600" type="application/pdf"></iframe>'
                 st.markdown(pdf_display, unsafe_allow_html=True)
             else:
@@ -60,10 +129,10 @@ def render_file_preview(filepath, filename):
 
         st.download_button(
             label="⬇️ Baixar Arquivo Original",
-            data=file_data,
+            data=lambda: Path(filepath).read_bytes(),  # Lido só no clique, fora do script
             file_name=filename,
             mime=mime_type,
-            key=f"dl_btn_{filename}"
+            key=f"dl_btn_{chave}"
         )
 
     except Exception as e:
@@ -71,6 +140,7 @@ def render_file_preview(filepath, filename):
 
 # --- Telas do Sistema ---
 
+@instrumentacao.cronometrado
 def show_advogados(db: Session):
     """Tela de Gestão de Advogados."""
     st.header("⚖️ Cadastro de Advogados (Banca)")
@@ -99,7 +169,7 @@ def show_advogados(db: Session):
                         endereco=endereco_profissional
                     )
                     db.add(novo_advogado)
-                    db.commit()
+                    confirmar(db)
                     
                     st.success("✅ Advogado cadastrado com sucesso!")
                     time.sleep(1.5) # Espera 1.5s para o usuário ler a mensagem
@@ -109,7 +179,7 @@ def show_advogados(db: Session):
 
     # Aba: Listar Advogados
     with tab1:
-        advogados = db.query(Advogado).all()
+        advogados = repositorio.listar_advogados(db)
         if advogados:
             for advogado in advogados:
                 with st.expander(f"🎓 {advogado.nome} - {advogado.oab}"):
@@ -120,42 +190,90 @@ def show_advogados(db: Session):
                     st.markdown("---")
                     if st.button("🗑️ Excluir Advogado", key=f"del_adv_{advogado.id}"):
                         db.delete(advogado)
-                        db.commit()
+                        confirmar(db)
                         st.success("Advogado removido.")
                         time.sleep(1)
                         st.rerun()
         else:
             st.info("Nenhum advogado cadastrado.")
 
-def show_calculadora_prazos():
-    """Tela da Calculadora de Prazos."""
+@instrumentacao.cronometrado
+def show_calculadora_prazos(db: Session):
+    """Tela da Calculadora de Prazos (prazo único ou planilha de intimações)."""
+    import holidays
+    import prazos
+
     st.header("📆 Calculadora de Prazos Processuais")
     
-    with st.container(border=True):
-        col1, col2 = st.columns(2)
-        data_publicacao = col1.date_input("Data da Publicação/Intimação", value=date.today(), format="DD/MM/YYYY")
-        dias_prazo = col2.number_input("Prazo em Dias Úteis", min_value=1, value=15)
+    # Configuração do calendário, comum às duas abas
+    col3, col4, col5 = st.columns([0.25, 0.45, 0.3])
+    lista_ufs = [""] + list(holidays.BR.subdivisions)
+    uf = col3.selectbox("UF (feriados estaduais)", lista_ufs, index=lista_ufs.index(prazos.UF_PADRAO or ""))
+    texto_municipais = col4.text_input("Feriados municipais (DD/MM, separados por vírgula)", value=prazos.FERIADOS_MUNICIPAIS_PADRAO)
+    recesso = col5.checkbox("Recesso forense (20/12 a 20/01)", value=True, help="CPC, art. 220: prazos suspensos no período")
+    
+    try:
+        feriados_municipais = prazos.ler_feriados_municipais(texto_municipais)
+    except ValueError:
+        st.error("⚠️ Feriados municipais inválidos. Use o formato DD/MM, separados por vírgula.")
+        return
+    
+    tab_unico, tab_lote = st.tabs(["Prazo Único", "Lote (Planilha de Intimações)"])
+    
+    with tab_unico:
+        with st.container(border=True):
+            col1, col2 = st.columns(2)
+            data_publicacao = col1.date_input("Data da Publicação/Intimação", value=date.today(), format="DD/MM/YYYY")
+            dias_prazo = col2.number_input("Prazo em Dias Úteis", min_value=1, value=15)
+            
+            if st.button("Calcular Vencimento"):
+                resultado = services.calcular_prazo_util(data_publicacao, dias_prazo, uf or None, feriados_municipais, recesso)
+                
+                st.markdown("---")
+                col_res1, col_res2 = st.columns(2)
+                col_res1.success(f"📅 Data Fatal: **{resultado.strftime('%d/%m/%Y')}**")
+                col_res1.caption(f"Dia da semana: {resultado.strftime('%A')}")
+                col_res2.info("⚠️ Nota: O sistema considera feriados nacionais, os da UF e os municipais informados. Confira pontos facultativos e suspensões de expediente do tribunal.")
+    
+    with tab_lote:
+        st.caption(f"Envie um CSV ou XLSX com as colunas: {', '.join(services.COLUNAS_PRAZOS_LOTE)} (e, opcionalmente, titulo). Datas no formato DD/MM/AAAA.")
+        planilha = st.file_uploader("Planilha de intimações", type=["csv", "xlsx"], key="planilha_prazos")
         
-        if st.button("Calcular Vencimento"):
-            resultado = services.calcular_prazo_util(data_publicacao, dias_prazo)
+        if planilha:
+            try:
+                df_intimacoes = services.ler_planilha_prazos(planilha)
+            except Exception as e:
+                st.error(f"⚠️ Não foi possível ler a planilha: {e}")
+                return
             
-            st.markdown("---")
-            col_res1, col_res2 = st.columns(2)
-            col_res1.success(f"📅 Data Fatal: **{resultado.strftime('%d/%m/%Y')}**")
-            col_res1.caption(f"Dia da semana: {resultado.strftime('%A')}")
-            col_res2.info("⚠️ Nota: O sistema considera feriados nacionais. Verifique feriados locais/municipais manualmente.")
+            df_prazos = services.calcular_prazos_lote(df_intimacoes, uf or None, feriados_municipais, recesso)
+            invalidas = int(df_prazos["erro"].notna().sum())
+            st.write(f"**{len(df_prazos)}** intimação(ões) calculada(s)" + (f", {invalidas} com dados inválidos." if invalidas else "."))
+            st.dataframe(df_prazos, use_container_width=True, hide_index=True)
+            
+            if st.button("📅 Lançar prazos na Agenda", key="btn_lancar_prazos"):
+                with st.spinner("Lançando prazos..."):
+                    df_lancados = services.registrar_prazos_lote(df_prazos)
+                contagem = df_lancados["situacao"].value_counts()
+                st.success(f"✅ {int(contagem.get('Lançado', 0))} prazo(s) lançado(s) na agenda.")
+                st.dataframe(df_lancados[["numero_processo", "data_publicacao", "dias_uteis", "vencimento", "titulo", "situacao"]], use_container_width=True, hide_index=True)
+                st.download_button(
+                    label="⬇️ Baixar resultado (.csv)",
+                    data=df_lancados.to_csv(index=False, sep=";").encode("utf-8-sig"),
+                    file_name="prazos_calculados.csv",
+                    mime="text/csv"
+                )
 
+@instrumentacao.cronometrado
 def show_dashboard(db: Session):
     """Tela Inicial - Dashboard."""
+    import pandas as pd
+
     st.header("📊 Dashboard Geral")
     
     col1, col2, col3, col4 = st.columns(4)
     
-    total_clientes = db.query(Cliente).count()
-    total_processos = db.query(Processo).filter(Processo.status == "Em andamento").count()
-    
-    total_receitas = db.query(func.sum(Financeiro.valor)).filter(Financeiro.tipo == "Honorário", Financeiro.status == "Pago").scalar() or 0
-    total_a_receber = db.query(func.sum(Financeiro.valor)).filter(Financeiro.tipo == "Honorário", Financeiro.status == "Pendente").scalar() or 0
+    total_clientes, total_processos, total_receitas, total_a_receber = repositorio.resumo_dashboard(db)
     
     col1.metric("Clientes Ativos", total_clientes)
     col2.metric("Processos em Andamento", total_processos)
@@ -165,18 +283,16 @@ def show_dashboard(db: Session):
     st.markdown("---")
     
     st.subheader("🔔 Próximos Compromissos")
-    proximos_eventos = db.query(Audiencia).filter(Audiencia.concluido == 0).order_by(Audiencia.data_hora).limit(5).all()
+    proximos_eventos = repositorio.proximos_compromissos(db, limite=5)
     
     if proximos_eventos:
         dados_tabela = []
-        for evento in proximos_eventos:
-            processo = db.query(Processo).get(evento.processo_id)
-            cliente_nome = processo.cliente.nome if processo and processo.cliente else "N/A"
+        for data_hora, tipo, cliente_nome, titulo in proximos_eventos:
             dados_tabela.append([
-                evento.data_hora.strftime("%d/%m/%Y %H:%M"), 
-                evento.tipo, 
+                data_hora.strftime("%d/%m/%Y %H:%M"), 
+                tipo, 
                 cliente_nome, 
-                evento.titulo
+                titulo
             ])
             
         df_eventos = pd.DataFrame(dados_tabela, columns=["Data", "Tipo", "Cliente", "Título"])
@@ -184,20 +300,20 @@ def show_dashboard(db: Session):
     else:
         st.info("Nenhum compromisso pendente.")
 
+@instrumentacao.cronometrado
 def show_clientes(db: Session):
     """Tela de Gestão de Clientes."""
+    import documentos
+
     st.header("📁 Gestão de Clientes")
-    tab1, tab2 = st.tabs(["Listar/Buscar", "Novo Cliente"])
+    tab1, tab2, tab3 = st.tabs(["Listar/Buscar", "Novo Cliente", "Documentos em Lote"])
+    lista_advogados = repositorio.listar_advogados(db)
+    modelos = documentos.listar_modelos()
     
     # Aba: Listar Clientes
     with tab1:
-        termo_busca = st.text_input("Buscar por Nome ou CPF/CNPJ", "")
-        query = db.query(Cliente)
-        if termo_busca:
-            query = query.filter(or_(Cliente.nome.ilike(f"%{termo_busca}%"), Cliente.cpf_cnpj.ilike(f"%{termo_busca}%")))
-        
-        lista_clientes = query.all()
-        lista_advogados = db.query(Advogado).all()
+        termo_busca = st.text_input("Buscar por Nome ou CPF/CNPJ", key="busca_clientes")
+        lista_clientes = repositorio.listar_clientes(db, termo_busca)
         
         if lista_clientes:
             for cliente in lista_clientes:
@@ -228,31 +344,36 @@ def show_clientes(db: Session):
                                 list(opcoes_advogados.keys()), 
                                 key=f"sel_adv_cli_{cliente.id}"
                             )
+                            # Só pergunta o modelo quando há mais de um em 'templates'
+                            if len(modelos) > 1:
+                                modelo = st.selectbox("Modelo", list(modelos), format_func=documentos.titulo_modelo, key=f"sel_mod_cli_{cliente.id}")
+                            else:
+                                modelo = next(iter(modelos), "procuracao")
                         
                         with col_doc_btn:
-                            if st.button("Gerar Procuração (Word)", key=f"btn_doc_{cliente.id}"):
+                            if st.button("Gerar Documento (Word)", key=f"btn_doc_{cliente.id}"):
                                 id_advogado = opcoes_advogados[advogado_selecionado_label]
-                                objeto_advogado = db.query(Advogado).get(id_advogado)
+                                objeto_advogado = db.get(Advogado, id_advogado)
                                 
-                                arquivo_docx = services.gerar_procuracao(cliente, objeto_advogado)
+                                arquivo_docx = services.gerar_documento(modelo, cliente, objeto_advogado)
                                 
                                 if arquivo_docx:
                                     st.download_button(
                                         label="⬇️ Baixar DOCX",
                                         data=arquivo_docx,
-                                        file_name=f"Procuracao_{cliente.nome}.docx",
+                                        file_name=f"{services.sanitize_filename(documentos.titulo_modelo(modelo))}_{cliente.nome}.docx",
                                         mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
                                         key=f"dl_doc_{cliente.id}"
                                     )
                                 else:
-                                    st.error("⚠️ Template 'template_procuracao.docx' não encontrado na pasta 'templates'.")
+                                    st.error(f"⚠️ Modelo '{modelo}' não encontrado na pasta 'templates'.")
                     
                     st.markdown("---")
                     
                     # Botão de Excluir
                     if st.button("🗑️ Excluir Cliente", key=f"del_cli_{cliente.id}"):
                         db.delete(cliente)
-                        db.commit()
+                        confirmar(db)
                         st.success("Cliente excluído com sucesso!")
                         time.sleep(1)
                         st.rerun()
@@ -283,7 +404,7 @@ def show_clientes(db: Session):
                         observacoes=observacoes
                     )
                     db.add(novo_cliente)
-                    db.commit()
+                    confirmar(db)
                     
                     # Cria pastas
                     services.criar_estrutura_cliente(nome, novo_cliente.id)
@@ -294,14 +415,317 @@ def show_clientes(db: Session):
                 else:
                     st.error("Nome e CPF são obrigatórios.")
 
+    # Aba: Documentos em Lote (ex.: procurações de uma ação coletiva)
+    with tab3:
+        if not modelos:
+            st.warning("⚠️ Nenhum modelo .docx encontrado na pasta 'templates'.")
+        elif not lista_advogados:
+            st.warning("⚠️ Cadastre um advogado na aba 'Advogados' para habilitar a geração de documentos.")
+        else:
+            st.caption("Gera o mesmo documento para vários clientes de uma vez, em um único arquivo .zip.")
+            col_mod, col_adv = st.columns(2)
+            modelo_lote = col_mod.selectbox("Modelo", list(modelos), format_func=documentos.titulo_modelo, key="lote_doc_modelo")
+            opcoes_advogados = {adv.id: f"{adv.nome} ({adv.oab})" for adv in lista_advogados}
+            advogado_lote = col_adv.selectbox("Advogado Responsável", list(opcoes_advogados), format_func=opcoes_advogados.get, key="lote_doc_advogado")
+
+            opcoes = {c.id: f"{c.nome} - {c.cpf_cnpj}" for c in repositorio.opcoes_clientes(db)}
+            if st.checkbox(f"Todos os clientes ({len(opcoes)})", key="lote_doc_todos"):
+                selecionados = list(opcoes)
+            else:
+                selecionados = st.multiselect("Clientes", list(opcoes), format_func=opcoes.get, key="lote_doc_clientes")
+
+            if selecionados:
+                st.download_button(
+                    label=f"⬇️ Gerar e Baixar {len(selecionados)} documento(s) (.zip)",
+                    data=lambda: gerar_zip_documentos(modelo_lote, selecionados, advogado_lote),
+                    file_name=f"{services.sanitize_filename(documentos.titulo_modelo(modelo_lote))}_lote.zip",
+                    mime="application/zip",
+                    key="lote_doc_baixar"
+                )
+
+def gerar_zip_documentos(modelo, cliente_ids, advogado_id):
+    """Gera o .zip do lote de documentos no clique do download (fora da execução da página)."""
+    db = SessionLocal()
+    try:
+        clientes = repositorio.clientes_por_ids(db, cliente_ids)
+        advogado = db.get(Advogado, advogado_id)
+        saida = tempfile.TemporaryFile()
+        services.gerar_documentos_lote(modelo, clientes, advogado, saida)
+    finally:
+        db.close()
+    saida.seek(0)
+    return saida
+
+def render_detalhes_processo(db: Session, processo):
+    """Renderiza os dados e as seções (arquivos, agenda, financeiro, diário) de um único processo."""
+    # Visualização rápida dos dados
+    col_info1, col_info2, col_info3 = st.columns(3)
+    col_info1.write(f"**Ação:** {processo.tipo_acao}")
+    col_info1.write(f"**Tribunal:** {processo.tribunal}")
+    col_info2.write(f"**Contra:** {processo.parte_contraria}")
+    col_info2.write(f"**Início:** {format_date_br(processo.data_inicio)}")
+    col_info3.info(f"Status: {processo.status}")
+    
+    # --- DADOS ADICIONAIS RESTAURADOS ---
+    if processo.observacoes:
+        st.markdown(f"**📝 Observações:** {processo.observacoes}")
+
+    # --- ESTRATÉGIA COM TOGGLE DE PRIVACIDADE RESTAURADA ---
+    if processo.estrategia:
+        mostrar_estrategia = st.toggle("👁️ Ver Estratégia (Confidencial)", key=f"toggle_est_{processo.id}")
+        if mostrar_estrategia:
+            st.warning(f"**🧠 Estratégia:** {processo.estrategia}")
+    
+    st.markdown("---")
+    
+    # Seções internas do Processo
+    # Usamos um seletor em vez de st.tabs: as abas do Streamlit executam todas as
+    # consultas mesmo ocultas, enquanto aqui só a seção escolhida é carregada.
+    secao = st.radio(
+        "Seção",
+        ["📂 Arquivos (IA)", "📅 Agenda/Prazos", "💰 Financeiro", "📝 Diário", "⚙️ Editar/Detalhes"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key=f"secao_proc_{processo.id}"
+    )
+    
+    # --- ABA 1: ARQUIVOS & IA ---
+    if secao == "📂 Arquivos (IA)":
+        st.subheader("Gestão de Documentos")
+        
+        arquivos_upload = st.file_uploader("Anexar documentos", key=f"upload_{processo.id}", accept_multiple_files=True)
+        if arquivos_upload:
+            erros_upload = []
+            for arquivo in arquivos_upload:
+                try:
+                    services.salvar_arquivo(arquivo, processo.cliente.nome, processo.cliente.id, processo.numero_processo)
+                except ValueError as e:
+                    erros_upload.append(str(e))
+            if erros_upload:
+                for erro in erros_upload:
+                    st.error(f"⚠️ {erro}")
+            else:
+                st.success("Arquivos salvos!")
+                time.sleep(1)
+                st.rerun()
+        
+        st.markdown("---")
+        
+        # Catálogo de documentos: listagem, filtro e ordenação vêm de uma consulta indexada
+        col_tipo, col_ordem = st.columns(2)
+        tipo_doc = col_tipo.selectbox("Tipo", list(TIPOS_DOCUMENTO.keys()), key=f"filtro_tipo_doc_{processo.id}")
+        ordem_doc = col_ordem.selectbox("Ordenar por", list(ORDENACAO_DOCUMENTOS.keys()), key=f"ordem_doc_{processo.id}")
+        documentos = repositorio.documentos_do_processo(
+            db, services.get_processo_dir(processo.cliente.nome, processo.cliente.id, processo.numero_processo),
+            tipo=TIPOS_DOCUMENTO[tipo_doc], ordenar_por=ORDENACAO_DOCUMENTOS[ordem_doc]
+        )
+        lista_arquivos = [doc.nome for doc in documentos]
+        status_arquivos = services.status_extracao(processo.cliente.nome, processo.cliente.id, processo.numero_processo)
+        
+        if any(status in (extracao.NA_FILA, extracao.PROCESSANDO) for status, _ in status_arquivos.values()):
+            if st.button("🔄 Atualizar status da extração", key=f"btn_refresh_extr_{processo.id}"):
+                st.rerun()
+
+        # Resumo de todos os PDFs de uma vez: cada resultado aparece assim que fica pronto
+        if any(nome.lower().endswith(".pdf") for nome in lista_arquivos):
+            if st.button("✨ Resumir todos os PDFs", key=f"btn_ia_todos_{processo.id}", help="Resume em paralelo os PDFs que ainda não têm resumo"):
+                pdfs = resumo_lote.pdfs_do_processo(processo.cliente.nome, processo.cliente.id, processo.numero_processo)
+                barra = st.progress(0.0, text=f"Resumindo {len(pdfs)} PDF(s)...")
+                with st.status("Resumos", expanded=True) as painel:
+                    contagem = {resumo_lote.EM_CACHE: 0, resumo_lote.GERADO: 0, resumo_lote.ERRO: 0}
+                    for i, resultado in enumerate(resumo_lote.resumir_em_lote(pdfs, st.session_state.get("google_key")), start=1):
+                        contagem[resultado["situacao"]] += 1
+                        st.session_state[f"resumo_{processo.id}_{resultado['arquivo']}"] = resultado["resumo"]
+                        icone = "❌" if resultado["situacao"] == resumo_lote.ERRO else "✅"
+                        st.write(f"{icone} {resultado['arquivo']} — {resultado['situacao']} ({resultado['segundos']:.1f}s)")
+                        barra.progress(i / len(pdfs), text=f"{i}/{len(pdfs)} PDF(s) concluídos")
+                    painel.update(
+                        label=f"Resumos: {contagem[resumo_lote.GERADO]} gerado(s), {contagem[resumo_lote.EM_CACHE]} em cache, {contagem[resumo_lote.ERRO]} com erro",
+                        state="error" if contagem[resumo_lote.ERRO] else "complete",
+                        expanded=False
+                    )
+
+        if documentos:
+            for nome_arquivo, tamanho_arquivo, _, enviado_em in documentos:
+                col_nome, col_acoes = st.columns([0.6, 0.4])
+                
+                col_nome.text(f"📄 {nome_arquivo}")
+                col_nome.caption(f"{format_tamanho(tamanho_arquivo)} · enviado em {enviado_em.strftime('%d/%m/%Y %H:%M') if enviado_em else '-'}")
+                status_extr, erro_extr = status_arquivos.get(nome_arquivo, (None, None))
+                if status_extr:
+                    col_nome.caption(f"{ICONES_EXTRACAO[status_extr]} Texto: {status_extr}" + (f" ({erro_extr})" if erro_extr else ""))
+                
+                with col_acoes:
+                    col_btn_ia, col_btn_ver, col_btn_del = st.columns(3)
+                    
+                    # Botão IA (Apenas para PDF)
+                    if nome_arquivo.lower().endswith(".pdf"):
+                        if col_btn_ia.button("✨ IA", key=f"btn_ia_{processo.id}_{nome_arquivo}", help="Resumir com Gemma 3"):
+                            caminho_completo = services.get_caminho_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
+                            # Resumo já gerado antes (mesmo conteúdo, modelo e prompt): não chama a API
+                            resumo_ia = services.resumo_em_cache(caminho_completo)
+                            
+                            if resumo_ia is None and status_extr in (extracao.NA_FILA, extracao.PROCESSANDO) and services.obter_texto_extraido(caminho_completo) is None:
+                                resumo_ia = "⏳ O texto deste PDF ainda está sendo extraído. Tente novamente em instantes."
+                            elif resumo_ia is None:
+                                with st.spinner("Lendo PDF e gerando resumo..."):
+                                    # Pega chave da sessão
+                                    api_key = st.session_state.get("google_key")
+                                    resumo_ia = services.resumir_documento(caminho_completo, api_key)
+                            
+                            st.session_state[f"resumo_{processo.id}_{nome_arquivo}"] = resumo_ia
+                    
+                    # Botão Visualizar
+                    # Abre/fecha a pré-visualização (fica aberta enquanto o usuário navega pelas páginas)
+                    chave_visualizacao = f"ver_{processo.id}_{nome_arquivo}"
+                    if col_btn_ver.button("👁️", key=f"btn_ver_{processo.id}_{nome_arquivo}"):
+                        st.session_state[chave_visualizacao] = not st.session_state.get(chave_visualizacao, False)
+                    
+                    # Botão Excluir
+                    if col_btn_del.button("❌", key=f"btn_del_{processo.id}_{nome_arquivo}"):
+                        services.excluir_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
+                        st.rerun()
+
+                if st.session_state.get(chave_visualizacao):
+                    caminho_completo = services.get_caminho_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
+                    render_file_preview(caminho_completo, nome_arquivo, chave_visualizacao)
+
+                # Exibe o resumo da IA se existir na sessão
+                if f"resumo_{processo.id}_{nome_arquivo}" in st.session_state:
+                    st.info(st.session_state[f"resumo_{processo.id}_{nome_arquivo}"])
+                    if st.button("🔁 Regenerar resumo", key=f"btn_regen_{processo.id}_{nome_arquivo}", help="Ignora o resumo guardado e chama a IA novamente"):
+                        with st.spinner("Gerando novo resumo..."):
+                            caminho_completo = services.get_caminho_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
+                            st.session_state[f"resumo_{processo.id}_{nome_arquivo}"] = services.resumir_documento(
+                                caminho_completo, st.session_state.get("google_key"), regenerar=True
+                            )
+                        st.rerun()
+        else:
+            st.caption("Nenhum arquivo anexado a este processo." if tipo_doc == "Todos" else "Nenhum arquivo deste tipo.")
+
+    # --- ABA 2: AGENDA (NOVA) ---
+    elif secao == "📅 Agenda/Prazos":
+        st.subheader(f"Prazos e Audiências: {processo.numero_processo}")
+        
+        # Filtra eventos apenas deste processo
+        eventos_processo = repositorio.compromissos_do_processo(db, processo.id)
+        
+        if eventos_processo:
+            for evento in eventos_processo:
+                with st.container(border=True):
+                    col_evt1, col_evt2, col_evt3 = st.columns([0.2, 0.6, 0.2])
+                    
+                    col_evt1.write(f"📅 **{evento.data_hora.strftime('%d/%m/%Y')}**")
+                    col_evt1.caption(f"{evento.data_hora.strftime('%H:%M')}")
+                    
+                    col_evt2.write(f"**{evento.titulo}**")
+                    col_evt2.caption(f"Tipo: {evento.tipo}")
+                    
+                    status_icon = "✅ Concluído" if evento.concluido else "⏳ Pendente"
+                    if col_evt3.button(status_icon, key=f"btn_status_evt_proc_{evento.id}"):
+                        evento.concluido = 1 if evento.concluido == 0 else 0
+                        confirmar(db)
+                        st.rerun()
+        else:
+            st.info("Não há compromissos agendados para este processo.")
+            st.caption("Vá até a aba 'Agenda' no menu lateral para adicionar novos eventos.")
+
+    # --- ABA 3: FINANCEIRO ---
+    elif secao == "💰 Financeiro":
+        st.subheader("Controle Financeiro")
+        
+        with st.form(key=f"form_fin_{processo.id}"):
+            col_f1, col_f2, col_f3 = st.columns(3)
+            desc_fin = col_f1.text_input("Descrição (Ex: Honorários)")
+            valor_fin = col_f2.number_input("Valor (R$)", min_value=0.0, step=100.0)
+            tipo_fin = col_f3.selectbox("Tipo", ["Honorário", "Despesa/Custa"])
+            
+            if st.form_submit_button("Adicionar Lançamento"):
+                novo_fin = Financeiro(
+                    processo_id=processo.id, 
+                    descricao=desc_fin, 
+                    valor=valor_fin, 
+                    tipo=tipo_fin
+                )
+                db.add(novo_fin)
+                confirmar(db)
+                st.success("Lançamento adicionado!")
+                time.sleep(1)
+                st.rerun()
+        
+        lancamentos = repositorio.lancamentos_do_processo(db, processo.id)
+        if lancamentos:
+            for lanc in lancamentos:
+                col_l1, col_l2, col_l3 = st.columns([0.6, 0.2, 0.2])
+                col_l1.write(f"**{lanc.descricao}** ({lanc.tipo})")
+                col_l2.write(format_moeda(lanc.valor))
+                
+                # Botão de Status (Pago/Pendente)
+                status_icon = "✅ Pago" if lanc.status == "Pago" else "⏳ Pendente"
+                if col_l3.button(status_icon, key=f"btn_status_{lanc.id}"):
+                    lanc.status = "Pendente" if lanc.status == "Pago" else "Pago"
+                    confirmar(db)
+                    st.rerun()
+        else:
+            st.caption("Nenhum lançamento financeiro registrado.")
+
+    # --- ABA 4: DIÁRIO ---
+    elif secao == "📝 Diário":
+        st.subheader("Notas do Processo")
+        
+        nota_texto = st.text_input("Nova nota ou andamento", key=f"input_nota_{processo.id}")
+        if st.button("Adicionar Nota", key=f"btn_add_nota_{processo.id}"):
+            if nota_texto:
+                db.add(DiarioProcessual(processo_id=processo.id, texto=nota_texto))
+                confirmar(db)
+                st.rerun()
+        
+        st.markdown("---")
+        notas = repositorio.notas_do_processo(db, processo.id)
+        
+        for nota in notas:
+            st.text(f"{nota.data_registro.strftime('%d/%m/%Y %H:%M')} - {nota.texto}")
+
+    # --- ABA 5: EDITAR ---
+    elif secao == "⚙️ Editar/Detalhes":
+        st.subheader("Editar Dados do Processo")
+        with st.form(key=f"form_editar_proc_{processo.id}"):
+            
+            ed_tribunal = st.text_input("Tribunal", value=processo.tribunal)
+            ed_parte = st.text_input("Parte Contrária", value=processo.parte_contraria)
+            
+            # Logica para achar o index correto do selectbox
+            idx_status = LISTA_STATUS_PROCESSO.index(processo.status) if processo.status in LISTA_STATUS_PROCESSO else 0
+            novo_status = st.selectbox("Status", LISTA_STATUS_PROCESSO, index=idx_status)
+            
+            st.markdown("---")
+            st.markdown("**Anotações Privadas**")
+            ed_obs = st.text_area("Observações", value=processo.observacoes)
+            ed_estrategia = st.text_area("Estratégia", value=processo.estrategia)
+            
+            if st.form_submit_button("Atualizar Processo"):
+                processo.tribunal = ed_tribunal
+                processo.parte_contraria = ed_parte
+                processo.status = novo_status
+                processo.observacoes = ed_obs
+                processo.estrategia = ed_estrategia
+                
+                confirmar(db)
+                st.success("Status atualizado!")
+                time.sleep(1)
+                st.rerun()
+
+@instrumentacao.cronometrado
 def show_processos(db: Session):
     """Tela de Gestão de Processos."""
+    import pandas as pd
+
     st.header("⚖️ Controle de Processos")
     
     tab1, tab2 = st.tabs(["Meus Processos", "Novo Processo"])
     
     # Verifica se existem clientes cadastrados
-    lista_clientes = db.query(Cliente).all()
+    lista_clientes = repositorio.opcoes_clientes(db)
     if not lista_clientes:
         st.warning("⚠️ Você precisa cadastrar clientes antes de criar processos.")
         return
@@ -320,7 +744,7 @@ def show_processos(db: Session):
             
             col_proc3, col_proc4 = st.columns(2)
             tipo_acao = col_proc3.selectbox("Tipo de Ação", ["Cível", "Trabalhista", "Criminal", "Família", "Tributário", "Previdenciário", "Outros"])
-            status = col_proc4.selectbox("Status", ["Em andamento", "Suspenso", "Sentenciado", "Arquivado"])
+            status = col_proc4.selectbox("Status", LISTA_STATUS_PROCESSO)
             
             parte_contraria = st.text_input("Parte Contrária")
             data_inicio = st.date_input("Data de Início", value=date.today(), format="DD/MM/YYYY")
@@ -345,11 +769,11 @@ def show_processos(db: Session):
                         estrategia=estrategia
                     )
                     db.add(novo_processo)
-                    db.commit()
+                    confirmar(db)
                     
                     # Cria pastas
-                    objeto_cliente = db.query(Cliente).get(id_cliente)
-                    services.criar_estrutura_processo(objeto_cliente.nome, id_cliente, numero_processo)
+                    nome_cliente = next(c.nome for c in lista_clientes if c.id == id_cliente)
+                    services.criar_estrutura_processo(nome_cliente, id_cliente, numero_processo)
                     
                     st.success("✅ Processo criado com sucesso!")
                     time.sleep(1.5)
@@ -359,205 +783,90 @@ def show_processos(db: Session):
 
     # Aba: Lista de Processos
     with tab1:
-        processos = db.query(Processo).join(Cliente).all()
-        if processos:
-            for processo in processos:
-                with st.expander(f"{processo.numero_processo} - {processo.cliente.nome} ({processo.status})"):
-                    
-                    # Visualização rápida dos dados
-                    col_info1, col_info2, col_info3 = st.columns(3)
-                    col_info1.write(f"**Ação:** {processo.tipo_acao}")
-                    col_info1.write(f"**Tribunal:** {processo.tribunal}")
-                    col_info2.write(f"**Contra:** {processo.parte_contraria}")
-                    col_info2.write(f"**Início:** {format_date_br(processo.data_inicio)}")
-                    col_info3.info(f"Status: {processo.status}")
-                    
-                    # --- DADOS ADICIONAIS RESTAURADOS ---
-                    if processo.observacoes:
-                        st.markdown(f"**📝 Observações:** {processo.observacoes}")
-
-                    # --- ESTRATÉGIA COM TOGGLE DE PRIVACIDADE RESTAURADA ---
-                    if processo.estrategia:
-                        mostrar_estrategia = st.toggle("👁️ Ver Estratégia (Confidencial)", key=f"toggle_est_{processo.id}")
-                        if mostrar_estrategia:
-                            st.warning(f"**🧠 Estratégia:** {processo.estrategia}")
-                    
-                    st.markdown("---")
-                    
-                    # Abas internas do Processo
-                    tab_arquivos, tab_agenda, tab_financeiro, tab_diario, tab_editar = st.tabs(
-                        ["📂 Arquivos (IA)", "📅 Agenda/Prazos", "💰 Financeiro", "📝 Diário", "⚙️ Editar/Detalhes"]
-                    )
-                    
-                    # --- ABA 1: ARQUIVOS & IA ---
-                    with tab_arquivos:
-                        st.subheader("Gestão de Documentos")
-                        
-                        arquivos_upload = st.file_uploader("Anexar documentos", key=f"upload_{processo.id}", accept_multiple_files=True)
-                        if arquivos_upload:
-                            for arquivo in arquivos_upload:
-                                services.salvar_arquivo(arquivo, processo.cliente.nome, processo.cliente.id, processo.numero_processo)
-                            st.success("Arquivos salvos!")
-                            time.sleep(1)
-                            st.rerun()
-                        
-                        st.markdown("---")
-                        
-                        lista_arquivos = services.listar_arquivos(processo.cliente.nome, processo.cliente.id, processo.numero_processo)
-                        
-                        if lista_arquivos:
-                            for nome_arquivo in lista_arquivos:
-                                col_nome, col_acoes = st.columns([0.6, 0.4])
-                                
-                                col_nome.text(f"📄 {nome_arquivo}")
-                                
-                                with col_acoes:
-                                    col_btn_ia, col_btn_ver, col_btn_del = st.columns(3)
-                                    
-                                    # Botão IA (Apenas para PDF)
-                                    if nome_arquivo.lower().endswith(".pdf"):
-                                        if col_btn_ia.button("✨ IA", key=f"btn_ia_{processo.id}_{nome_arquivo}", help="Resumir com Gemma 3"):
-                                            with st.spinner("Lendo PDF e gerando resumo..."):
-                                                caminho_completo = services.get_caminho_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
-                                                texto_pdf = services.extrair_texto_pdf(caminho_completo)
-                                                
-                                                # Pega chave da sessão
-                                                api_key = st.session_state.get("google_key")
-                                                resumo_ia = services.resumir_com_google(texto_pdf, api_key)
-                                                
-                                                st.session_state[f"resumo_{processo.id}_{nome_arquivo}"] = resumo_ia
-                                    
-                                    # Botão Visualizar
-                                    if col_btn_ver.button("👁️", key=f"btn_ver_{processo.id}_{nome_arquivo}"):
-                                        caminho_completo = services.get_caminho_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
-                                        render_file_preview(caminho_completo, nome_arquivo)
-                                    
-                                    # Botão Excluir
-                                    if col_btn_del.button("❌", key=f"btn_del_{processo.id}_{nome_arquivo}"):
-                                        services.excluir_arquivo(processo.cliente.nome, processo.cliente.id, processo.numero_processo, nome_arquivo)
-                                        st.rerun()
-
-                                # Exibe o resumo da IA se existir na sessão
-                                if f"resumo_{processo.id}_{nome_arquivo}" in st.session_state:
-                                    st.info(st.session_state[f"resumo_{processo.id}_{nome_arquivo}"])
-                        else:
-                            st.caption("Nenhum arquivo anexado a este processo.")
-
-                    # --- ABA 2: AGENDA (NOVA) ---
-                    with tab_agenda:
-                        st.subheader(f"Prazos e Audiências: {processo.numero_processo}")
-                        
-                        # Filtra eventos apenas deste processo
-                        eventos_processo = db.query(Audiencia).filter(Audiencia.processo_id == processo.id).order_by(Audiencia.data_hora).all()
-                        
-                        if eventos_processo:
-                            for evento in eventos_processo:
-                                with st.container(border=True):
-                                    col_evt1, col_evt2, col_evt3 = st.columns([0.2, 0.6, 0.2])
-                                    
-                                    col_evt1.write(f"📅 **{evento.data_hora.strftime('%d/%m/%Y')}**")
-                                    col_evt1.caption(f"{evento.data_hora.strftime('%H:%M')}")
-                                    
-                                    col_evt2.write(f"**{evento.titulo}**")
-                                    col_evt2.caption(f"Tipo: {evento.tipo}")
-                                    
-                                    status_icon = "✅ Concluído" if evento.concluido else "⏳ Pendente"
-                                    if col_evt3.button(status_icon, key=f"btn_status_evt_proc_{evento.id}"):
-                                        evento.concluido = 1 if evento.concluido == 0 else 0
-                                        db.commit()
-                                        st.rerun()
-                        else:
-                            st.info("Não há compromissos agendados para este processo.")
-                            st.caption("Vá até a aba 'Agenda' no menu lateral para adicionar novos eventos.")
-
-                    # --- ABA 3: FINANCEIRO ---
-                    with tab_financeiro:
-                        st.subheader("Controle Financeiro")
-                        
-                        with st.form(key=f"form_fin_{processo.id}"):
-                            col_f1, col_f2, col_f3 = st.columns(3)
-                            desc_fin = col_f1.text_input("Descrição (Ex: Honorários)")
-                            valor_fin = col_f2.number_input("Valor (R$)", min_value=0.0, step=100.0)
-                            tipo_fin = col_f3.selectbox("Tipo", ["Honorário", "Despesa/Custa"])
-                            
-                            if st.form_submit_button("Adicionar Lançamento"):
-                                novo_fin = Financeiro(
-                                    processo_id=processo.id, 
-                                    descricao=desc_fin, 
-                                    valor=valor_fin, 
-                                    tipo=tipo_fin
-                                )
-                                db.add(novo_fin)
-                                db.commit()
-                                st.success("Lançamento adicionado!")
-                                time.sleep(1)
-                                st.rerun()
-                        
-                        lancamentos = db.query(Financeiro).filter(Financeiro.processo_id == processo.id).all()
-                        if lancamentos:
-                            for lanc in lancamentos:
-                                col_l1, col_l2, col_l3 = st.columns([0.6, 0.2, 0.2])
-                                col_l1.write(f"**{lanc.descricao}** ({lanc.tipo})")
-                                col_l2.write(format_moeda(lanc.valor))
-                                
-                                # Botão de Status (Pago/Pendente)
-                                status_icon = "✅ Pago" if lanc.status == "Pago" else "⏳ Pendente"
-                                if col_l3.button(status_icon, key=f"btn_status_{lanc.id}"):
-                                    lanc.status = "Pendente" if lanc.status == "Pago" else "Pago"
-                                    db.commit()
-                                    st.rerun()
-                        else:
-                            st.caption("Nenhum lançamento financeiro registrado.")
-
-                    # --- ABA 4: DIÁRIO ---
-                    with tab_diario:
-                        st.subheader("Notas do Processo")
-                        
-                        nota_texto = st.text_input("Nova nota ou andamento", key=f"input_nota_{processo.id}")
-                        if st.button("Adicionar Nota", key=f"btn_add_nota_{processo.id}"):
-                            if nota_texto:
-                                db.add(DiarioProcessual(processo_id=processo.id, texto=nota_texto))
-                                db.commit()
-                                st.rerun()
-                        
-                        st.markdown("---")
-                        notas = db.query(DiarioProcessual).filter(DiarioProcessual.processo_id == processo.id).order_by(desc(DiarioProcessual.data_registro)).all()
-                        
-                        for nota in notas:
-                            st.text(f"{nota.data_registro.strftime('%d/%m/%Y %H:%M')} - {nota.texto}")
+        # Filtros aplicados direto no SQL
+        col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+        filtro_numero = col_f1.text_input("Número", key="filtro_numero_proc")
+        filtro_status = col_f2.selectbox("Status", ["Todos"] + LISTA_STATUS_PROCESSO, key="filtro_status_proc")
+        filtro_tribunal = col_f3.text_input("Tribunal", key="filtro_tribunal_proc")
+        filtro_cliente = col_f4.text_input("Cliente (Nome ou CPF/CNPJ)", key="filtro_cliente_proc")
 
-                    # --- ABA 5: EDITAR ---
-                    with tab_editar:
-                        st.subheader("Editar Dados do Processo")
-                        with st.form(key=f"form_editar_proc_{processo.id}"):
-                            
-                            ed_tribunal = st.text_input("Tribunal", value=processo.tribunal)
-                            ed_parte = st.text_input("Parte Contrária", value=processo.parte_contraria)
-                            
-                            # Logica para achar o index correto do selectbox
-                            lista_status_edit = ["Em andamento", "Suspenso", "Sentenciado", "Arquivado"]
-                            idx_status = lista_status_edit.index(processo.status) if processo.status in lista_status_edit else 0
-                            novo_status = st.selectbox("Status", lista_status_edit, index=idx_status)
-                            
-                            st.markdown("---")
-                            st.markdown("**Anotações Privadas**")
-                            ed_obs = st.text_area("Observações", value=processo.observacoes)
-                            ed_estrategia = st.text_area("Estratégia", value=processo.estrategia)
-                            
-                            if st.form_submit_button("Atualizar Processo"):
-                                processo.tribunal = ed_tribunal
-                                processo.parte_contraria = ed_parte
-                                processo.status = novo_status
-                                processo.observacoes = ed_obs
-                                processo.estrategia = ed_estrategia
-                                
-                                db.commit()
-                                st.success("Status atualizado!")
-                                time.sleep(1)
-                                st.rerun()
+        # Paginação: apenas uma página de processos é carregada por rerun
+        pagina = st.session_state.get("pagina_processos", 1)
+        total_processos, processos = repositorio.listar_processos(
+            db,
+            status=None if filtro_status == "Todos" else filtro_status,
+            tribunal=filtro_tribunal,
+            cliente=filtro_cliente,
+            numero=filtro_numero,
+            pagina=pagina,
+            por_pagina=PROCESSOS_POR_PAGINA
+        )
+        total_paginas = max(1, -(-total_processos // PROCESSOS_POR_PAGINA))
+        if pagina > total_paginas:
+            # Os filtros reduziram o resultado: volta para a última página válida
+            st.session_state["pagina_processos"] = total_paginas
+            st.rerun()
+
+        if total_processos:
+            col_pag, col_total = st.columns([0.3, 0.7])
+            col_pag.number_input("Página", min_value=1, max_value=total_paginas, key="pagina_processos")
+            col_total.caption(f"{total_processos} processo(s) encontrado(s) — página {pagina} de {total_paginas}")
+
+            df_processos = pd.DataFrame(
+                [[p.numero_processo, p.cliente.nome, p.tribunal, p.status, format_date_br(p.data_inicio)] for p in processos],
+                columns=["Número", "Cliente", "Tribunal", "Status", "Início"]
+            )
+            st.dataframe(df_processos, use_container_width=True, hide_index=True)
+
+            # Detalhes carregados sob demanda, somente para o processo escolhido
+            mapa_processos = {p.id: p for p in processos}
+            processo_id = st.selectbox(
+                "Abrir processo",
+                [None] + list(mapa_processos.keys()),
+                format_func=lambda pid: "Selecione..." if pid is None else f"{mapa_processos[pid].numero_processo} - {mapa_processos[pid].cliente.nome} ({mapa_processos[pid].status})",
+                key="processo_selecionado"
+            )
+
+            if processo_id is not None:
+                st.markdown("---")
+                processo = mapa_processos[processo_id]
+                st.subheader(f"{processo.numero_processo} - {processo.cliente.nome}")
+                render_detalhes_processo(db, processo)
         else:
-            st.info("Nenhum processo cadastrado.")
+            st.info("Nenhum processo encontrado.")
+
+def janela_agenda(periodo, referencia):
+    """Retorna (início, fim) da semana (segunda a domingo) ou do mês que contém a data de referência."""
+    if periodo == "Semana":
+        inicio = referencia - timedelta(days=referencia.weekday())
+        fim = inicio + timedelta(days=7)
+    else:
+        inicio = referencia.replace(day=1)
+        fim = (inicio + timedelta(days=32)).replace(day=1)
+    return datetime.combine(inicio, datetime.min.time()), datetime.combine(fim, datetime.min.time())
 
+def render_compromisso(db: Session, evento):
+    """Cartão de um compromisso (item de repositorio.compromissos_da_janela) com o botão de conclusão."""
+    with st.container(border=True):
+        col_evt1, col_evt2, col_evt3 = st.columns([0.2, 0.6, 0.2])
+        
+        col_evt1.write(f"📅 **{evento.data_hora.strftime('%d/%m/%Y')}**")
+        col_evt1.caption(f"{evento.data_hora.strftime('%H:%M')}")
+        
+        col_evt2.write(f"**{evento.titulo}**")
+        
+        # Mostra o Tipo visualmente
+        col_evt2.caption(f"Tipo: {evento.tipo} | Proc: {evento.numero_processo} | {evento.cliente_nome}")
+        
+        status_icon = "✅ Concluído" if evento.concluido else "⏳ Pendente"
+        if col_evt3.button(status_icon, key=f"btn_status_evt_{evento.id}"):
+            db.query(Audiencia).filter(Audiencia.id == evento.id).update(
+                {Audiencia.concluido: 1 - Audiencia.concluido}, synchronize_session=False
+            )
+            confirmar(db)
+            st.rerun()
+
+@instrumentacao.cronometrado
 def show_agenda(db: Session):
     """Tela da Agenda Jurídica."""
     st.header("📅 Agenda Jurídica")
@@ -567,11 +876,13 @@ def show_agenda(db: Session):
     # Coluna Esquerda: Novo Agendamento
     with col_novo:
         st.subheader("Novo Compromisso")
-        lista_processos = db.query(Processo).all()
+        # O seletor mostra só os processos encontrados pela busca (ou os mais recentes)
+        termo_processo = st.text_input("Buscar processo", key="agenda_busca_processo", placeholder="Número ou cliente")
+        lista_processos = repositorio.opcoes_processos(db, termo_processo, limite=OPCOES_PROCESSOS_AGENDA)
         
         if lista_processos:
             # Opções mostrando Número do Processo - Nome do Cliente
-            opcoes_processos = {f"{p.numero_processo} - {p.cliente.nome}": p.id for p in lista_processos}
+            opcoes_processos = {f"{numero} - {cliente_nome}": id_proc for id_proc, numero, cliente_nome in lista_processos}
             
             with st.form("form_agenda"):
                 proc_selecionado = st.selectbox("Vincular ao Processo", list(opcoes_processos.keys()))
@@ -594,63 +905,201 @@ def show_agenda(db: Session):
                         data_hora=data_hora_final
                     )
                     db.add(novo_evento)
-                    db.commit()
+                    confirmar(db)
                     st.success("Compromisso agendado!")
                     time.sleep(1)
                     st.rerun()
+        elif termo_processo:
+            st.info("Nenhum processo encontrado para a busca.")
         else:
             st.warning("Cadastre processos para usar a agenda.")
     
-    # Coluna Direita: Lista de Compromissos
+    # Coluna Direita: Compromissos da semana ou do mês
     with col_lista:
-        st.subheader("Próximos Eventos")
-        # Filtra eventos não concluídos
-        eventos = db.query(Audiencia).filter(Audiencia.concluido == 0).order_by(Audiencia.data_hora).all()
+        st.subheader("Compromissos")
+        col_per, col_ref, col_concl = st.columns([0.3, 0.35, 0.35])
+        periodo = col_per.radio("Período", ["Semana", "Mês"], horizontal=True, key="agenda_periodo")
+        referencia = col_ref.date_input("Referência", value=date.today(), format="DD/MM/YYYY", key="agenda_referencia")
+        incluir_concluidos = col_concl.checkbox("Mostrar concluídos", key="agenda_concluidos")
+        inicio, fim = janela_agenda(periodo, referencia)
+
+        # Paginação por chave: a pilha guarda o cursor de início de cada página já visitada
+        filtros = (periodo, referencia, incluir_concluidos)
+        if st.session_state.get("agenda_filtros") != filtros:
+            st.session_state["agenda_filtros"] = filtros
+            st.session_state["agenda_cursores"] = [None]
+        cursores = st.session_state["agenda_cursores"]
+        eventos, proximo_cursor = repositorio.compromissos_da_janela(
+            db, inicio, fim, apos=cursores[-1], limite=COMPROMISSOS_POR_PAGINA, incluir_concluidos=incluir_concluidos
+        )
+        st.caption(f"{inicio:%d/%m/%Y} a {fim - timedelta(days=1):%d/%m/%Y} — página {len(cursores)}")
+
+        # Pendentes anteriores à janela (e a hoje) não somem da tela: prazos vencidos ficam em destaque
+        limite_atraso = min(inicio, datetime.combine(date.today(), datetime.min.time()))
+        total_atrasados = repositorio.contar_atrasados(db, limite_atraso)
+        if total_atrasados:
+            with st.expander(f"⚠️ {total_atrasados} compromisso(s) pendente(s) em atraso", expanded=True):
+                atrasados, _ = repositorio.compromissos_da_janela(db, datetime.min, limite_atraso, limite=COMPROMISSOS_POR_PAGINA)
+                if total_atrasados > len(atrasados):
+                    st.caption(f"Mostrando os {len(atrasados)} mais antigos.")
+                for evento in atrasados:
+                    render_compromisso(db, evento)
         
         if eventos:
             for evento in eventos:
-                with st.container(border=True):
-                    col_evt1, col_evt2, col_evt3 = st.columns([0.2, 0.6, 0.2])
-                    
-                    col_evt1.write(f"📅 **{evento.data_hora.strftime('%d/%m/%Y')}**")
-                    col_evt1.caption(f"{evento.data_hora.strftime('%H:%M')}")
-                    
-                    col_evt2.write(f"**{evento.titulo}**")
-                    
-                    # Mostra o Tipo visualmente
-                    proc_relacionado = db.query(Processo).get(evento.processo_id)
-                    numero_proc = proc_relacionado.numero_processo if proc_relacionado else "N/A"
-                    col_evt2.caption(f"Tipo: {evento.tipo} | Proc: {numero_proc}")
-                    
-                    status_icon = "✅ Concluído" if evento.concluido else "⏳ Pendente"
-                    if col_evt3.button(status_icon, key=f"btn_status_evt_{evento.id}"):
-                        evento.concluido = 1 if evento.concluido == 0 else 0
-                        db.commit()
-                        st.rerun()
-        else:
-            st.info("Agenda vazia! 🎉")
+                render_compromisso(db, evento)
+        elif len(cursores) == 1:
+            st.info("Agenda vazia neste período! 🎉")
 
+        col_ant, col_prox = st.columns(2)
+        col_ant.button("◀ Anteriores", disabled=len(cursores) == 1, on_click=cursores.pop, key="agenda_anteriores")
+        col_prox.button("Próximos ▶", disabled=proximo_cursor is None, on_click=cursores.append, args=(proximo_cursor,), key="agenda_proximos")
+
+        with st.expander("📆 Exportar para o calendário (.ics)"):
+            st.download_button(
+                label="⬇️ Baixar Agenda (.ics)",
+                data=lambda: agenda_ics.arquivo_ics(),  # Gerado só no clique, em lotes
+                file_name="agenda_jurisflow.ics",
+                mime="text/calendar"
+            )
+            st.caption(
+                f"Inclui os compromissos a partir de {agenda_ics.DIAS_PASSADOS} dias atrás, concluídos ou não. "
+                "Para assinar a agenda no Google Agenda, Outlook ou celular (atualização automática), "
+                "publique o feed com `python cli.py servir-agenda` e adicione o endereço exibido como calendário por URL."
+            )
+
+def abrir_resultado_busca(resultado):
+    """Callback dos resultados da busca global: navega até o cliente ou processo encontrado."""
+    if resultado["processo_id"] is not None:
+        st.session_state["menu_principal"] = "Processos"
+        st.session_state["filtro_numero_proc"] = resultado["numero_processo"]
+        st.session_state["filtro_status_proc"] = "Todos"
+        st.session_state["filtro_tribunal_proc"] = ""
+        st.session_state["filtro_cliente_proc"] = ""
+        st.session_state["pagina_processos"] = 1
+        st.session_state["processo_selecionado"] = resultado["processo_id"]
+    else:
+        st.session_state["menu_principal"] = "Clientes"
+        st.session_state["busca_clientes"] = resultado["cpf_cnpj"]
+    st.session_state["busca_global"] = ""
+
+@instrumentacao.cronometrado
+def show_busca(db: Session, termo):
+    """Tela de resultados da Busca Global (clientes, processos e diário)."""
+    st.header("🔎 Resultados da Busca")
+
+    resultados = busca.buscar(db, termo, limite=30)
+    if not resultados:
+        st.info(f"Nenhum resultado para \"{termo}\".")
+        return
+
+    st.caption(f"{len(resultados)} resultado(s) mais relevantes para \"{termo}\".")
+    for i, resultado in enumerate(resultados):
+        with st.container(border=True):
+            col_res, col_btn = st.columns([0.8, 0.2])
+            col_res.markdown(f"**{resultado['tipo']}** · {resultado['titulo']}")
+            col_res.markdown(resultado["trecho"])
+            col_btn.button("Abrir ➜", key=f"btn_busca_{i}", on_click=abrir_resultado_busca, args=(resultado,))
+
+@instrumentacao.cronometrado
 def show_relatorios(db: Session):
-    """Tela de Backups."""
+    """Tela de Backups (snapshots incrementais)."""
+    import pandas as pd
+
     st.header("💾 Backup e Segurança")
-    
-    st.info("Gera um arquivo .zip contendo o banco de dados e todos os documentos anexados.")
-    
-    if st.button("Gerar Backup Completo"):
-        with st.spinner("Compactando arquivos..."):
-            caminho_zip = services.criar_backup()
-            
-            with open(caminho_zip, "rb") as arquivo_zip:
-                st.download_button(
-                    label="⬇️ Baixar Backup (.zip)",
-                    data=arquivo_zip,
-                    file_name="backup_jurisflow.zip",
-                    mime="application/zip"
-                )
 
-# --- Função Principal ---
+    st.info(
+        "Cada backup guarda o banco de dados e todos os documentos anexados, mas só copia o que mudou "
+        "desde o anterior. Qualquer backup da lista pode ser baixado como um .zip completo."
+    )
+
+    if st.button("Gerar Backup"):
+        with st.spinner("Copiando arquivos novos e alterados..."):
+            manifesto = services.criar_backup()
+        st.success(
+            f"Backup criado: {len(manifesto['adicionados'])} arquivo(s) novo(s) ou alterado(s), "
+            f"{format_tamanho(manifesto['bytes_novos'])} copiados."
+        )
+
+    snapshots = backup.resumo_snapshots()
+    if not snapshots:
+        st.caption("Nenhum backup gerado ainda.")
+        return
+
+    st.subheader("Backups Disponíveis")
+    st.caption(
+        f"Retenção: os {backup.RETER_ULTIMOS} backups mais recentes e o último de cada um dos últimos {backup.RETER_DIARIOS} dias, "
+        f"{backup.RETER_SEMANAIS} semanas e {backup.RETER_MENSAIS} meses."
+    )
+    st.dataframe(
+        pd.DataFrame([{
+            "Data": s["criado_em"].strftime("%d/%m/%Y %H:%M:%S"),
+            "Arquivos": s["arquivos"],
+            "Tamanho Total": format_tamanho(s["tamanho_total"]),
+            "Novos/Alterados": len(s["adicionados"]),
+            "Removidos": len(s["removidos"]),
+            "Copiado": format_tamanho(s["bytes_novos"]),
+        } for s in snapshots]),
+        hide_index=True,
+        use_container_width=True
+    )
+
+    por_nome = {s["nome"]: s for s in snapshots}
+    nome = st.selectbox(
+        "Detalhes do backup",
+        list(por_nome),
+        format_func=lambda n: por_nome[n]["criado_em"].strftime("%d/%m/%Y %H:%M:%S")
+    )
+    selecionado = por_nome[nome]
+    with st.expander(f"Adicionados neste backup ({len(selecionado['adicionados'])})"):
+        st.text("\n".join(selecionado["adicionados"]) or "Nenhum arquivo novo ou alterado.")
+    if selecionado["removidos"]:
+        with st.expander(f"Removidos desde o backup anterior ({len(selecionado['removidos'])})"):
+            st.text("\n".join(selecionado["removidos"]))
+
+    st.download_button(
+        label="⬇️ Baixar Backup (.zip)",
+        data=lambda: backup.arquivo_zip(nome),
+        file_name=f"backup_jurisflow_{nome[:15]}.zip",
+        mime="application/zip"
+    )
+
+# --- Painel de Desempenho ---
+
+def mostrar_painel_desempenho():
+    """Resumo da execução atual na barra lateral: tempo total, consultas SQL e telas/funções mais lentas."""
+    import pandas as pd
+
+    medicao = instrumentacao.atual()
+    if medicao is None:
+        return
+    with st.sidebar.expander("⏱️ Desempenho"):
+        st.caption(
+            f"Execução: {medicao.decorrido() * 1000:.0f} ms · "
+            f"{medicao.total_consultas} consulta(s) SQL em {medicao.tempo_consultas * 1000:.0f} ms"
+        )
+        lentos = medicao.mais_lentos()
+        if lentos:
+            st.dataframe(
+                pd.DataFrame([{"Tela/Função": nome, "Chamadas": chamadas, "Tempo (ms)": round(segundos * 1000, 1)}
+                              for nome, chamadas, segundos in lentos]),
+                hide_index=True,
+                use_container_width=True
+            )
+        # A mesma consulta repetida muitas vezes numa execução costuma ser um padrão N+1
+        for sql, vezes, segundos in medicao.repetidas():
+            st.warning(f"Consulta repetida {vezes}x ({segundos * 1000:.0f} ms): `{sql[:200]}`")
 
+# --- Função Principal ---
 def main():
+    # Mede a execução inteira (consultas e tempos) para o painel de desempenho e o log
+    instrumentacao.iniciar(st.session_state.get("menu_principal", ""))
+    try:
+        executar_app()
+    finally:
+        instrumentacao.finalizar()
+
+def executar_app():
     # 1. Autenticação (Login)
     if not auth.login_page():
         return
@@ -694,11 +1143,17 @@ def main():
             
     # -----------------------------------
 
-    # Menu de Navegação
+    # Busca Global (FTS5)
+    termo_busca_global = st.sidebar.text_input("🔎 Busca Global", key="busca_global", placeholder="Cliente, processo ou anotação")
+
+    # Menu de Navegação (backups só para administradores)
+    opcoes_menu = ["Dashboard", "Clientes", "Advogados", "Processos", "Agenda", "Calculadora Prazos"]
+    if auth.eh_admin():
+        opcoes_menu.append("Relatórios")
     menu_selecionado = st.sidebar.radio(
         "Menu Principal", 
-        ["Dashboard", "Clientes", "Advogados", "Processos", "Agenda", "Calculadora Prazos", "Relatórios"],
-        index=0
+        opcoes_menu,
+        key="menu_principal"
     )
     
     st.sidebar.markdown("---")
@@ -708,7 +1163,9 @@ def main():
     # 3. Roteamento de Telas
     db = SessionLocal()
     try:
-        if menu_selecionado == "Dashboard":
+        if termo_busca_global:
+            show_busca(db, termo_busca_global)
+        elif menu_selecionado == "Dashboard":
             show_dashboard(db)
         elif menu_selecionado == "Clientes":
             show_clientes(db)
@@ -719,7 +1176,7 @@ def main():
         elif menu_selecionado == "Agenda":
             show_agenda(db)
         elif menu_selecionado == "Calculadora Prazos":
-            show_calculadora_prazos()
+            show_calculadora_prazos(db)
         elif menu_selecionado == "Relatórios":
             show_relatorios(db)
     except Exception as e:
@@ -727,5 +1184,8 @@ def main():
     finally:
         db.close()
 
+    if auth.eh_admin():
+        mostrar_painel_desempenho()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
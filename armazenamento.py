@@ -0,0 +1,273 @@
+import os
+import shutil
+import time
+import hashlib
+import mimetypes
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from models import SessionLocal, executar_escrita, Documento, TextoExtraido, ResumoIA, TarefaExtracao
+
+# --- Armazenamento de Anexos por Conteúdo ---
+# Cada conteúdo é gravado uma única vez em dados/blobs/<2 primeiros caracteres do hash>/<sha256>.
+# A tabela 'documentos' guarda as referências: (pasta do processo, nome do arquivo) -> sha256.
+# O mesmo documento anexado a vários processos ocupa o disco uma vez só; o blob (e os caches
+# de texto e resumo do conteúdo) são apagados quando a última referência é removida.
+# Criações e remoções de blobs acontecem dentro do caminho único de escrita (executar_escrita),
+# então um upload e uma exclusão simultâneos do mesmo conteúdo não se atropelam. Os arquivos de
+# um conteúdo só são apagados depois que a transação que removeu sua última referência foi
+# confirmada: se ela falhar, o banco volta atrás e o arquivo continua lá.
+
+BASE_DIR = Path("dados")
+BLOBS_DIR = BASE_DIR / "blobs"
+TEMP_DIR = BLOBS_DIR / "tmp"
+PREVIEWS_DIR = BASE_DIR / "previews"  # Páginas renderizadas (ver visualizacao.py)
+
+def caminho_blob(sha256):
+    """Retorna o caminho (Path) do blob de um conteúdo."""
+    return BLOBS_DIR / sha256[:2] / sha256
+
+def caminho_previews(sha256):
+    """Retorna a pasta (Path) das pré-visualizações de um conteúdo."""
+    return PREVIEWS_DIR / sha256[:2] / sha256
+
+def eh_blob(filepath):
+    """Indica se o caminho é um blob do armazenamento (o nome do arquivo é o próprio hash)."""
+    path = Path(filepath)
+    return path.parent.parent == BLOBS_DIR and path.parent.name == path.name[:2] and len(path.name) == 64
+
+def gravar_temporario(origem, limite_bytes=0, tamanho_bloco=1024 * 1024, nome=None):
+    """
+    Copia 'origem' (objeto com read) em blocos para um temporário, calculando o SHA-256.
+    Retorna (caminho do temporário, sha256, tamanho). Lança ValueError acima de limite_bytes.
+    """
+    h = hashlib.sha256()
+    tamanho = 0
+    if hasattr(origem, "seek"):
+        origem.seek(0)
+
+    # O temporário fica no mesmo disco dos blobs para que o os.replace seja atômico
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=TEMP_DIR, suffix=".parcial")
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            for bloco in iter(lambda: origem.read(tamanho_bloco), b""):
+                tamanho += len(bloco)
+                if limite_bytes and tamanho > limite_bytes:
+                    raise ValueError(f"O arquivo '{nome or getattr(origem, 'name', '')}' excede o limite de {limite_bytes // (1024 * 1024)} MB.")
+                h.update(bloco)
+                f.write(bloco)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+    return Path(temporario), h.hexdigest(), tamanho
+
+def _publicar(temporario, sha256):
+    """Move o temporário para o blob; se o conteúdo já existe, só descarta o temporário."""
+    destino = caminho_blob(sha256)
+    if destino.exists():
+        Path(temporario).unlink(missing_ok=True)
+        return
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(temporario, destino)
+
+def _remover_orfaos(db, hashes):
+    """
+    Apaga os caches no banco (texto e resumo) dos conteúdos que ficaram sem nenhuma referência
+    e retorna esses hashes. Os arquivos ficam para _apagar_conteudos, após a confirmação.
+    """
+    db.flush()
+    orfaos = []
+    for sha256 in set(filter(None, hashes)):
+        if db.query(Documento.id).filter(Documento.sha256 == sha256).first() is None:
+            db.query(TextoExtraido).filter(TextoExtraido.sha256 == sha256).delete()
+            db.query(ResumoIA).filter(ResumoIA.sha256 == sha256).delete()
+            orfaos.append(sha256)
+    return orfaos
+
+def _apagar_conteudos(hashes, corrompidos=()):
+    """
+    Apaga blob e pré-visualizações dos conteúdos que continuam sem referência (os corrompidos,
+    sempre). Só é chamada depois de a remoção das referências ter sido confirmada; roda no
+    caminho único de escrita para que um upload do mesmo conteúdo não a intercale.
+    """
+    hashes = set(filter(None, hashes)) - set(corrompidos)
+    if not hashes and not corrompidos:
+        return
+
+    def apagar(db):
+        referenciados = {sha256 for (sha256,) in db.query(Documento.sha256).filter(Documento.sha256.in_(hashes)).distinct()}
+        for sha256 in (hashes - referenciados) | set(corrompidos):
+            caminho_blob(sha256).unlink(missing_ok=True)
+            shutil.rmtree(caminho_previews(sha256), ignore_errors=True)
+
+    executar_escrita(apagar)
+
+def adicionar_referencia(pasta, nome, temporario, sha256, tamanho, mime=None, enviado_em=None):
+    """
+    Publica o conteúdo (se ainda não existir) e aponta (pasta, nome) para ele. Um reenvio
+    com outro conteúdo substitui a referência e libera o conteúdo anterior, se órfão.
+    """
+    pasta = Path(pasta).as_posix()
+
+    def gravar(db):
+        _publicar(temporario, sha256)
+        doc = db.query(Documento).filter(Documento.pasta == pasta, Documento.nome == nome).first()
+        hash_anterior = doc.sha256 if doc else None
+        if doc is None:
+            doc = Documento(pasta=pasta, nome=nome)
+            db.add(doc)
+        doc.sha256 = sha256
+        doc.tamanho = tamanho
+        doc.modificado_em = None
+        doc.mime = mime or mimetypes.guess_type(nome)[0]
+        doc.enviado_em = enviado_em or datetime.now()
+        if hash_anterior != sha256:
+            return _remover_orfaos(db, [hash_anterior])
+        return []
+
+    try:
+        orfaos = executar_escrita(gravar)
+    finally:
+        Path(temporario).unlink(missing_ok=True)
+    _apagar_conteudos(orfaos)
+
+def remover_referencia(pasta, nome):
+    """Remove a referência (pasta, nome); retorna False se ela não existia."""
+    pasta = Path(pasta).as_posix()
+
+    def remover(db):
+        doc = db.query(Documento).filter(Documento.pasta == pasta, Documento.nome == nome).first()
+        if doc is None:
+            return None
+        db.delete(doc)
+        return _remover_orfaos(db, [doc.sha256])
+
+    orfaos = executar_escrita(remover)
+    if orfaos is None:
+        return False
+    _apagar_conteudos(orfaos)
+    return True
+
+def listar(pasta):
+    """Retorna os nomes dos arquivos referenciados na pasta, em ordem alfabética."""
+    db = SessionLocal()
+    try:
+        return [nome for (nome,) in db.query(Documento.nome).filter(Documento.pasta == Path(pasta).as_posix()).order_by(Documento.nome)]
+    finally:
+        db.close()
+
+def resolver(pasta, nome):
+    """Retorna o caminho do blob referenciado por (pasta, nome), ou None."""
+    db = SessionLocal()
+    try:
+        sha256 = db.query(Documento.sha256).filter(Documento.pasta == Path(pasta).as_posix(), Documento.nome == nome).scalar()
+    finally:
+        db.close()
+    return caminho_blob(sha256) if sha256 else None
+
+def coletar_orfaos():
+    """Apaga os blobs sem referência e temporários esquecidos; retorna quantos arquivos removeu."""
+    if not BLOBS_DIR.exists():
+        return 0
+
+    def coletar(db):
+        referenciados = {sha256 for (sha256,) in db.query(Documento.sha256).distinct()}
+        removidos = 0
+        for blob in BLOBS_DIR.glob("*/*"):
+            # Temporários recentes podem ser uploads ainda em andamento
+            temporario_esquecido = blob.parent == TEMP_DIR and blob.stat().st_mtime < time.time() - 3600
+            if temporario_esquecido or (eh_blob(blob) and blob.name not in referenciados):
+                blob.unlink(missing_ok=True)
+                removidos += 1
+        return removidos
+
+    return executar_escrita(coletar)
+
+# --- Importação dos Anexos Antigos ---
+
+def arquivos_legados():
+    """Arquivos gravados diretamente nas pastas dos processos (antes do armazenamento por conteúdo)."""
+    return sorted(p for p in BASE_DIR.glob("clientes/*/processos/*/arquivos_anexados/*") if p.is_file())
+
+def importar_legado():
+    """
+    Move os anexos antigos para o armazenamento por conteúdo, criando suas referências.
+    Cópias idênticas passam a ocupar um único blob. Retorna quantos arquivos importou.
+    """
+    importados = 0
+    for path in arquivos_legados():
+        if path.name.startswith("."):
+            # Temporário de um upload interrompido
+            path.unlink(missing_ok=True)
+            continue
+        with open(path, "rb") as f:
+            temporario, sha256, tamanho = gravar_temporario(f)
+        adicionar_referencia(path.parent, path.name, temporario, sha256, tamanho, enviado_em=datetime.fromtimestamp(path.stat().st_mtime))
+        path.unlink()
+        importados += 1
+    return importados
+
+# --- Reconciliação do Catálogo com o Disco ---
+
+def reconciliar(verificar_hash=False):
+    """
+    Compara o catálogo (tabela documentos) com o disco e corrige as divergências:
+    importa anexos gravados fora do sistema, remove referências cujo conteúdo sumiu,
+    corrige tamanhos e apaga conteúdos sem referência. Com verificar_hash=True, relê cada
+    blob e remove as referências de conteúdos corrompidos. Retorna um relatório (dict).
+    """
+    relatorio = {"importados": importar_legado(), "referencias_quebradas": [], "tamanhos_corrigidos": 0, "corrompidos": []}
+
+    db = SessionLocal()
+    try:
+        documentos = db.query(Documento.id, Documento.pasta, Documento.nome, Documento.sha256, Documento.tamanho).all()
+    finally:
+        db.close()
+
+    quebrados, tamanhos = [], {}
+    verificados = {}
+    for doc_id, pasta, nome, sha256, tamanho in documentos:
+        blob = caminho_blob(sha256)
+        if not blob.exists():
+            quebrados.append(doc_id)
+            relatorio["referencias_quebradas"].append(f"{pasta}/{nome}")
+            continue
+        if verificar_hash:
+            if sha256 not in verificados:
+                verificados[sha256] = _sha256_do_blob(blob) == sha256
+            if not verificados[sha256]:
+                quebrados.append(doc_id)
+                relatorio["corrompidos"].append(f"{pasta}/{nome}")
+                continue
+        tamanho_real = blob.stat().st_size
+        if tamanho != tamanho_real:
+            tamanhos[doc_id] = tamanho_real
+
+    def corrigir(db):
+        hashes = []
+        for doc in db.query(Documento).filter(Documento.id.in_(quebrados)):
+            hashes.append(doc.sha256)
+            db.query(TarefaExtracao).filter(TarefaExtracao.pasta == doc.pasta, TarefaExtracao.nome == doc.nome).delete()
+            db.delete(doc)
+        for doc in db.query(Documento).filter(Documento.id.in_(list(tamanhos))):
+            doc.tamanho = tamanhos[doc.id]
+        return _remover_orfaos(db, hashes)
+
+    if quebrados or tamanhos:
+        orfaos = executar_escrita(corrigir)
+        # Conteúdo corrompido não pode ser reaproveitado por um novo upload do mesmo hash
+        _apagar_conteudos(orfaos, corrompidos=[sha256 for sha256, integro in verificados.items() if not integro])
+    relatorio["tamanhos_corrigidos"] = len(tamanhos)
+    relatorio["blobs_orfaos_removidos"] = coletar_orfaos()
+    return relatorio
+
+def _sha256_do_blob(blob, tamanho_bloco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(blob, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
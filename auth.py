@@ -1,36 +1,188 @@
+import os
+import hmac
+import time
+import base64
+import hashlib
+import secrets
+import threading
+
 import bcrypt
 import streamlit as st
-from models import SessionLocal, Usuario, init_db
+from models import SessionLocal, Usuario, init_db, executar_escrita, PAPEL_ADMIN as ADMIN, PAPEL_USUARIO as USUARIO
+
+# --- Configuração da Autenticação ---
+# A verificação do bcrypt (proposital e caro) é limitada a THREADS_LOGIN ao mesmo tempo, então
+# vários logins simultâneos não ocupam todos os núcleos do servidor. Ela roda na própria thread
+# da sessão, não em um pool: a tela de login precisa da resposta para continuar, então mandar o
+# trabalho para outra thread só acrescentaria a espera. Depois do login, a sessão é guardada em
+# um token assinado (HMAC) e com validade, no parâmetro '?sessao=' da URL: recarregar a página
+# restaura a sessão sem bcrypt, com uma única leitura indexada no banco (usuário pelo nome) para
+# conferir a versão de sessão (Usuario.versao_sessao) que o token leva; sair, trocar a senha ou
+# o papel incrementa a versão e invalida os tokens já emitidos.
+
+# Custo do bcrypt (2^custo iterações). Hashes com outro custo são refeitos no próximo login.
+CUSTO_BCRYPT = int(os.environ.get("JURIS_BCRYPT_CUSTO", "12"))
+THREADS_LOGIN = int(os.environ.get("JURIS_LOGIN_THREADS", "2"))
+
+# Validade do token de sessão; sem JURIS_SESSAO_SEGREDO, a chave muda a cada reinício do
+# servidor (as sessões abertas precisam entrar de novo)
+VALIDADE_SESSAO_HORAS = float(os.environ.get("JURIS_SESSAO_HORAS", "12"))
+SEGREDO_SESSAO = (os.environ.get("JURIS_SESSAO_SEGREDO") or secrets.token_hex(32)).encode("utf-8")
+PARAMETRO_SESSAO = "sessao"
+
+_vagas_login = threading.BoundedSemaphore(THREADS_LOGIN)
+_hash_ficticio = None
 
-def hash_password(password):
+def hash_password(password, custo=None):
     """Gera um hash seguro da senha usando bcrypt."""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(custo or CUSTO_BCRYPT)).decode('utf-8')
 
 def verify_password(password, hashed):
     """Verifica se a senha fornecida corresponde ao hash salvo."""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def custo_do_hash(hashed):
+    """Custo com que o hash bcrypt foi gerado ("$2b$12$..." -> 12)."""
+    return int(hashed.split("$")[2])
+
 def criar_usuario_inicial():
     """Cria um usuário 'admin' padrão se o banco de dados estiver vazio."""
+    def criar_admin(db):
+        user = db.query(Usuario).first()
+        if not user:
+            # Senha padrão: admin123
+            hashed_password = hash_password("admin123") 
+            novo_user = Usuario(username="admin", password_hash=hashed_password, papel=ADMIN)
+            db.add(novo_user)
+
+    executar_escrita(criar_admin)
+
+def _verificar_credenciais(username, password):
+    """Confere a senha e, se o custo mudou, grava o hash refeito."""
+    global _hash_ficticio
     db = SessionLocal()
-    user = db.query(Usuario).first()
-    if not user:
-        # Senha padrão: admin123
-        hashed_password = hash_password("admin123") 
-        novo_user = Usuario(username="admin", password_hash=hashed_password)
-        db.add(novo_user)
-        db.commit()
-    db.close()
+    try:
+        user = db.query(Usuario.id, Usuario.password_hash, Usuario.papel, Usuario.versao_sessao).filter(Usuario.username == username).first()
+    finally:
+        db.close()
+
+    if user is None:
+        # Mesmo tempo de resposta para usuário inexistente: não revela quais usuários existem
+        _hash_ficticio = _hash_ficticio or hash_password(secrets.token_hex(8))
+        verify_password(password, _hash_ficticio)
+        return None
+    if not verify_password(password, user.password_hash):
+        return None
+
+    if custo_do_hash(user.password_hash) != CUSTO_BCRYPT:
+        novo_hash = hash_password(password)
+
+        def atualizar(db):
+            db.query(Usuario).filter(Usuario.id == user.id).update({Usuario.password_hash: novo_hash})
+
+        executar_escrita(atualizar)
+    return {"username": username, "papel": user.papel, "versao": user.versao_sessao}
 
 def check_login(username, password):
-    """Verifica as credenciais no banco de dados."""
+    """
+    Verifica as credenciais no banco de dados. Retorna {'username', 'papel', 'versao'} ou None.
+    O bcrypt roda na thread da sessão (que espera a resposta de qualquer forma), sem pool;
+    o semáforo só limita quantas verificações rodam ao mesmo tempo no servidor.
+    """
+    with _vagas_login:
+        return _verificar_credenciais(username, password)
+
+def definir_senha(username, password, papel=None):
+    """Cria o usuário ou troca sua senha (e, se informado, o papel), encerrando as sessões abertas."""
+    hashed_password = hash_password(password)
+
+    def gravar(db):
+        user = db.query(Usuario).filter(Usuario.username == username).first()
+        if user is None:
+            user = Usuario(username=username, papel=papel or USUARIO, versao_sessao=0)
+            db.add(user)
+        else:
+            if papel:
+                user.papel = papel
+            user.versao_sessao += 1
+        user.password_hash = hashed_password
+
+    executar_escrita(gravar)
+
+def encerrar_sessoes(username):
+    """Invalida todos os tokens de sessão já emitidos para o usuário."""
+    def incrementar(db):
+        db.query(Usuario).filter(Usuario.username == username).update({Usuario.versao_sessao: Usuario.versao_sessao + 1})
+
+    executar_escrita(incrementar)
+
+def _versao_atual(username):
+    """Retorna (papel, versão de sessão) do usuário no banco, ou None se ele não existe mais."""
     db = SessionLocal()
-    user = db.query(Usuario).filter(Usuario.username == username).first()
-    db.close()
-    
-    if user and verify_password(password, user.password_hash):
-        return True
-    return False
+    try:
+        return db.query(Usuario.papel, Usuario.versao_sessao).filter(Usuario.username == username).first()
+    finally:
+        db.close()
+
+# --- Tokens de Sessão ---
+
+def _b64(dados):
+    return base64.urlsafe_b64encode(dados).rstrip(b"=").decode("ascii")
+
+def _assinatura(carga):
+    return _b64(hmac.new(SEGREDO_SESSAO, carga.encode("ascii"), hashlib.sha256).digest())
+
+def emitir_token(username, papel, versao, validade_horas=None):
+    """Token "<dados>.<assinatura>" com usuário, papel, versão de sessão e instante de expiração."""
+    expira = int(time.time() + 3600 * (validade_horas or VALIDADE_SESSAO_HORAS))
+    carga = _b64(f"{expira}|{versao}|{papel}|{username}".encode("utf-8"))
+    return f"{carga}.{_assinatura(carga)}"
+
+def validar_token(token):
+    """
+    Retorna {'username', 'papel', 'versao', 'expira'} se o token é autêntico e não expirou;
+    senão None. A versão de sessão é conferida com o banco por quem restaura a sessão.
+    """
+    try:
+        carga, assinatura = token.split(".")
+        if not hmac.compare_digest(assinatura, _assinatura(carga)):
+            return None
+        expira, versao, papel, username = base64.urlsafe_b64decode(carga + "=" * (-len(carga) % 4)).decode("utf-8").split("|", 3)
+        expira, versao = int(expira), int(versao)
+    except (ValueError, UnicodeError):
+        return None
+    if expira < time.time():
+        return None
+    return {"username": username, "papel": papel, "versao": versao, "expira": expira}
+
+def _iniciar_sessao(username, papel, versao):
+    st.session_state.logged_in = True
+    st.session_state.username = username
+    st.session_state.papel = papel
+    st.query_params[PARAMETRO_SESSAO] = emitir_token(username, papel, versao)
+
+def _restaurar_sessao():
+    """Restaura a sessão a partir do token da URL (após recarregar a página)."""
+    token = st.query_params.get(PARAMETRO_SESSAO)
+    dados = validar_token(token) if token else None
+    if dados is None:
+        return False
+    # Logout, troca de senha ou de papel depois da emissão: o token não vale mais
+    atual = _versao_atual(dados["username"])
+    if atual is None or atual.versao_sessao != dados["versao"] or atual.papel != dados["papel"]:
+        st.query_params.pop(PARAMETRO_SESSAO, None)
+        return False
+    st.session_state.logged_in = True
+    st.session_state.username = dados["username"]
+    st.session_state.papel = dados["papel"]
+    # Renova o token quando passou da metade da validade
+    if dados["expira"] - time.time() < 1800 * VALIDADE_SESSAO_HORAS:
+        st.query_params[PARAMETRO_SESSAO] = emitir_token(dados["username"], dados["papel"], dados["versao"])
+    return True
+
+def eh_admin():
+    """Indica se o usuário da sessão tem o papel de administrador."""
+    return st.session_state.get("papel") == ADMIN
 
 def login_page():
     """Renderiza a página de login e controla o estado da sessão."""
@@ -40,26 +192,34 @@ def login_page():
     if 'logged_in' not in st.session_state:
         st.session_state.logged_in = False
 
+    # Página recarregada: a sessão volta pelo token da URL, sem bcrypt (uma leitura indexada confere a versão)
+    if not st.session_state.logged_in and _restaurar_sessao():
+        return True
+
     # Se não estiver logado, mostra o formulário
     if not st.session_state.logged_in:
         with st.form("login_form"):
             usuario_input = st.text_input("Usuário")
             senha_input = st.text_input("Senha", type="password")
             botao_entrar = st.form_submit_button("Entrar no Sistema")
-            
+
             if botao_entrar:
-                if check_login(usuario_input, senha_input):
-                    st.session_state.logged_in = True
-                    st.session_state.username = usuario_input
+                usuario = check_login(usuario_input, senha_input)
+                if usuario:
+                    _iniciar_sessao(usuario["username"], usuario["papel"], usuario["versao"])
                     st.rerun() # Recarrega a página para entrar
                 else:
                     st.error("Usuário ou senha incorretos.")
         return False
-    
+
     # Se estiver logado, retorna True para permitir acesso ao app principal
     return True
 
 def logout():
-    """Realiza o logout do usuário e recarrega a página."""
+    """Realiza o logout do usuário (invalidando seus tokens de sessão) e recarrega a página."""
+    if st.session_state.get("username"):
+        encerrar_sessoes(st.session_state.username)
     st.session_state.logged_in = False
-    st.rerun()
\ No newline at end of file
+    st.session_state.pop("papel", None)
+    st.query_params.pop(PARAMETRO_SESSAO, None)
+    st.rerun()
@@ -0,0 +1,326 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+import armazenamento
+import zip_paralelo
+from models import engine
+
+# --- Backups Incrementais (Snapshots) ---
+# Cada snapshot é um manifesto JSON (backups/snapshots/<nome>.json) com caminho, tamanho,
+# mtime e SHA-256 de cada arquivo de 'dados' e do banco. O conteúdo fica em
+# backups/objetos/<2 primeiros caracteres do hash>/<sha256>, gravado uma única vez: um
+# snapshot só copia o que é novo ou mudou, mas o manifesto é completo, então cada snapshot
+# pode ser restaurado sozinho. Arquivos com o mesmo tamanho e mtime do snapshot anterior
+# reaproveitam o hash sem serem relidos; os blobs dos anexos já têm o hash no nome.
+
+BACKUP_DIR = Path(os.environ.get("JURIS_BACKUP_DIR", "backups"))
+SNAPSHOTS_DIR = BACKUP_DIR / "snapshots"
+OBJETOS_DIR = BACKUP_DIR / "objetos"
+TEMP_DIR = BACKUP_DIR / "tmp"
+# Trava entre processos: o app e o "cli.py backup" (cron) podem rodar ao mesmo tempo
+ARQUIVO_TRAVA = BACKUP_DIR / ".trava"
+
+# Caminho do banco dentro do snapshot
+NOME_BANCO = "juris_gestao.db"
+
+# Retenção: os N snapshots mais recentes, mais o mais recente de cada um dos últimos dias,
+# semanas e meses
+RETER_ULTIMOS = int(os.environ.get("JURIS_BACKUP_ULTIMOS", "5"))
+RETER_DIARIOS = int(os.environ.get("JURIS_BACKUP_DIARIOS", "7"))
+RETER_SEMANAIS = int(os.environ.get("JURIS_BACKUP_SEMANAIS", "4"))
+RETER_MENSAIS = int(os.environ.get("JURIS_BACKUP_MENSAIS", "12"))
+
+# Compressão do .zip baixado: nível do deflate e threads (padrão: um por núcleo)
+NIVEL_COMPRESSAO = int(os.environ.get("JURIS_BACKUP_NIVEL_COMPRESSAO", str(zip_paralelo.NIVEL_PADRAO)))
+THREADS_COMPRESSAO = int(os.environ.get("JURIS_BACKUP_THREADS", "0")) or None
+
+# Pastas de 'dados' que podem ser refeitas e ficam fora do backup
+IGNORADOS = (armazenamento.PREVIEWS_DIR, armazenamento.TEMP_DIR)
+
+def caminho_objeto(sha256):
+    """Retorna o caminho (Path) do conteúdo guardado no repositório de backups."""
+    return OBJETOS_DIR / sha256[:2] / sha256
+
+def _sha256(caminho, tamanho_bloco=1024 * 1024):
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def _arquivos_dados():
+    """Arquivos de 'dados' que entram no backup (sem pré-visualizações nem temporários)."""
+    for caminho in sorted(armazenamento.BASE_DIR.rglob("*")):
+        if caminho.is_file() and not any(caminho.is_relative_to(pasta) for pasta in IGNORADOS):
+            yield caminho
+
+def _copiar_banco():
+    """
+    Copia o banco SQLite para um temporário do backup pela API de backup online do SQLite:
+    a cópia é um retrato consistente (inclui o que está no WAL), mesmo com o app gravando.
+    Retorna o Path ou None.
+    """
+    banco = engine.url.database
+    if engine.url.get_backend_name() != "sqlite" or not banco or not os.path.exists(banco):
+        return None
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=TEMP_DIR, suffix=".db")
+    os.close(descritor)
+    origem = sqlite3.connect(banco)
+    destino = sqlite3.connect(temporario)
+    try:
+        origem.backup(destino)
+    except BaseException:
+        destino.close()
+        Path(temporario).unlink(missing_ok=True)
+        raise
+    finally:
+        origem.close()
+    destino.close()
+    return Path(temporario)
+
+def _guardar_objeto(origem, sha256):
+    """Copia o conteúdo para o repositório se ainda não estiver lá; retorna os bytes gravados."""
+    destino = caminho_objeto(sha256)
+    if destino.exists():
+        return 0
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=TEMP_DIR, suffix=".parcial")
+    try:
+        with os.fdopen(descritor, "wb") as f, open(origem, "rb") as entrada:
+            shutil.copyfileobj(entrada, f, 1024 * 1024)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, destino)
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+    return destino.stat().st_size
+
+def _gravar_manifesto(manifesto):
+    SNAPSHOTS_DIR.mkdir(parents=True, exist_ok=True)
+    destino = SNAPSHOTS_DIR / f"{manifesto['nome']}.json"
+    temporario = destino.with_suffix(".parcial")
+    temporario.write_text(json.dumps(manifesto, ensure_ascii=False, indent=1), encoding="utf-8")
+    os.replace(temporario, destino)
+
+def ler_manifesto(nome):
+    """Lê o manifesto (dict) do snapshot."""
+    return json.loads((SNAPSHOTS_DIR / f"{nome}.json").read_text(encoding="utf-8"))
+
+def listar_snapshots():
+    """Nomes dos snapshots, do mais recente para o mais antigo."""
+    if not SNAPSHOTS_DIR.exists():
+        return []
+    return sorted((p.stem for p in SNAPSHOTS_DIR.glob("*.json")), reverse=True)
+
+@contextmanager
+def _trava_repositorio():
+    """
+    Trava exclusiva do repositório de backups, entre processos e threads. Sem ela, a retenção
+    apagaria os objetos já copiados por um snapshot cujo manifesto ainda não foi gravado.
+    """
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    with open(ARQUIVO_TRAVA, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK desiste após ~10 s; continua esperando
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == "nt":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def criar_snapshot():
+    """
+    Cria um snapshot de 'dados' e do banco, copiando só os conteúdos que o repositório ainda
+    não tem. Retorna o manifesto, com a lista 'adicionados' (arquivos novos ou alterados em
+    relação ao snapshot anterior) e 'bytes_novos' (quanto o repositório cresceu).
+    """
+    with _trava_repositorio():
+        return _criar_snapshot()
+
+def _criar_snapshot():
+    anteriores = listar_snapshots()
+    anterior = ler_manifesto(anteriores[0])["arquivos"] if anteriores else {}
+
+    criado_em = datetime.now()
+    nome = criado_em.strftime("%Y%m%d_%H%M%S_%f")
+    arquivos, adicionados, bytes_novos = {}, [], 0
+
+    def incluir(relativo, caminho, sha256=None):
+        nonlocal bytes_novos
+        try:
+            estado = caminho.stat()
+        except FileNotFoundError:
+            return  # Apagado durante o backup
+        antigo = anterior.get(relativo)
+        if sha256 is None:
+            mesmo_arquivo = antigo and antigo["tamanho"] == estado.st_size and antigo["mtime_ns"] == estado.st_mtime_ns
+            sha256 = antigo["sha256"] if mesmo_arquivo else _sha256(caminho)
+        try:
+            bytes_novos += _guardar_objeto(caminho, sha256)
+        except FileNotFoundError:
+            return
+        arquivos[relativo] = {"sha256": sha256, "tamanho": estado.st_size, "mtime_ns": estado.st_mtime_ns}
+        if antigo is None or antigo["sha256"] != sha256:
+            adicionados.append(relativo)
+
+    for caminho in _arquivos_dados():
+        # Blobs são imutáveis e o nome é o próprio hash: não precisam ser relidos
+        incluir(caminho.as_posix(), caminho, caminho.name if armazenamento.eh_blob(caminho) else None)
+
+    copia_banco = _copiar_banco()
+    if copia_banco is not None:
+        try:
+            incluir(NOME_BANCO, copia_banco)
+        finally:
+            copia_banco.unlink(missing_ok=True)
+
+    manifesto = {
+        "nome": nome,
+        "criado_em": criado_em.isoformat(timespec="seconds"),
+        "arquivos": arquivos,
+        "adicionados": adicionados,
+        "removidos": sorted(set(anterior) - set(arquivos)),
+        "bytes_novos": bytes_novos,
+    }
+    _gravar_manifesto(manifesto)
+    return manifesto
+
+def resumo_snapshots():
+    """Uma linha (dict) por snapshot, do mais recente para o mais antigo, para a tela de backups."""
+    resumos = []
+    for nome in listar_snapshots():
+        manifesto = ler_manifesto(nome)
+        resumos.append({
+            "nome": nome,
+            "criado_em": datetime.fromisoformat(manifesto["criado_em"]),
+            "arquivos": len(manifesto["arquivos"]),
+            "tamanho_total": sum(a["tamanho"] for a in manifesto["arquivos"].values()),
+            "adicionados": manifesto["adicionados"],
+            "removidos": manifesto["removidos"],
+            "bytes_novos": manifesto["bytes_novos"],
+        })
+    return resumos
+
+# --- Restauração ---
+
+def restaurar_snapshot(nome, destino):
+    """
+    Recria em 'destino' (pasta nova ou vazia) os arquivos do snapshot, conferindo o SHA-256
+    de cada conteúdo. Lança ValueError se algum objeto estiver faltando ou corrompido.
+    """
+    destino = Path(destino)
+    if destino.exists() and any(destino.iterdir()):
+        raise ValueError(f"A pasta de destino '{destino}' não está vazia.")
+
+    for relativo, arquivo in ler_manifesto(nome)["arquivos"].items():
+        objeto = caminho_objeto(arquivo["sha256"])
+        if not objeto.exists() or _sha256(objeto) != arquivo["sha256"]:
+            raise ValueError(f"Conteúdo de '{relativo}' ausente ou corrompido no repositório de backups.")
+        alvo = destino / relativo
+        alvo.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(objeto, alvo)
+        os.utime(alvo, ns=(arquivo["mtime_ns"], arquivo["mtime_ns"]))
+    return destino
+
+def escrever_zip(nome, saida):
+    """
+    Escreve em 'saida' (arquivo, pipe ou qualquer objeto com write) o .zip completo do
+    snapshot, comprimindo em paralelo. Retorna o número de bytes escritos.
+    """
+    membros = [
+        (relativo, caminho_objeto(arquivo["sha256"]), arquivo["mtime_ns"])
+        for relativo, arquivo in ler_manifesto(nome)["arquivos"].items()
+    ]
+    escritor = zip_paralelo.EscritorZipParalelo(saida, NIVEL_COMPRESSAO, THREADS_COMPRESSAO)
+    return escritor.escrever(membros)
+
+def arquivo_zip(nome):
+    """
+    Gera o .zip do snapshot em um temporário anônimo (apagado ao ser fechado), fora da
+    pasta 'dados', e o devolve aberto no início, para o download do Streamlit.
+    """
+    TEMP_DIR.mkdir(parents=True, exist_ok=True)
+    saida = tempfile.TemporaryFile(dir=TEMP_DIR)
+    try:
+        escrever_zip(nome, saida)
+    except BaseException:
+        saida.close()
+        raise
+    saida.seek(0)
+    return saida
+
+# --- Retenção ---
+
+def _selecionar_retidos(nomes, ultimos, diarios, semanais, mensais):
+    """Mantém os últimos snapshots e o mais recente de cada um dos últimos dias, semanas (ISO) e meses."""
+    datas = {nome: datetime.strptime(nome[:15], "%Y%m%d_%H%M%S") for nome in nomes}
+    ordenados = sorted(nomes, reverse=True)
+    retidos = set(ordenados[:max(ultimos, 1)])  # O mais recente nunca é apagado
+    regras = (
+        (diarios, lambda d: d.date()),
+        (semanais, lambda d: d.isocalendar()[:2]),
+        (mensais, lambda d: (d.year, d.month)),
+    )
+    for quantidade, periodo in regras:
+        vistos = set()
+        for nome in ordenados:
+            if len(vistos) >= quantidade:
+                break
+            chave = periodo(datas[nome])
+            if chave not in vistos:
+                vistos.add(chave)
+                retidos.add(nome)
+    return retidos
+
+def aplicar_retencao(ultimos=None, diarios=None, semanais=None, mensais=None):
+    """
+    Apaga os snapshots fora da política de retenção e os conteúdos que nenhum snapshot
+    restante usa. Retorna (snapshots apagados, bytes liberados).
+    """
+    with _trava_repositorio():
+        return _aplicar_retencao(ultimos, diarios, semanais, mensais)
+
+def _aplicar_retencao(ultimos, diarios, semanais, mensais):
+    nomes = listar_snapshots()
+    retidos = _selecionar_retidos(
+        nomes,
+        RETER_ULTIMOS if ultimos is None else ultimos,
+        RETER_DIARIOS if diarios is None else diarios,
+        RETER_SEMANAIS if semanais is None else semanais,
+        RETER_MENSAIS if mensais is None else mensais,
+    )
+    apagados = [nome for nome in nomes if nome not in retidos]
+    for nome in apagados:
+        (SNAPSHOTS_DIR / f"{nome}.json").unlink(missing_ok=True)
+
+    usados = {arquivo["sha256"] for nome in retidos for arquivo in ler_manifesto(nome)["arquivos"].values()}
+    liberados = 0
+    if OBJETOS_DIR.exists():
+        for objeto in OBJETOS_DIR.glob("*/*"):
+            if objeto.name not in usados:
+                liberados += objeto.stat().st_size
+                objeto.unlink()
+    return apagados, liberados
@@ -0,0 +1,151 @@
+import io
+import random
+import shutil
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import models
+import repositorio
+import services
+import backup
+import extracao
+import armazenamento
+import agenda_ics
+from models import SessionLocal, Cliente, Advogado, Documento, TextoExtraido
+
+# Benchmarks dos caminhos mais usados do sistema, sobre os dados sintéticos (ver conftest.py).
+# Rode com "pytest benchmarks" e compare execuções com "pytest-benchmark compare".
+
+@pytest.fixture
+def db():
+    sessao = SessionLocal()
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+@pytest.fixture(scope="module")
+def pdf():
+    """Caminho de um dos PDFs anexados pelo gerador."""
+    sessao = SessionLocal()
+    try:
+        sha256 = sessao.query(Documento.sha256).filter(Documento.mime == "application/pdf").order_by(Documento.id).first()[0]
+    finally:
+        sessao.close()
+    return armazenamento.caminho_blob(sha256)
+
+# --- Dashboard ---
+
+def test_dashboard_resumo(benchmark, db):
+    benchmark(repositorio.resumo_dashboard, db)
+
+def test_dashboard_reconstruir_resumo(benchmark, db):
+    # As agregações completas (contagens e somas), usadas quando o resumo diverge
+    benchmark(models.reconstruir_resumo, db)
+
+def test_dashboard_proximos_compromissos(benchmark, db):
+    benchmark(repositorio.proximos_compromissos, db, 5)
+
+# --- Lista de Processos ---
+
+@pytest.mark.parametrize("filtros", [
+    {},
+    {"status": "Em andamento"},
+    {"cliente": "Silva"},
+    {"tribunal": "TRT"},
+    {"numero": "0000123"},
+], ids=["sem_filtro", "status", "cliente", "tribunal", "numero"])
+def test_processos_primeira_pagina(benchmark, db, filtros):
+    benchmark(repositorio.listar_processos, db, pagina=1, **filtros)
+
+def test_processos_ultima_pagina(benchmark, db, dados):
+    ultima = max(1, -(-dados["processos"] // 25))
+    benchmark(repositorio.listar_processos, db, pagina=ultima)
+
+# --- Agenda ---
+
+@pytest.mark.parametrize("periodo", [7, 31], ids=["semana", "mes"])
+def test_agenda_janela(benchmark, db, periodo):
+    inicio = datetime.combine(date.today(), datetime.min.time())
+    benchmark(repositorio.compromissos_da_janela, db, inicio, inicio + timedelta(days=periodo))
+
+def test_agenda_janela_pagina_seguinte(benchmark, db):
+    inicio = datetime.combine(date.today(), datetime.min.time())
+    _, cursor = repositorio.compromissos_da_janela(db, inicio, inicio + timedelta(days=31), incluir_concluidos=True)
+    benchmark(repositorio.compromissos_da_janela, db, inicio, inicio + timedelta(days=31), apos=cursor, incluir_concluidos=True)
+
+def test_agenda_opcoes_processos(benchmark, db):
+    # Seletor de processo do formulário de novo compromisso, com busca
+    benchmark(repositorio.opcoes_processos, db, "Silva")
+
+def test_agenda_exportar_ics(benchmark):
+    benchmark.pedantic(lambda: agenda_ics.escrever_ics(io.BytesIO()), rounds=3)
+
+# --- Prazos ---
+
+@pytest.fixture(scope="module")
+def prazos_aleatorios():
+    rng = random.Random(7)
+    hoje = date.today()
+    return [(hoje + timedelta(days=rng.randrange(-365, 365)), rng.choice([5, 10, 15, 30])) for _ in range(1000)]
+
+def test_prazos_calcular_prazo_util(benchmark, prazos_aleatorios):
+    def calcular_todos():
+        return [services.calcular_prazo_util(inicio, dias) for inicio, dias in prazos_aleatorios]
+
+    vencimentos = benchmark(calcular_todos)
+    assert all(v > inicio for v, (inicio, _) in zip(vencimentos, prazos_aleatorios))
+
+def test_prazos_calcular_em_lote(benchmark, prazos_aleatorios):
+    import pandas as pd
+
+    df = pd.DataFrame(prazos_aleatorios, columns=["data_publicacao", "dias_uteis"])
+    df["numero_processo"] = [f"P{i}" for i in range(len(df))]
+    benchmark(services.calcular_prazos_lote, df)
+
+# --- PDFs ---
+
+def test_pdf_extrair_texto(benchmark, pdf):
+    # Extração completa (sem cache): leitura, hash e texto de todas as páginas
+    _, texto, paginas, _, _ = benchmark(extracao.extrair_pdf, pdf)
+    assert paginas > 0 and texto
+
+def test_pdf_extrair_texto_pdf_em_cache(benchmark, pdf):
+    services.extrair_texto_pdf(pdf)  # Preenche o cache
+    assert not benchmark(services.extrair_texto_pdf, pdf).startswith("Erro")
+
+def test_pdf_extrair_texto_pdf_sem_cache(benchmark, pdf):
+    sha256 = pdf.name
+
+    def limpar_cache():
+        models.executar_escrita(lambda sessao: sessao.query(TextoExtraido).filter(TextoExtraido.sha256 == sha256).delete())
+
+    benchmark.pedantic(services.extrair_texto_pdf, args=(pdf,), setup=limpar_cache, rounds=10)
+
+# --- Backups ---
+
+def test_backup_completo(benchmark):
+    # Primeiro snapshot: copia o banco e todos os anexos para o repositório de backups
+    benchmark.pedantic(services.criar_backup, setup=lambda: shutil.rmtree(backup.BACKUP_DIR, ignore_errors=True), rounds=3)
+
+def test_backup_incremental(benchmark):
+    # Nada mudou desde o anterior: só o banco é copiado e comparado
+    services.criar_backup()
+    benchmark.pedantic(services.criar_backup, rounds=5)
+
+def test_backup_exportar_zip(benchmark):
+    nome = services.criar_backup()["nome"]
+    benchmark.pedantic(lambda: backup.escrever_zip(nome, io.BytesIO()), rounds=3)
+
+# --- Documentos ---
+
+def test_documentos_gerar_procuracao(benchmark, db):
+    cliente = db.query(Cliente).order_by(Cliente.id).first()
+    advogado = db.query(Advogado).order_by(Advogado.id).first()
+    assert benchmark(services.gerar_procuracao, cliente, advogado) is not None
+
+def test_documentos_gerar_lote(benchmark, db):
+    clientes = db.query(Cliente).order_by(Cliente.id).limit(50).all()
+    advogado = db.query(Advogado).order_by(Advogado.id).first()
+    benchmark.pedantic(lambda: services.gerar_documentos_lote("procuracao", clientes, advogado, io.BytesIO()), rounds=3)
@@ -0,0 +1,52 @@
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+
+import dados_sinteticos
+
+# --- Ambiente dos Benchmarks ---
+# O banco e a pasta 'dados' ficam em uma pasta de trabalho por escala (JURIS_BENCH_ESCALA,
+# padrão "pequena"; ou a pasta indicada em JURIS_BENCH_DIR), gerada na primeira execução e
+# reaproveitada nas seguintes. O motor do SQLAlchemy é criado na importação de models, então
+# o ambiente é preparado aqui, antes de os módulos de benchmark serem importados.
+
+ESCALA = os.environ.get("JURIS_BENCH_ESCALA", "pequena")
+PASTA_BENCHMARKS = Path(__file__).resolve().parent
+PASTA_DADOS = dados_sinteticos.preparar_ambiente(os.environ.get("JURIS_BENCH_DIR") or PASTA_BENCHMARKS / ".dados" / ESCALA)
+PASTA_RESULTADOS = PASTA_BENCHMARKS / "resultados"
+
+def pytest_configure(config):
+    # Resultados salvos em benchmarks/resultados (um .json por execução, com o commit no nome),
+    # independente da pasta de onde o pytest foi chamado
+    if config.getoption("benchmark_storage", None) == "file://./.benchmarks":
+        config.option.benchmark_storage = f"file://{PASTA_RESULTADOS.as_posix()}"
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    # Guarda no resultado os volumes usados, para só comparar execuções da mesma escala
+    output_json["dados_sinteticos"] = dados_sinteticos.parametros_gerados(PASTA_DADOS)
+
+@pytest.fixture(scope="session", autouse=True)
+def dados():
+    """Gera os dados (se preciso) e roda os benchmarks de dentro da pasta de trabalho."""
+    if ESCALA not in dados_sinteticos.ESCALAS:
+        pytest.exit(f"Escala desconhecida: {ESCALA} (use {', '.join(dados_sinteticos.ESCALAS)}).")
+
+    diretorio_original = os.getcwd()
+    os.chdir(PASTA_DADOS)
+    try:
+        parametros = dados_sinteticos.parametros_gerados(PASTA_DADOS)
+        if parametros is None:
+            if any(PASTA_DADOS.iterdir()):
+                pytest.exit(f"A pasta '{PASTA_DADOS}' tem uma geração incompleta; apague-a e rode de novo.")
+            parametros = dados_sinteticos.gerar(PASTA_DADOS, **dados_sinteticos.ESCALAS[ESCALA])
+        else:
+            # Dados gerados por uma versão anterior: aplica as migrações (índices novos etc.)
+            import models
+            models.init_db()
+        # Os modelos Word são lidos de 'templates', relativo à pasta de trabalho
+        shutil.copytree(dados_sinteticos.RAIZ_REPOSITORIO / "templates", PASTA_DADOS / "templates", dirs_exist_ok=True)
+        yield parametros
+    finally:
+        os.chdir(diretorio_original)
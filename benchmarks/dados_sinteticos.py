@@ -0,0 +1,230 @@
+import io
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, date, timedelta
+from pathlib import Path
+
+# --- Gerador de Dados Sintéticos ---
+# Preenche um banco novo (o esquema de models.py, com as migrações) e uma pasta 'dados' com
+# PDFs anexados, em uma pasta de trabalho própria, para os benchmarks rodarem sobre volumes
+# realistas sem tocar no banco do escritório. Os dados são determinísticos (semente fixa; as
+# datas são relativas ao dia da geração), então os resultados são comparáveis entre commits.
+#
+#   python benchmarks/dados_sinteticos.py /tmp/juris_bench --escala grande
+#   python benchmarks/dados_sinteticos.py /tmp/juris_bench --clientes 500 --pdfs 5
+
+RAIZ_REPOSITORIO = Path(__file__).resolve().parent.parent
+NOME_BANCO = "juris_gestao.db"
+ARQUIVO_PARAMETROS = "parametros.json"
+
+ESCALAS = {
+    "minima": dict(clientes=100, processos=1_000, diario=5_000, financeiro=2_000, audiencias=1_000, pdfs=5),
+    "pequena": dict(clientes=1_000, processos=10_000, diario=100_000, financeiro=50_000, audiencias=20_000, pdfs=20),
+    "grande": dict(clientes=10_000, processos=100_000, diario=1_000_000, financeiro=500_000, audiencias=200_000, pdfs=200),
+}
+
+LOTE_INSERCAO = 10_000
+PAGINAS_POR_PDF = 8
+SEMENTE = 2024
+
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João",
+         "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago", "Vanessa", "Wagner"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Almeida", "Ferreira",
+              "Rodrigues", "Gomes", "Martins", "Araújo", "Barbosa", "Ribeiro", "Carvalho"]
+TRIBUNAIS = ["TJSP", "TJRJ", "TJMG", "TRT2", "TRT15", "TRF3", "STJ"]
+TIPOS_ACAO = ["Cível", "Trabalhista", "Criminal", "Família", "Tributário", "Consumidor"]
+STATUS_PROCESSO = ["Em andamento"] * 6 + ["Suspenso", "Arquivado", "Encerrado"]
+TIPOS_EVENTO = ["Prazo", "Audiência", "Reunião", "Diligência", "Outro"]
+PALAVRAS = ("juntada petição intimação sentença recurso apelação contestação réplica audiência perícia "
+            "laudo acordo honorários custas despacho decisão liminar tutela urgência embargos agravo "
+            "citação mandado penhora cálculo manifestação prazo cliente parte contrária testemunha "
+            "documento protocolo conclusão vista cartório julgamento pauta").split()
+
+def _texto(rng, palavras):
+    return " ".join(rng.choice(PALAVRAS) for _ in range(palavras)).capitalize() + "."
+
+def _inserir(conexao, tabela, linhas):
+    """Insere as linhas (dicts, gerador) em lotes de LOTE_INSERCAO."""
+    from sqlalchemy import insert
+
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE_INSERCAO:
+            conexao.execute(insert(tabela), lote)
+            lote = []
+    if lote:
+        conexao.execute(insert(tabela), lote)
+
+# --- PDFs ---
+
+def gerar_pdf(linhas_por_pagina):
+    """PDF simples (texto em Helvetica), uma página por item de 'linhas_por_pagina'."""
+    objetos = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    paginas = []
+    for linhas in linhas_por_pagina:
+        comandos = ["BT /F1 10 Tf 14 TL 50 790 Td"]
+        for linha in linhas:
+            escapada = linha.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            comandos.append(f"({escapada}) Tj T*")
+        comandos.append("ET")
+        fluxo = "\n".join(comandos).encode("cp1252", "replace")
+        objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(fluxo), fluxo))
+        objetos.append(None)  # Página, preenchida abaixo com o número do conteúdo
+        paginas.append(len(objetos))
+    for numero in paginas:
+        objetos[numero - 1] = b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (numero - 1)
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(b"%d 0 R" % n for n in paginas), len(paginas))
+
+    saida = bytearray(b"%PDF-1.4\n")
+    deslocamentos = []
+    for numero, corpo in enumerate(objetos, start=1):
+        deslocamentos.append(len(saida))
+        saida += b"%d 0 obj\n%s\nendobj\n" % (numero, corpo)
+    inicio_xref = len(saida)
+    saida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    saida += b"".join(b"%010d 00000 n \n" % d for d in deslocamentos)
+    saida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, inicio_xref)
+    return bytes(saida)
+
+# --- Geração ---
+
+def preparar_ambiente(pasta):
+    """
+    Aponta o app para a pasta de trabalho (banco e 'dados' relativos a ela). Precisa rodar
+    antes da primeira importação de models, que cria o motor a partir de JURIS_DATABASE_URL.
+    """
+    pasta = Path(pasta).resolve()
+    pasta.mkdir(parents=True, exist_ok=True)
+    os.environ["JURIS_DATABASE_URL"] = f"sqlite:///{(pasta / NOME_BANCO).as_posix()}"
+    if str(RAIZ_REPOSITORIO) not in sys.path:
+        sys.path.insert(0, str(RAIZ_REPOSITORIO))
+    return pasta
+
+def parametros_gerados(pasta):
+    """Parâmetros com que a pasta foi gerada, ou None se ela ainda não tem dados completos."""
+    arquivo = Path(pasta) / ARQUIVO_PARAMETROS
+    if not arquivo.exists():
+        return None
+    return json.loads(arquivo.read_text(encoding="utf-8"))
+
+def gerar(pasta, clientes, processos, diario, financeiro, audiencias, pdfs):
+    """
+    Gera o banco e os anexos na pasta (vazia). O diretório de trabalho precisa ser a própria
+    pasta, pois 'dados' é relativo a ele (ver preparar_ambiente e armazenamento.BASE_DIR).
+    """
+    import models
+    import armazenamento
+    import services
+
+    rng = random.Random(SEMENTE)
+    hoje = date.today()
+    agora = datetime.now().replace(second=0, microsecond=0)
+    models.init_db()
+
+    with models.engine.begin() as conexao:
+        _inserir(conexao, models.Advogado.__table__, ({
+            "nome": f"Dr(a). {NOMES[i % len(NOMES)]} {SOBRENOMES[i % len(SOBRENOMES)]}",
+            "oab": f"OAB/SP {100000 + i}",
+            "nacionalidade": "brasileiro(a)",
+            "estado_civil": "casado(a)",
+            "endereco": f"Rua do Fórum, {i + 1} - São Paulo/SP",
+        } for i in range(5)))
+
+        _inserir(conexao, models.Cliente.__table__, ({
+            "nome": f"{rng.choice(NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}",
+            "cpf_cnpj": f"{i:011d}",
+            "telefone": f"(11) 9{rng.randrange(10**7, 10**8)}",
+            "email": f"cliente{i}@exemplo.com.br",
+            "endereco": f"Rua {rng.choice(SOBRENOMES)}, {rng.randrange(1, 2000)}",
+            "data_cadastro": agora - timedelta(days=rng.randrange(0, 3650)),
+        } for i in range(1, clientes + 1)))
+
+        _inserir(conexao, models.Processo.__table__, ({
+            "cliente_id": rng.randrange(1, clientes + 1),
+            "numero_processo": f"{i:07d}-{rng.randrange(10, 99)}.{rng.randrange(2010, 2025)}.8.26.{rng.randrange(1, 9999):04d}",
+            "tribunal": rng.choice(TRIBUNAIS),
+            "tipo_acao": rng.choice(TIPOS_ACAO),
+            "parte_contraria": f"{rng.choice(SOBRENOMES)} Ltda.",
+            "status": rng.choice(STATUS_PROCESSO),
+            "data_inicio": hoje - timedelta(days=rng.randrange(0, 3650)),
+            "observacoes": _texto(rng, 12),
+        } for i in range(1, processos + 1)))
+
+        _inserir(conexao, models.DiarioProcessual.__table__, ({
+            "processo_id": rng.randrange(1, processos + 1),
+            "data_registro": agora - timedelta(minutes=rng.randrange(0, 5 * 365 * 24 * 60)),
+            "texto": _texto(rng, rng.randrange(8, 40)),
+        } for _ in range(diario)))
+
+        _inserir(conexao, models.Financeiro.__table__, ({
+            "processo_id": rng.randrange(1, processos + 1),
+            "descricao": rng.choice(["Honorários iniciais", "Parcela de honorários", "Êxito", "Custas", "Perícia", "Diligência"]),
+            "tipo": "Honorário" if rng.random() < 0.7 else "Despesa",
+            "valor": round(rng.uniform(50, 20000), 2),
+            "data_vencimento": hoje + timedelta(days=rng.randrange(-730, 365)),
+            "status": "Pago" if rng.random() < 0.6 else "Pendente",
+        } for _ in range(financeiro)))
+
+        # Compromissos de dois anos atrás a um ano à frente; os passados quase todos concluídos
+        def compromissos():
+            for _ in range(audiencias):
+                data_hora = agora + timedelta(minutes=rng.randrange(-730 * 24 * 60, 365 * 24 * 60))
+                yield {
+                    "processo_id": rng.randrange(1, processos + 1),
+                    "titulo": f"{rng.choice(TIPOS_EVENTO)} - {_texto(rng, 3)}",
+                    "data_hora": data_hora,
+                    "tipo": rng.choice(TIPOS_EVENTO),
+                    "observacoes": _texto(rng, 10) if rng.random() < 0.3 else None,
+                    "concluido": int(data_hora < agora and rng.random() < 0.95),
+                }
+        _inserir(conexao, models.Audiencia.__table__, compromissos())
+
+    # As inserções em lote não passam pelos eventos do ORM: o resumo do dashboard é refeito
+    db = models.SessionLocal()
+    try:
+        models.reconstruir_resumo(db)
+        alvos = db.query(models.Processo.numero_processo, models.Cliente.nome, models.Cliente.id).join(
+            models.Cliente, models.Processo.cliente_id == models.Cliente.id
+        ).order_by(models.Processo.id).limit(pdfs).all()
+    finally:
+        db.close()
+
+    # PDFs anexados pelo mesmo caminho dos uploads (armazenamento por conteúdo)
+    for i, (numero, cliente_nome, cliente_id) in enumerate(alvos):
+        conteudo = gerar_pdf([[_texto(rng, 12) for _ in range(45)] for _ in range(PAGINAS_POR_PDF)])
+        pasta_processo = services.get_processo_dir(cliente_nome, cliente_id, numero)
+        temporario, sha256, tamanho = armazenamento.gravar_temporario(io.BytesIO(conteudo))
+        armazenamento.adicionar_referencia(pasta_processo, f"peticao_{i + 1}.pdf", temporario, sha256, tamanho)
+
+    parametros = dict(clientes=clientes, processos=processos, diario=diario, financeiro=financeiro,
+                      audiencias=audiencias, pdfs=pdfs, gerado_em=datetime.now().isoformat(timespec="seconds"))
+    (Path.cwd() / ARQUIVO_PARAMETROS).write_text(json.dumps(parametros, indent=2), encoding="utf-8")
+    return parametros
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos para os benchmarks do JurisFlow.")
+    parser.add_argument("pasta", help="Pasta de trabalho (vazia) onde ficam o banco e a pasta 'dados'")
+    parser.add_argument("--escala", choices=ESCALAS, default="pequena", help="Volumes pré-definidos (padrão: pequena)")
+    for campo in ESCALAS["pequena"]:
+        parser.add_argument(f"--{campo}", type=int, help=f"Sobrescreve a quantidade de {campo} da escala")
+    args = parser.parse_args()
+
+    volumes = dict(ESCALAS[args.escala])
+    volumes.update({campo: valor for campo, valor in vars(args).items() if campo in volumes and valor is not None})
+
+    pasta = preparar_ambiente(args.pasta)
+    if any(pasta.iterdir()):
+        parser.error(f"A pasta '{pasta}' não está vazia.")
+    os.chdir(pasta)
+    inicio = datetime.now()
+    parametros = gerar(pasta, **volumes)
+    print(json.dumps(parametros, indent=2))
+    print(f"Gerado em {(datetime.now() - inicio).total_seconds():.1f} s.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import re
+from datetime import datetime
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Busca global sobre as tabelas FTS5 criadas em migracoes.py (clientes_fts, processos_fts,
+# diario_fts). Os triggers mantêm os índices sincronizados com as tabelas de origem.
+
+# Marcadores usados no trecho (snippet) para destacar os termos encontrados
+MARCA_INICIO = "**"
+MARCA_FIM = "**"
+
+# O bm25 precisa pontuar todas as linhas que casam com a consulta. Para termos muito
+# comuns (centenas de milhares de notas) isso custa centenas de ms, então a pontuação
+# considera apenas as JANELA_RANKING ocorrências mais recentes (maiores rowids).
+JANELA_RANKING = 2000
+
+def _filtro_janela(fts):
+    """Condição SQL que limita a tabela FTS às ocorrências mais recentes da consulta."""
+    return (
+        f"{fts}.rowid >= COALESCE((SELECT MIN(rowid) FROM (SELECT rowid FROM {fts} "
+        f"WHERE {fts} MATCH :consulta ORDER BY rowid DESC LIMIT {JANELA_RANKING})), 0)"
+    )
+
+SQL_CLIENTES = text(f"""
+    SELECT c.id, c.nome, c.cpf_cnpj,
+           snippet(clientes_fts, -1, '{MARCA_INICIO}', '{MARCA_FIM}', '…', 12) AS trecho,
+           bm25(clientes_fts, 10.0, 5.0, 1.0) AS pontuacao
+    FROM clientes_fts
+    JOIN clientes c ON c.id = clientes_fts.rowid
+    WHERE clientes_fts MATCH :consulta AND {_filtro_janela("clientes_fts")}
+    ORDER BY pontuacao
+    LIMIT :limite
+""")
+
+SQL_PROCESSOS = text(f"""
+    SELECT p.id, p.numero_processo, c.id, c.nome,
+           snippet(processos_fts, -1, '{MARCA_INICIO}', '{MARCA_FIM}', '…', 12) AS trecho,
+           bm25(processos_fts, 10.0, 3.0, 1.0, 1.0) AS pontuacao
+    FROM processos_fts
+    JOIN processos p ON p.id = processos_fts.rowid
+    JOIN clientes c ON c.id = p.cliente_id
+    WHERE processos_fts MATCH :consulta AND {_filtro_janela("processos_fts")}
+    ORDER BY pontuacao
+    LIMIT :limite
+""")
+
+SQL_DIARIO = text(f"""
+    SELECT p.id, p.numero_processo, c.id, c.nome, d.data_registro,
+           snippet(diario_fts, 0, '{MARCA_INICIO}', '{MARCA_FIM}', '…', 16) AS trecho,
+           bm25(diario_fts) AS pontuacao
+    FROM diario_fts
+    JOIN diario d ON d.id = diario_fts.rowid
+    JOIN processos p ON p.id = d.processo_id
+    JOIN clientes c ON c.id = p.cliente_id
+    WHERE diario_fts MATCH :consulta AND {_filtro_janela("diario_fts")}
+    ORDER BY pontuacao
+    LIMIT :limite
+""")
+
+def montar_consulta_fts(termo):
+    """
+    Converte o texto digitado em uma consulta FTS5 segura: cada palavra vira um termo
+    entre aspas (operadores do usuário são ignorados) e a última aceita prefixo.
+    """
+    palavras = re.findall(r"\w+", termo or "")
+    if not palavras:
+        return None
+    termos = [f'"{p}"' for p in palavras]
+    termos[-1] += "*"
+    return " ".join(termos)
+
+def buscar(db: Session, termo, limite=20):
+    """
+    Busca o termo em clientes, processos e diário, do mais para o menos relevante.
+    Retorna dicionários com tipo, título, trecho destacado e os ids para navegação.
+    """
+    consulta = montar_consulta_fts(termo)
+    if consulta is None:
+        return []
+    params = {"consulta": consulta, "limite": limite}
+
+    resultados = []
+    for cliente_id, nome, cpf_cnpj, trecho, pontuacao in db.execute(SQL_CLIENTES, params):
+        resultados.append({
+            "tipo": "Cliente", "titulo": f"{nome} ({cpf_cnpj})", "trecho": trecho, "pontuacao": pontuacao,
+            "cliente_id": cliente_id, "cpf_cnpj": cpf_cnpj, "processo_id": None, "numero_processo": None,
+        })
+    for processo_id, numero, cliente_id, cliente_nome, trecho, pontuacao in db.execute(SQL_PROCESSOS, params):
+        resultados.append({
+            "tipo": "Processo", "titulo": f"{numero} - {cliente_nome}", "trecho": trecho, "pontuacao": pontuacao,
+            "cliente_id": cliente_id, "cpf_cnpj": None, "processo_id": processo_id, "numero_processo": numero,
+        })
+    for processo_id, numero, cliente_id, cliente_nome, data_registro, trecho, pontuacao in db.execute(SQL_DIARIO, params):
+        resultados.append({
+            "tipo": "Diário", "titulo": f"{numero} - {cliente_nome} (nota de {datetime.fromisoformat(str(data_registro)).strftime('%d/%m/%Y')})", "trecho": trecho,
+            "pontuacao": pontuacao, "cliente_id": cliente_id, "cpf_cnpj": None, "processo_id": processo_id, "numero_processo": numero,
+        })
+
+    # bm25 do SQLite: quanto menor (mais negativo), mais relevante
+    resultados.sort(key=lambda r: r["pontuacao"])
+    return resultados[:limite]
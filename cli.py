@@ -0,0 +1,304 @@
+import os
+import argparse
+import secrets
+import subprocess
+import getpass
+import sys
+import tempfile
+
+import migracoes
+import ia
+import armazenamento
+import backup
+import resumo_lote
+import agenda_ics
+from pathlib import Path
+from datetime import datetime, date
+
+from models import SessionLocal, engine, init_db, reconstruir_resumo, Processo, PAPEIS
+
+# Comandos de manutenção do JurisFlow.
+# Uso: python cli.py <comando> [opções]
+
+# Orçamento de importação (ms, em um interpretador novo) dos módulos e do app do Streamlit.
+# Nenhum deles pode carregar as dependências pesadas, que só entram quando são usadas
+# (o app, naturalmente, carrega o próprio Streamlit).
+ORCAMENTO_IMPORTACAO_MS = {"models": 500, "repositorio": 550, "services": 600, "cli": 650, "app": 1200}
+MODULOS_PESADOS = ("pandas", "numpy", "holidays", "docxtpl", "jinja2", "google.genai", "pypdf", "pypdfium2", "PIL", "streamlit")
+PESADOS_PERMITIDOS = {"app": ("streamlit",)}
+
+def cmd_init_db(args):
+    """Cria as tabelas do banco de dados."""
+    init_db()
+    print("Banco de dados inicializado.")
+
+def cmd_reconstruir_resumo(args):
+    """Recalcula o resumo do dashboard a partir das tabelas de origem."""
+    db = SessionLocal()
+    try:
+        resumo = reconstruir_resumo(db)
+        print(f"Clientes: {resumo.total_clientes}")
+        print(f"Processos em andamento: {resumo.processos_ativos}")
+        print(f"Honorários recebidos: {resumo.honorarios_recebidos:.2f}")
+        print(f"Honorários a receber: {resumo.honorarios_a_receber:.2f}")
+    finally:
+        db.close()
+
+def cmd_migrar(args):
+    """Aplica as migrações pendentes e mostra a versão do esquema."""
+    init_db()
+    with engine.connect() as conn:
+        print(f"Esquema na versão {migracoes.versao_atual(conn)}.")
+
+def cmd_verificar_indices(args):
+    """Confere com EXPLAIN QUERY PLAN se as consultas das telas usam índices."""
+    init_db()
+    falhas = 0
+    for descricao, sql, plano, ok in migracoes.verificar_planos(engine, SessionLocal):
+        print(f"[{'OK' if ok else 'FALHA'}] {descricao}")
+        if args.detalhes or not ok:
+            print(f"    {' '.join(sql.split())}")
+            for linha in plano:
+                print(f"      {linha}")
+        falhas += 0 if ok else 1
+    if falhas:
+        print(f"{falhas} consulta(s) fazendo varredura completa de tabela.")
+        sys.exit(1)
+
+def medir_importacao(modulo, repeticoes=3):
+    """
+    Importa o módulo em interpretadores novos (sem cache de módulos). Retorna o menor
+    tempo em ms e as dependências pesadas que a importação carregou. As importações rodam
+    em uma pasta temporária com um banco próprio: o app inicializa o banco ao ser importado.
+    """
+    codigo = (
+        "import sys, time\n"
+        "inicio = time.perf_counter()\n"
+        f"import {modulo}\n"
+        "print((time.perf_counter() - inicio) * 1000)\n"
+        f"print(','.join(m for m in {MODULOS_PESADOS!r} if m in sys.modules))\n"
+    )
+    tempos, pesados = [], ""
+    with tempfile.TemporaryDirectory(prefix="verificar_importacao_") as pasta:
+        ambiente = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(Path(__file__).resolve().parent), os.environ.get("PYTHONPATH")])),
+                        JURIS_DATABASE_URL=f"sqlite:///{(Path(pasta) / 'juris_gestao.db').as_posix()}")
+        for _ in range(repeticoes):
+            saida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                                   cwd=pasta, env=ambiente).stdout.splitlines()
+            tempos.append(float(saida[0]))
+            pesados = saida[1] if len(saida) > 1 else ""
+    return min(tempos), [m for m in pesados.split(",") if m]
+
+def cmd_verificar_importacao(args):
+    """Confere se os módulos importam dentro do orçamento de tempo e sem dependências pesadas."""
+    falhas = 0
+    for modulo, orcamento in ORCAMENTO_IMPORTACAO_MS.items():
+        tempo, pesados = medir_importacao(modulo, args.repeticoes)
+        pesados = [m for m in pesados if m not in PESADOS_PERMITIDOS.get(modulo, ())]
+        limite = orcamento * args.tolerancia
+        ok = tempo <= limite and not pesados
+        print(f"[{'OK' if ok else 'FALHA'}] {modulo}: {tempo:.0f} ms (orçamento {limite:.0f} ms)")
+        if pesados:
+            print(f"    carrega na importação: {', '.join(pesados)}")
+        falhas += 0 if ok else 1
+    if falhas:
+        print(f"{falhas} módulo(s) fora do orçamento. Use 'python -X importtime -c \"import <módulo>\"' para ver o que pesa.")
+        sys.exit(1)
+
+def cmd_resumir_processo(args):
+    """Resume todos os PDFs de um processo, mostrando cada resultado assim que fica pronto."""
+    init_db()
+    db = SessionLocal()
+    try:
+        processo = db.get(Processo, args.processo_id)
+        if processo is None:
+            print(f"Processo {args.processo_id} não encontrado.")
+            sys.exit(1)
+        pdfs = resumo_lote.pdfs_do_processo(processo.cliente.nome, processo.cliente.id, processo.numero_processo)
+    finally:
+        db.close()
+
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    cliente = ia.ClienteIALocal() if args.local else None
+    if cliente is None and not api_key:
+        print("Defina a variável de ambiente GOOGLE_API_KEY (ou use --local).")
+        sys.exit(1)
+
+    print(f"{len(pdfs)} PDF(s) no processo {processo.numero_processo}.")
+    erros = 0
+    for resultado in resumo_lote.resumir_em_lote(pdfs, api_key, cliente, args.simultaneos):
+        print(f"[{resultado['situacao']}] {resultado['arquivo']} ({resultado['segundos']:.1f}s)")
+        if args.mostrar or resultado["situacao"] == resumo_lote.ERRO:
+            print(f"    {resultado['resumo']}")
+        erros += resultado["situacao"] == resumo_lote.ERRO
+    if erros:
+        sys.exit(1)
+
+def cmd_importar_anexos(args):
+    """Move anexos gravados diretamente nas pastas dos processos para o armazenamento por conteúdo."""
+    init_db()
+    print(f"{armazenamento.importar_legado()} arquivo(s) importado(s).")
+
+def cmd_coletar_blobs(args):
+    """Apaga os conteúdos sem nenhuma referência e temporários de uploads interrompidos."""
+    init_db()
+    print(f"{armazenamento.coletar_orfaos()} arquivo(s) removido(s).")
+
+def cmd_reconciliar(args):
+    """Compara o catálogo de documentos com o disco e corrige as divergências."""
+    init_db()
+    relatorio = armazenamento.reconciliar(verificar_hash=args.verificar_hash)
+    print(f"Anexos importados das pastas dos processos: {relatorio['importados']}")
+    print(f"Referências sem conteúdo removidas: {len(relatorio['referencias_quebradas'])}")
+    for caminho in relatorio["referencias_quebradas"]:
+        print(f"    {caminho}")
+    if args.verificar_hash:
+        print(f"Referências a conteúdo corrompido removidas: {len(relatorio['corrompidos'])}")
+        for caminho in relatorio["corrompidos"]:
+            print(f"    {caminho}")
+    print(f"Tamanhos corrigidos: {relatorio['tamanhos_corrigidos']}")
+    print(f"Conteúdos sem referência apagados: {relatorio['blobs_orfaos_removidos']}")
+
+def cmd_definir_usuario(args):
+    """Cria um usuário ou troca sua senha (pedida no terminal) e, opcionalmente, o papel."""
+    import auth  # Importa o Streamlit: só carrega neste comando
+
+    init_db()
+    senha = getpass.getpass(f"Senha de {args.username}: ")
+    if not senha or senha != getpass.getpass("Confirme a senha: "):
+        print("As senhas não conferem.")
+        sys.exit(1)
+    auth.definir_senha(args.username, senha, args.papel)
+    print(f"Usuário {args.username} atualizado.")
+
+def cmd_backup(args):
+    """Cria um snapshot incremental e aplica a política de retenção."""
+    init_db()
+    manifesto = backup.criar_snapshot()
+    print(f"Snapshot {manifesto['nome']}: {len(manifesto['arquivos'])} arquivo(s), "
+          f"{len(manifesto['adicionados'])} novo(s) ou alterado(s), {manifesto['bytes_novos']} bytes copiados.")
+    if not args.sem_retencao:
+        apagados, liberados = backup.aplicar_retencao()
+        print(f"Retenção: {len(apagados)} snapshot(s) apagado(s), {liberados} bytes liberados.")
+
+def cmd_listar_backups(args):
+    """Lista os snapshots, do mais recente para o mais antigo."""
+    for s in backup.resumo_snapshots():
+        print(f"{s['nome']}  {s['criado_em']:%d/%m/%Y %H:%M:%S}  {s['arquivos']} arquivo(s)  "
+              f"+{len(s['adicionados'])} -{len(s['removidos'])}  {s['bytes_novos']} bytes copiados")
+
+def cmd_restaurar_backup(args):
+    """Recria os arquivos de um snapshot em uma pasta vazia."""
+    try:
+        destino = backup.restaurar_snapshot(args.nome, args.destino)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"Erro: {e}")
+        sys.exit(1)
+    print(f"Snapshot {args.nome} restaurado em {destino}.")
+
+def cmd_exportar_backup(args):
+    """Escreve o .zip completo de um snapshot em um arquivo ou na saída padrão."""
+    nome = args.nome or next(iter(backup.listar_snapshots()), None)
+    if nome is None:
+        print("Nenhum snapshot encontrado.", file=sys.stderr)
+        sys.exit(1)
+    if args.arquivo == "-":
+        backup.escrever_zip(nome, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+        return
+    with open(args.arquivo, "wb") as saida:
+        total = backup.escrever_zip(nome, saida)
+    print(f"Snapshot {nome} exportado para {args.arquivo} ({total} bytes).")
+
+def cmd_exportar_agenda(args):
+    """Escreve a agenda em iCalendar (.ics) em um arquivo ou na saída padrão."""
+    desde = datetime.combine(date.fromisoformat(args.desde), datetime.min.time()) if args.desde else None
+    if args.arquivo == "-":
+        agenda_ics.escrever_ics(sys.stdout.buffer, desde)
+        sys.stdout.buffer.flush()
+        return
+    with open(args.arquivo, "wb") as saida:
+        total = agenda_ics.escrever_ics(saida, desde)
+    print(f"Agenda exportada para {args.arquivo} ({total} bytes).")
+
+def cmd_servir_agenda(args):
+    """Publica o feed .ics para assinatura nos aplicativos de calendário."""
+    token = args.token or agenda_ics.TOKEN_FEED
+    if not token:
+        token = secrets.token_urlsafe(24)
+        print("JURIS_AGENDA_TOKEN não definido; token gerado para esta execução.")
+    servidor = agenda_ics.criar_servidor(args.host, args.porta, token)
+    print(f"Feed em http://{args.host}:{args.porta}{agenda_ics.CAMINHO_FEED}?token={token}")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py", description="Comandos de manutenção do JurisFlow.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    subparsers.add_parser("init-db", help="Cria as tabelas do banco de dados.").set_defaults(func=cmd_init_db)
+    subparsers.add_parser("reconstruir-resumo", help="Recalcula o resumo do dashboard.").set_defaults(func=cmd_reconstruir_resumo)
+
+    subparsers.add_parser("migrar", help="Aplica as migrações pendentes do esquema.").set_defaults(func=cmd_migrar)
+    verificar = subparsers.add_parser("verificar-indices", help="Verifica se as consultas das telas usam índices.")
+    verificar.add_argument("--detalhes", action="store_true", help="Mostra o SQL e o plano de todas as consultas.")
+    verificar.set_defaults(func=cmd_verificar_indices)
+
+    importacao = subparsers.add_parser("verificar-importacao", help="Confere o tempo de importação dos módulos.")
+    importacao.add_argument("--repeticoes", type=int, default=3, help="Medições por módulo (vale a menor).")
+    importacao.add_argument("--tolerancia", type=float, default=1.0, help="Multiplica os orçamentos (ex.: 2 em máquinas lentas).")
+    importacao.set_defaults(func=cmd_verificar_importacao)
+
+    subparsers.add_parser("importar-anexos", help="Move anexos antigos para o armazenamento por conteúdo.").set_defaults(func=cmd_importar_anexos)
+    subparsers.add_parser("coletar-blobs", help="Apaga conteúdos sem referência.").set_defaults(func=cmd_coletar_blobs)
+
+    reconciliar = subparsers.add_parser("reconciliar", help="Corrige divergências entre o catálogo de documentos e o disco.")
+    reconciliar.add_argument("--verificar-hash", action="store_true", help="Relê cada conteúdo e confere o SHA-256.")
+    reconciliar.set_defaults(func=cmd_reconciliar)
+
+    usuario = subparsers.add_parser("definir-usuario", help="Cria um usuário ou troca sua senha.")
+    usuario.add_argument("username", help="Nome de usuário.")
+    usuario.add_argument("--papel", choices=PAPEIS, help="Papel do usuário (novo usuário: usuario).")
+    usuario.set_defaults(func=cmd_definir_usuario)
+
+    criar_backup = subparsers.add_parser("backup", help="Cria um backup incremental (snapshot) de dados e banco.")
+    criar_backup.add_argument("--sem-retencao", action="store_true", help="Não apaga snapshots antigos.")
+    criar_backup.set_defaults(func=cmd_backup)
+    subparsers.add_parser("listar-backups", help="Lista os snapshots de backup.").set_defaults(func=cmd_listar_backups)
+    restaurar = subparsers.add_parser("restaurar-backup", help="Recria os arquivos de um snapshot em uma pasta vazia.")
+    restaurar.add_argument("nome", help="Nome do snapshot (ver listar-backups).")
+    restaurar.add_argument("destino", help="Pasta de destino (nova ou vazia).")
+    restaurar.set_defaults(func=cmd_restaurar_backup)
+
+    exportar = subparsers.add_parser("exportar-backup", help="Gera o .zip completo de um snapshot.")
+    exportar.add_argument("arquivo", help="Arquivo de saída ('-' para a saída padrão).")
+    exportar.add_argument("--nome", help="Nome do snapshot (padrão: o mais recente).")
+    exportar.set_defaults(func=cmd_exportar_backup)
+
+    exportar_agenda = subparsers.add_parser("exportar-agenda", help="Exporta a agenda em iCalendar (.ics).")
+    exportar_agenda.add_argument("arquivo", help="Arquivo de saída ('-' para a saída padrão).")
+    exportar_agenda.add_argument("--desde", help=f"Data inicial AAAA-MM-DD (padrão: {agenda_ics.DIAS_PASSADOS} dias atrás).")
+    exportar_agenda.set_defaults(func=cmd_exportar_agenda)
+
+    servir_agenda = subparsers.add_parser("servir-agenda", help="Publica a agenda (.ics) para assinatura em calendários.")
+    servir_agenda.add_argument("--host", default="127.0.0.1", help="Endereço de escuta (padrão: 127.0.0.1).")
+    servir_agenda.add_argument("--porta", type=int, default=8601, help="Porta (padrão: 8601).")
+    servir_agenda.add_argument("--token", help="Token de acesso (padrão: JURIS_AGENDA_TOKEN).")
+    servir_agenda.set_defaults(func=cmd_servir_agenda)
+
+    resumir = subparsers.add_parser("resumir-processo", help="Resume com IA todos os PDFs de um processo.")
+    resumir.add_argument("processo_id", type=int, help="Id do processo.")
+    resumir.add_argument("--simultaneos", type=int, help="Documentos processados ao mesmo tempo.")
+    resumir.add_argument("--mostrar", action="store_true", help="Imprime o texto de cada resumo.")
+    resumir.add_argument("--local", action="store_true", help="Usa o cliente local de testes em vez da API.")
+    resumir.set_defaults(func=cmd_resumir_processo)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
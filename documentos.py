@@ -0,0 +1,124 @@
+import io
+import os
+import threading
+import zipfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import jinja2
+from docxtpl import DocxTemplate
+
+# --- Geração de Documentos a partir de Modelos Word ---
+# Cada arquivo .docx em templates/ é um modelo; "template_procuracao.docx" vira o modelo
+# "procuracao". O conteúdo do modelo fica em memória junto com um ambiente Jinja que guarda
+# os trechos já compilados, então só o primeiro documento paga a leitura e a compilação.
+# Se o arquivo do modelo for alterado (mtime), ele é recarregado na próxima geração.
+# Lotes grandes são gerados em processos separados e gravados em um único .zip.
+
+TEMPLATES_DIR = Path("templates")
+PREFIXO_MODELO = "template_"
+
+# Processos usados na geração em lote; lotes menores que o mínimo são gerados no próprio processo.
+# Cada processo novo ('spawn') reimporta docxtpl e jinja2 antes do primeiro documento (~0,6 a
+# 1,7 s por lote, contra 6 a 30 ms por documento no próprio processo): com 4 núcleos, a
+# divisão só compensa a partir de uns 100 a 150 documentos.
+PROCESSOS_DOCUMENTOS = int(os.environ.get("JURIS_DOCUMENTOS_PROCESSOS", "0")) or os.cpu_count() or 1
+MINIMO_PARA_PROCESSOS = int(os.environ.get("JURIS_DOCUMENTOS_MINIMO_PROCESSOS", "150"))
+
+class _AmbienteCompilado(jinja2.Environment):
+    """
+    Ambiente Jinja que reaproveita os templates já compilados de um mesmo código-fonte.
+    Escapa os valores para XML, então nomes como "Silva & Filhos" não corrompem o .docx.
+    As propriedades do documento (título, assunto...) são texto, não XML, e o python-docx já
+    as escapa ao salvar: elas usam o ambiente 'texto', sem escape.
+    """
+
+    def __init__(self, autoescape=True):
+        super().__init__(autoescape=autoescape)
+        self._compilados = {}
+        self.texto = _AmbienteCompilado(autoescape=False) if autoescape else self
+
+    def from_string(self, source, globals=None, template_class=None):
+        if globals or template_class:
+            return super().from_string(source, globals, template_class)
+        compilado = self._compilados.get(source)
+        if compilado is None:
+            compilado = self._compilados[source] = super().from_string(source)
+        return compilado
+
+class _Documento(DocxTemplate):
+    """DocxTemplate que preenche as propriedades do documento sem escapar os valores para XML."""
+
+    def render_properties(self, context, jinja_env=None):
+        super().render_properties(context, jinja_env.texto if jinja_env is not None else None)
+
+_modelos = {}
+_trava = threading.Lock()
+
+def listar_modelos():
+    """Retorna {nome do modelo: caminho} dos modelos .docx da pasta templates, em ordem alfabética."""
+    if not TEMPLATES_DIR.exists():
+        return {}
+    modelos = {}
+    for caminho in sorted(TEMPLATES_DIR.glob("*.docx")):
+        if caminho.name.startswith("~$"):
+            continue  # Arquivo de trava do Word
+        nome = caminho.stem[len(PREFIXO_MODELO):] if caminho.stem.startswith(PREFIXO_MODELO) else caminho.stem
+        modelos[nome] = caminho
+    return modelos
+
+def titulo_modelo(nome):
+    """Nome do modelo para exibição (ex.: "contrato_honorarios" -> "Contrato Honorarios")."""
+    return nome.replace("_", " ").title()
+
+def _carregar(nome):
+    """Retorna (conteúdo do .docx, ambiente Jinja) do modelo, recarregando se o arquivo mudou."""
+    caminho = listar_modelos().get(nome)
+    if caminho is None:
+        raise FileNotFoundError(f"Modelo '{nome}' não encontrado na pasta '{TEMPLATES_DIR}'.")
+    mtime = caminho.stat().st_mtime_ns
+    with _trava:
+        em_cache = _modelos.get(nome)
+        if em_cache is None or em_cache[0] != (caminho, mtime):
+            em_cache = _modelos[nome] = ((caminho, mtime), caminho.read_bytes(), _AmbienteCompilado())
+    return em_cache[1], em_cache[2]
+
+def renderizar(nome, contexto):
+    """Preenche o modelo com o contexto (dict) e retorna o .docx gerado (bytes)."""
+    conteudo, ambiente = _carregar(nome)
+    doc = _Documento(io.BytesIO(conteudo))
+    doc.render(contexto, ambiente)
+    saida = io.BytesIO()
+    doc.save(saida)
+    return saida.getvalue()
+
+def _renderizar_item(item):
+    nome, contexto = item
+    return renderizar(nome, contexto)
+
+def gerar_lote(nome, documentos, saida, processos=None):
+    """
+    Gera um documento por item de 'documentos' ((nome do arquivo, contexto)) e grava todos
+    em um .zip em 'saida' (arquivo ou qualquer objeto com write), na ordem recebida, cada
+    um assim que fica pronto. Retorna quantos documentos foram gerados.
+    """
+    documentos = list(documentos)
+    _carregar(nome)  # Falha cedo se o modelo não existir
+    itens = ((nome, contexto) for _, contexto in documentos)
+    processos = processos or PROCESSOS_DOCUMENTOS
+
+    # .docx já é comprimido: o zip só armazena
+    with zipfile.ZipFile(saida, "w", zipfile.ZIP_STORED) as zf:
+        if processos <= 1 or len(documentos) < MINIMO_PARA_PROCESSOS:
+            gerados = map(_renderizar_item, itens)
+            for (arquivo, _), docx in zip(documentos, gerados):
+                zf.writestr(arquivo, docx)
+        else:
+            # 'spawn' evita fazer fork de um servidor com várias threads (Streamlit)
+            contexto_mp = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=processos, mp_context=contexto_mp) as pool:
+                lote = max(1, len(documentos) // (processos * 4))
+                for (arquivo, _), docx in zip(documentos, pool.map(_renderizar_item, itens, chunksize=lote)):
+                    zf.writestr(arquivo, docx)
+    return len(documentos)
@@ -0,0 +1,209 @@
+import os
+import io
+import time
+import hashlib
+import logging
+import threading
+import multiprocessing
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+from models import SessionLocal, executar_escrita, Documento, TextoExtraido, TarefaExtracao
+from armazenamento import caminho_blob
+
+# --- Extração de Texto de PDFs em Segundo Plano ---
+# salvar_arquivo() coloca cada PDF novo na fila (tabela tarefas_extracao). Uma thread do
+# servidor reserva as tarefas e executa a extração em um pool de processos, fora do script
+# do Streamlit. O texto vai para o cache textos_extraidos, usado pelo botão de resumo.
+
+logger = logging.getLogger(__name__)
+
+# Máximo de páginas lidas por PDF (0 = documento inteiro, padrão)
+LIMITE_PAGINAS = int(os.environ.get("JURIS_EXTRACAO_LIMITE_PAGINAS", "0")) or None
+# Separa o texto de cada página no cache, para o resumo poder dividir o documento por páginas
+SEPARADOR_PAGINA = "\f"
+PROCESSOS_EXTRACAO = int(os.environ.get("JURIS_EXTRACAO_PROCESSOS", str(min(2, os.cpu_count() or 1))))
+INTERVALO_VERIFICACAO = 2.0  # segundos entre consultas à fila quando não há tarefas
+
+NA_FILA = "Na fila"
+PROCESSANDO = "Processando"
+PRONTO = "Pronto"
+FALHOU = "Falhou"
+
+def extrair_pdf(filepath):
+    """
+    Lê o arquivo uma única vez e retorna (sha256, texto, páginas, páginas lidas, segundos).
+    As páginas do texto são separadas por SEPARADOR_PAGINA.
+    O hash é do conteúdo efetivamente lido, então um reenvio durante a extração não
+    grava o texto novo sob o hash antigo. Roda tanto no processo do app quanto no pool.
+    """
+    from pypdf import PdfReader
+
+    inicio = time.perf_counter()
+    with open(filepath, "rb") as f:
+        conteudo = f.read()
+    sha256 = hashlib.sha256(conteudo).hexdigest()
+
+    reader = PdfReader(io.BytesIO(conteudo))
+    paginas_lidas = reader.pages[:LIMITE_PAGINAS]
+    texto = SEPARADOR_PAGINA.join((page.extract_text() or "") for page in paginas_lidas)
+    return sha256, texto, len(reader.pages), len(paginas_lidas), time.perf_counter() - inicio
+
+def gravar_texto(db, sha256, texto, paginas, paginas_lidas, tempo_extracao):
+    """Grava o texto no cache, desde que algum arquivo registrado ainda tenha esse conteúdo."""
+    if db.query(Documento.id).filter(Documento.sha256 == sha256).first() is None:
+        return
+    db.merge(TextoExtraido(
+        sha256=sha256,
+        texto=texto,
+        paginas=paginas,
+        paginas_lidas=paginas_lidas,
+        tempo_extracao=tempo_extracao
+    ))
+
+def obter_texto(sha256):
+    """Retorna o texto em cache para o hash, ou None se ainda não foi extraído (ou está incompleto)."""
+    db = SessionLocal()
+    try:
+        cache = db.get(TextoExtraido, sha256)
+        if cache is None:
+            return None
+        # Textos extraídos com um limite de páginas menor que o atual são lidos de novo
+        if cache.paginas_lidas < cache.paginas and (LIMITE_PAGINAS is None or cache.paginas_lidas < LIMITE_PAGINAS):
+            return None
+        return cache.texto
+    finally:
+        db.close()
+
+# --- Fila ---
+
+def enfileirar(filepath, sha256):
+    """
+    Coloca (ou recoloca, se o conteúdo mudou) um PDF na fila de extração. 'filepath' é o
+    caminho lógico no processo; o conteúdo é lido do blob. Conteúdo já extraído (o mesmo
+    documento em outro processo) não volta para a fila.
+    """
+    path = Path(filepath)
+    ja_extraido = obter_texto(sha256) is not None
+
+    def gravar(db):
+        tarefa = db.query(TarefaExtracao).filter(TarefaExtracao.pasta == path.parent.as_posix(), TarefaExtracao.nome == path.name).first()
+        if tarefa is None:
+            tarefa = TarefaExtracao(pasta=path.parent.as_posix(), nome=path.name)
+            db.add(tarefa)
+        elif tarefa.sha256 == sha256 and tarefa.status in (PROCESSANDO, PRONTO):
+            return
+        tarefa.sha256 = sha256
+        tarefa.status = PRONTO if ja_extraido else NA_FILA
+        tarefa.erro = None
+        tarefa.atualizada_em = datetime.now()
+
+    executar_escrita(gravar)
+    _nova_tarefa.set()
+
+def cancelar(filepath):
+    """Remove da fila a tarefa de um arquivo excluído."""
+    path = Path(filepath)
+    executar_escrita(lambda db: db.query(TarefaExtracao).filter(
+        TarefaExtracao.pasta == path.parent.as_posix(), TarefaExtracao.nome == path.name
+    ).delete())
+
+def status_da_pasta(pasta):
+    """Retorna {nome do arquivo: (status, erro)} das tarefas de uma pasta, em uma consulta."""
+    db = SessionLocal()
+    try:
+        linhas = db.query(TarefaExtracao.nome, TarefaExtracao.status, TarefaExtracao.erro).filter(TarefaExtracao.pasta == Path(pasta).as_posix()).all()
+        return {nome: (status, erro) for nome, status, erro in linhas}
+    finally:
+        db.close()
+
+def _reservar_proxima():
+    """Marca a próxima tarefa da fila como 'Processando' e retorna (id, caminho), ou None."""
+    def reservar(db):
+        tarefa = db.query(TarefaExtracao).filter(TarefaExtracao.status == NA_FILA).order_by(TarefaExtracao.id).first()
+        if tarefa is None:
+            return None
+        tarefa.status = PROCESSANDO
+        tarefa.atualizada_em = datetime.now()
+        return tarefa.id, str(caminho_blob(tarefa.sha256))
+
+    return executar_escrita(reservar)
+
+def _concluir(tarefa_id, futuro):
+    """Grava o resultado de uma extração terminada (texto em cache ou erro na tarefa)."""
+    try:
+        sha256, texto, paginas, paginas_lidas, tempo = futuro.result()
+    except Exception as e:
+        def marcar_falha(db):
+            tarefa = db.get(TarefaExtracao, tarefa_id)
+            if tarefa is not None and tarefa.status == PROCESSANDO:
+                tarefa.status = FALHOU
+                tarefa.erro = str(e)
+                tarefa.atualizada_em = datetime.now()
+
+        executar_escrita(marcar_falha)
+        return
+
+    def gravar(db):
+        gravar_texto(db, sha256, texto, paginas, paginas_lidas, tempo)
+        tarefa = db.get(TarefaExtracao, tarefa_id)
+        # Se o arquivo foi reenviado durante a extração, a tarefa já voltou para a fila
+        if tarefa is not None and tarefa.status == PROCESSANDO:
+            tarefa.sha256 = sha256
+            tarefa.status = PRONTO
+            tarefa.atualizada_em = datetime.now()
+
+    executar_escrita(gravar)
+
+# --- Worker ---
+
+_nova_tarefa = threading.Event()
+_trava_inicio = threading.Lock()
+_worker = None
+
+def _executar_worker():
+    """Laço da thread do worker: distribui as tarefas da fila para o pool de processos."""
+    # 'spawn' evita fazer fork de um servidor com várias threads (Streamlit)
+    contexto = multiprocessing.get_context("spawn")
+    while True:
+        try:
+            with ProcessPoolExecutor(max_workers=PROCESSOS_EXTRACAO, mp_context=contexto) as pool:
+                em_andamento = {}
+                while True:
+                    while len(em_andamento) < PROCESSOS_EXTRACAO:
+                        proxima = _reservar_proxima()
+                        if proxima is None:
+                            break
+                        tarefa_id, caminho = proxima
+                        em_andamento[pool.submit(extrair_pdf, caminho)] = tarefa_id
+
+                    if not em_andamento:
+                        _nova_tarefa.wait(INTERVALO_VERIFICACAO)
+                        _nova_tarefa.clear()
+                        continue
+
+                    concluidos, _ = wait(em_andamento, timeout=INTERVALO_VERIFICACAO, return_when=FIRST_COMPLETED)
+                    for futuro in concluidos:
+                        _concluir(em_andamento.pop(futuro), futuro)
+        except Exception:
+            # Ex.: um processo do pool morreu; recria o pool e devolve o que estava em andamento à fila
+            logger.exception("Falha no worker de extração; reiniciando o pool")
+            _devolver_para_fila()
+            time.sleep(INTERVALO_VERIFICACAO)
+
+def _devolver_para_fila():
+    """Volta para a fila as tarefas presas em 'Processando' (worker anterior interrompido)."""
+    executar_escrita(lambda db: db.query(TarefaExtracao).filter(TarefaExtracao.status == PROCESSANDO).update(
+        {TarefaExtracao.status: NA_FILA, TarefaExtracao.atualizada_em: datetime.now()}
+    ))
+
+def iniciar_worker():
+    """Inicia (uma única vez por processo) a thread que consome a fila de extração."""
+    global _worker
+    with _trava_inicio:
+        if _worker is not None and _worker.is_alive():
+            return
+        _devolver_para_fila()
+        _worker = threading.Thread(target=_executar_worker, name="worker-extracao", daemon=True)
+        _worker.start()
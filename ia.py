@@ -0,0 +1,267 @@
+import os
+import time
+import threading
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from sqlalchemy.exc import OperationalError
+
+from models import SessionLocal, executar_escrita, ResumoIA
+from extracao import SEPARADOR_PAGINA
+
+# --- Resumos com IA (Google GenAI - Gemma 3) ---
+
+MODELO_PADRAO = "gemma-3-27b-it"
+
+# Incremente sempre que os prompts ou o pipeline de resumo mudarem: os resumos em cache
+# feitos com a versão antiga deixam de ser usados e são descartados pela política de retenção.
+VERSAO_PROMPT = 2
+PROMPT_RESUMO = """
+        Atue como um Assessor Jurídico Sênior experiente.
+        Analise o texto jurídico abaixo extraído de um arquivo PDF:
+
+        {texto}
+
+        Produza um resumo estruturado e profissional contendo:
+        1. 📄 **Tipo de Peça**: (Ex: Sentença, Petição Inicial, Agravo, Contestação)
+        2. ⚖️ **Resumo dos Fatos**: Uma narrativa cronológica breve do que aconteceu.
+        3. 🎯 **Dispositivo/Pedidos**: O que foi decidido pelo juiz ou solicitado pelas partes.
+        4. ⚠️ **Prazos e Riscos**: Destaque datas fatais, multas ou obrigações urgentes.
+        """
+
+# Documentos longos: cada bloco de páginas é resumido em paralelo (map) e os resumos
+# parciais são consolidados em um resumo final (reduce)
+PROMPT_PARCIAL = """
+        Atue como um Assessor Jurídico Sênior experiente.
+        O texto abaixo é o trecho das páginas {pagina_inicial} a {pagina_final} de um documento jurídico maior:
+
+        {texto}
+
+        Resuma este trecho de forma objetiva, preservando: tipo de peça (se identificável), fatos
+        relevantes em ordem cronológica, decisões ou pedidos, e todas as datas, prazos, valores e multas.
+        """
+PROMPT_CONSOLIDACAO = """
+        Atue como um Assessor Jurídico Sênior experiente.
+        Abaixo estão resumos parciais, em ordem, de trechos de um mesmo documento jurídico:
+
+        {resumos}
+
+        Produza um único resumo estruturado e profissional do documento inteiro contendo:
+        1. 📄 **Tipo de Peça**: (Ex: Sentença, Petição Inicial, Agravo, Contestação)
+        2. ⚖️ **Resumo dos Fatos**: Uma narrativa cronológica breve do que aconteceu.
+        3. 🎯 **Dispositivo/Pedidos**: O que foi decidido pelo juiz ou solicitado pelas partes.
+        4. ⚠️ **Prazos e Riscos**: Destaque datas fatais, multas ou obrigações urgentes.
+        """
+
+# Tamanho máximo (em caracteres) de texto enviado em cada chamada ao modelo
+TAMANHO_BLOCO = int(os.environ.get("JURIS_IA_TAMANHO_BLOCO", "60000"))
+# Níveis de consolidação dos resumos parciais antes de truncá-los em uma chamada final
+NIVEIS_CONSOLIDACAO = int(os.environ.get("JURIS_IA_NIVEIS_CONSOLIDACAO", "3"))
+# Máximo de chamadas simultâneas ao modelo por documento
+CONCORRENCIA_IA = int(os.environ.get("JURIS_IA_CONCORRENCIA", "4"))
+
+# Cota da API: máximo de chamadas por minuto feitas pelos resumos em lote (0 = sem limite)
+CHAMADAS_POR_MINUTO = int(os.environ.get("JURIS_IA_CHAMADAS_POR_MINUTO", "30"))
+
+# Política de retenção do cache de resumos
+VALIDADE_RESUMO_DIAS = int(os.environ.get("JURIS_RESUMO_VALIDADE_DIAS", "90"))
+MAXIMO_RESUMOS = int(os.environ.get("JURIS_RESUMO_MAXIMO", "5000"))
+# A data de último acesso (usada para escolher quem sai acima do limite) só é regravada
+# quando está mais velha que isto, para que ler o cache não dispute o caminho de escrita
+INTERVALO_ACESSO = timedelta(days=1)
+
+def criar_cliente(api_key):
+    """Cria o cliente da API do Google AI Studio (biblioteca 'google-genai' v1.0+)."""
+    from google import genai
+    return genai.Client(api_key=api_key)
+
+class ClienteIALocal:
+    """
+    Cliente falso com a mesma interface usada do genai.Client (client.models.generate_content).
+    Não acessa a rede: serve para testes e para rodar o sistema sem API Key.
+    """
+
+    def __init__(self, resposta=None, atraso=0.0):
+        self.resposta = resposta
+        self.atraso = atraso  # Segundos de espera por chamada, para simular a latência da API
+        self.chamadas = []
+        self.models = self
+
+    def generate_content(self, model, contents):
+        self.chamadas.append((model, contents))
+        if self.atraso:
+            time.sleep(self.atraso)
+        if callable(self.resposta):
+            texto = self.resposta(contents)
+        elif self.resposta is not None:
+            texto = self.resposta
+        else:
+            texto = f"[Resumo local gerado por {model} a partir de {len(contents)} caracteres]"
+        return SimpleNamespace(text=texto)
+
+class LimitadorTaxa:
+    """
+    Espaça as chamadas para no máximo 'por_minuto' por minuto (0 = sem limite).
+    Seguro entre threads: as chamadas dos blocos e dos documentos dividem a mesma cota.
+    """
+
+    def __init__(self, por_minuto):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self._proxima = 0.0
+        self._trava = threading.Lock()
+
+    def aguardar(self):
+        """Bloqueia até o horário reservado para a próxima chamada."""
+        with self._trava:
+            agora = time.monotonic()
+            horario = max(agora, self._proxima)
+            self._proxima = horario + self.intervalo
+        if horario > agora:
+            time.sleep(horario - agora)
+
+class ClienteLimitado:
+    """Envolve um cliente (genai.Client ou ClienteIALocal) aplicando um LimitadorTaxa a cada chamada."""
+
+    def __init__(self, cliente, limitador):
+        self.cliente = cliente
+        self.limitador = limitador
+        self.models = self
+
+    def generate_content(self, model, contents):
+        self.limitador.aguardar()
+        return self.cliente.models.generate_content(model=model, contents=contents)
+
+# Uma cota por processo do servidor, compartilhada por todas as sessões
+limitador_api = LimitadorTaxa(CHAMADAS_POR_MINUTO)
+
+def _chamar_modelo(cliente, modelo, prompt):
+    """Faz uma chamada de geração de conteúdo e retorna o texto da resposta."""
+    return cliente.models.generate_content(model=modelo, contents=prompt).text
+
+def dividir_em_blocos(texto, tamanho_bloco=None):
+    """
+    Divide o texto em blocos de até tamanho_bloco caracteres sem quebrar páginas
+    (apenas uma página maior que o bloco é cortada). Retorna [(pág. inicial, pág. final, texto)].
+    """
+    tamanho_bloco = tamanho_bloco or TAMANHO_BLOCO
+    blocos = []
+    atual, inicio, tamanho = [], 1, 0
+
+    for numero, pagina in enumerate(texto.split(SEPARADOR_PAGINA), start=1):
+        if atual and tamanho + len(pagina) > tamanho_bloco:
+            blocos.append((inicio, numero - 1, "\n".join(atual)))
+            atual, tamanho = [], 0
+        if len(pagina) > tamanho_bloco:
+            for i in range(0, len(pagina), tamanho_bloco):
+                blocos.append((numero, numero, pagina[i:i + tamanho_bloco]))
+            continue
+        if not atual:
+            inicio = numero
+        atual.append(pagina)
+        tamanho += len(pagina) + 1
+
+    if atual:
+        blocos.append((inicio, numero, "\n".join(atual)))
+    return blocos
+
+def _resumir_blocos(blocos, cliente, modelo, concorrencia):
+    """Etapa map: resume os blocos em paralelo (no máximo 'concorrencia' chamadas ao mesmo tempo)."""
+    def resumir(bloco):
+        inicio, fim, texto = bloco
+        return inicio, fim, _chamar_modelo(cliente, modelo, PROMPT_PARCIAL.format(pagina_inicial=inicio, pagina_final=fim, texto=texto))
+
+    with ThreadPoolExecutor(max_workers=max(1, concorrencia)) as pool:
+        return list(pool.map(resumir, blocos))
+
+def _consolidar(parciais, cliente, modelo, concorrencia, nivel=1):
+    """
+    Etapa reduce: junta os resumos parciais; se não couberem em uma chamada, reduz em níveis.
+    Sem progresso (o modelo devolveu resumos do tamanho do bloco) ou após NIVEIS_CONSOLIDACAO
+    níveis, trunca cada resumo parcial e faz a consolidação final assim mesmo.
+    """
+    secoes = [f"### Páginas {inicio} a {fim}\n{resumo}" for inicio, fim, resumo in parciais]
+    if sum(len(s) + 2 for s in secoes) <= TAMANHO_BLOCO or len(parciais) == 1:
+        return _chamar_modelo(cliente, modelo, PROMPT_CONSOLIDACAO.format(resumos="\n\n".join(secoes)[:TAMANHO_BLOCO]))
+
+    # Agrupa resumos parciais vizinhos em blocos e resume cada grupo antes de consolidar
+    grupos, atual, tamanho = [], [], 0
+    for parcial, secao in zip(parciais, secoes):
+        if atual and tamanho + len(secao) > TAMANHO_BLOCO:
+            grupos.append(atual)
+            atual, tamanho = [], 0
+        atual.append((parcial, secao))
+        tamanho += len(secao) + 2
+    grupos.append(atual)
+
+    if len(grupos) >= len(parciais) or nivel >= NIVEIS_CONSOLIDACAO:
+        # Cada trecho entra com a mesma fatia do bloco, para nenhum ficar de fora
+        fatia = max(1, TAMANHO_BLOCO // len(secoes) - 2)
+        resumos = "\n\n".join(secao[:fatia] for secao in secoes)
+        return _chamar_modelo(cliente, modelo, PROMPT_CONSOLIDACAO.format(resumos=resumos[:TAMANHO_BLOCO]))
+
+    blocos = [(g[0][0][0], g[-1][0][1], "\n\n".join(secao for _, secao in g)[:TAMANHO_BLOCO]) for g in grupos]
+    return _consolidar(_resumir_blocos(blocos, cliente, modelo, concorrencia), cliente, modelo, concorrencia, nivel + 1)
+
+def gerar_resumo(texto, cliente, modelo=MODELO_PADRAO, concorrencia=None):
+    """
+    Resume o documento inteiro e retorna o texto do resumo (exceções da API são propagadas).
+    Textos que cabem em um bloco usam uma única chamada; os maiores passam pelo map-reduce,
+    com tempo total próximo ao do bloco mais lento em vez da soma de todos.
+    """
+    blocos = dividir_em_blocos(texto)
+    if len(blocos) <= 1:
+        return _chamar_modelo(cliente, modelo, PROMPT_RESUMO.format(texto=texto.replace(SEPARADOR_PAGINA, "\n")))
+
+    parciais = _resumir_blocos(blocos, cliente, modelo, concorrencia or CONCORRENCIA_IA)
+    return _consolidar(parciais, cliente, modelo, concorrencia or CONCORRENCIA_IA)
+
+# --- Cache Persistente de Resumos ---
+
+def obter_resumo_em_cache(sha256, modelo=MODELO_PADRAO, versao_prompt=VERSAO_PROMPT):
+    """Retorna o resumo guardado para o documento, ou None se não existir ou estiver vencido."""
+    agora = datetime.now()
+    db = SessionLocal()
+    try:
+        resumo = db.query(ResumoIA.id, ResumoIA.texto, ResumoIA.criado_em, ResumoIA.acessado_em).filter(
+            ResumoIA.sha256 == sha256, ResumoIA.modelo == modelo, ResumoIA.versao_prompt == versao_prompt
+        ).first()
+    finally:
+        db.close()
+    # Vencidos são apagados pela retenção (_aplicar_retencao), no próximo guardar_resumo
+    if resumo is None or resumo.criado_em < agora - timedelta(days=VALIDADE_RESUMO_DIAS):
+        return None
+    if resumo.acessado_em is None or resumo.acessado_em < agora - INTERVALO_ACESSO:
+        _registrar_acesso(resumo.id, agora)
+    return resumo.texto
+
+def _registrar_acesso(resumo_id, agora):
+    """Atualiza a data de acesso do resumo; se o banco estiver ocupado, fica para o próximo acesso."""
+    try:
+        executar_escrita(lambda db: db.query(ResumoIA).filter(ResumoIA.id == resumo_id).update({ResumoIA.acessado_em: agora}), tentativas=1)
+    except OperationalError:
+        pass
+
+def guardar_resumo(sha256, texto, modelo=MODELO_PADRAO, versao_prompt=VERSAO_PROMPT):
+    """Guarda (ou substitui) o resumo do documento e aplica a política de retenção."""
+    def gravar(db):
+        resumo = db.query(ResumoIA).filter(
+            ResumoIA.sha256 == sha256, ResumoIA.modelo == modelo, ResumoIA.versao_prompt == versao_prompt
+        ).first()
+        if resumo is None:
+            resumo = ResumoIA(sha256=sha256, modelo=modelo, versao_prompt=versao_prompt)
+            db.add(resumo)
+        resumo.texto = texto
+        resumo.criado_em = resumo.acessado_em = datetime.now()
+        db.flush()
+        _aplicar_retencao(db)
+
+    executar_escrita(gravar)
+
+def _aplicar_retencao(db):
+    """Remove resumos vencidos e, acima do limite, os acessados há mais tempo."""
+    db.query(ResumoIA).filter(ResumoIA.criado_em < datetime.now() - timedelta(days=VALIDADE_RESUMO_DIAS)).delete()
+    excedente = db.query(func.count(ResumoIA.id)).scalar() - MAXIMO_RESUMOS
+    if excedente > 0:
+        ids = [id_ for (id_,) in db.query(ResumoIA.id).order_by(ResumoIA.acessado_em).limit(excedente)]
+        db.query(ResumoIA).filter(ResumoIA.id.in_(ids)).delete(synchronize_session=False)
@@ -0,0 +1,149 @@
+import os
+import re
+import json
+import time
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+
+# --- Instrumentação de Desempenho ---
+# Cada execução de uma tela (rerun do Streamlit) abre uma medição: os listeners do motor
+# (models.py) registram cada consulta SQL e os cronômetros registram o tempo das telas
+# (show_*) e das funções de services. A medição fica em uma ContextVar, então cada sessão
+# do Streamlit mede só o que a sua própria thread executou; threads de fundo (extração de
+# PDFs, downloads) não são contadas. Com JURIS_INSTRUMENTACAO_LOG, cada execução vira uma
+# linha JSON no arquivo indicado.
+
+ARQUIVO_LOG = os.environ.get("JURIS_INSTRUMENTACAO_LOG") or None
+
+# A mesma consulta repetida a partir deste número de vezes em uma execução sugere N+1
+LIMITE_REPETICOES = int(os.environ.get("JURIS_INSTRUMENTACAO_LIMITE_REPETICOES", "10"))
+
+_medicao_atual = contextvars.ContextVar("medicao_atual", default=None)
+_trava_log = threading.Lock()
+
+class Medicao:
+    """Consultas e tempos acumulados durante uma execução."""
+
+    def __init__(self, rotulo):
+        self.rotulo = rotulo
+        self.inicio_em = datetime.now()
+        self.inicio = time.perf_counter()
+        self.duracao = None
+        self.consultas = {}  # SQL normalizado -> [quantidade, segundos]
+        self.blocos = {}  # nome da tela/função -> [chamadas, segundos]
+
+    @property
+    def total_consultas(self):
+        return sum(quantidade for quantidade, _ in self.consultas.values())
+
+    @property
+    def tempo_consultas(self):
+        return sum(segundos for _, segundos in self.consultas.values())
+
+    def decorrido(self):
+        """Segundos desde o início (ou a duração total, se já finalizada)."""
+        return self.duracao if self.duracao is not None else time.perf_counter() - self.inicio
+
+    def repetidas(self, minimo=None):
+        """Consultas executadas ao menos 'minimo' vezes, da mais repetida para a menos: (sql, quantidade, segundos)."""
+        minimo = LIMITE_REPETICOES if minimo is None else minimo
+        itens = [(sql, q, s) for sql, (q, s) in self.consultas.items() if q >= minimo]
+        return sorted(itens, key=lambda item: item[1], reverse=True)
+
+    def mais_lentos(self, limite=10):
+        """Telas e funções que mais consumiram tempo: (nome, chamadas, segundos)."""
+        itens = [(nome, c, s) for nome, (c, s) in self.blocos.items()]
+        return sorted(itens, key=lambda item: item[2], reverse=True)[:limite]
+
+    def como_dict(self):
+        return {
+            "inicio": self.inicio_em.isoformat(timespec="milliseconds"),
+            "rotulo": self.rotulo,
+            "duracao_ms": round(self.decorrido() * 1000, 1),
+            "consultas": self.total_consultas,
+            "consultas_ms": round(self.tempo_consultas * 1000, 1),
+            "blocos": {nome: {"chamadas": c, "ms": round(s * 1000, 1)} for nome, c, s in self.mais_lentos(limite=None)},
+            "repetidas": [{"sql": sql, "vezes": q, "ms": round(s * 1000, 1)} for sql, q, s in self.repetidas()],
+        }
+
+def iniciar(rotulo=""):
+    """Abre a medição da execução atual e a retorna."""
+    medicao = Medicao(rotulo)
+    _medicao_atual.set(medicao)
+    return medicao
+
+def atual():
+    """Medição aberta nesta execução, ou None."""
+    return _medicao_atual.get()
+
+def finalizar():
+    """Fecha a medição atual, grava no log (se configurado) e a retorna."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return None
+    medicao.duracao = time.perf_counter() - medicao.inicio
+    _medicao_atual.set(None)
+    if ARQUIVO_LOG:
+        linha = json.dumps(medicao.como_dict(), ensure_ascii=False)
+        with _trava_log, open(ARQUIVO_LOG, "a", encoding="utf-8") as f:
+            f.write(linha + "\n")
+    return medicao
+
+def _normalizar_sql(sql):
+    """Junta variações da mesma consulta (espaços e listas IN de tamanhos diferentes)."""
+    sql = " ".join(sql.split())
+    return re.sub(r"\(\?(?:, \?)*\)", "(?...)", sql)
+
+def registrar_consulta(sql, segundos):
+    """Chamada pelos listeners do motor (models.py) ao fim de cada consulta."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        return
+    acumulado = medicao.consultas.setdefault(_normalizar_sql(sql), [0, 0.0])
+    acumulado[0] += 1
+    acumulado[1] += segundos
+
+def _registrar_bloco(medicao, nome, segundos):
+    acumulado = medicao.blocos.setdefault(nome, [0, 0.0])
+    acumulado[0] += 1
+    acumulado[1] += segundos
+
+@contextmanager
+def cronometrar(nome):
+    """Mede o tempo do bloco 'with' na execução atual."""
+    medicao = _medicao_atual.get()
+    if medicao is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registrar_bloco(medicao, nome, time.perf_counter() - inicio)
+
+def cronometrado(funcao, nome=None):
+    """Decorador: mede cada chamada da função na execução atual."""
+    nome = nome or funcao.__name__
+
+    @functools.wraps(funcao)
+    def envolvida(*args, **kwargs):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return funcao(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcao(*args, **kwargs)
+        finally:
+            _registrar_bloco(medicao, nome, time.perf_counter() - inicio)
+
+    return envolvida
+
+def instrumentar_modulo(namespace, prefixo):
+    """Envolve com cronometrado as funções públicas definidas no módulo (passe globals())."""
+    modulo = namespace["__name__"]
+    for nome, valor in list(namespace.items()):
+        if callable(valor) and not nome.startswith("_") and getattr(valor, "__module__", None) == modulo and not isinstance(valor, type):
+            namespace[nome] = cronometrado(valor, f"{prefixo}.{nome}")
@@ -0,0 +1,199 @@
+import re
+from datetime import datetime
+from sqlalchemy import event, text
+
+# --- Migrações Versionadas do Esquema ---
+# Cada migração é (versão, descrição, função que recebe a conexão). As versões aplicadas
+# ficam na tabela 'schema_versao' e as pendentes rodam em ordem na inicialização (init_db).
+# As migrações devem ser idempotentes (ex.: CREATE INDEX IF NOT EXISTS), pois bancos novos
+# já recebem pelo create_all tudo o que está declarado em models.py.
+
+def _m001_indices_filtros(conn):
+    """Índices compostos dos filtros quentes: agenda pendente, honorários e status."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audiencias_concluido_data_hora ON audiencias (concluido, data_hora)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_financeiro_tipo_status ON financeiro (tipo, status)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_processos_status ON processos (status)"))
+
+def _m002_indices_chaves_estrangeiras(conn):
+    """Índices das chaves estrangeiras usadas nas telas de detalhe do processo."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audiencias_processo_id_data_hora ON audiencias (processo_id, data_hora)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_diario_processo_id_data_registro ON diario (processo_id, data_registro)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_financeiro_processo_id ON financeiro (processo_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_processos_cliente_id ON processos (cliente_id)"))
+
+# Tabelas FTS5 de conteúdo externo: (tabela FTS, tabela de origem, colunas indexadas)
+TABELAS_FTS = [
+    ("clientes_fts", "clientes", ("nome", "cpf_cnpj", "observacoes")),
+    ("processos_fts", "processos", ("numero_processo", "parte_contraria", "observacoes", "estrategia")),
+    ("diario_fts", "diario", ("texto",)),
+]
+
+def _m003_busca_textual(conn):
+    """Tabelas FTS5 de clientes, processos e diário, sincronizadas por triggers."""
+    for fts, origem, colunas in TABELAS_FTS:
+        lista = ", ".join(colunas)
+        novos = ", ".join(f"new.{c}" for c in colunas)
+        antigos = ", ".join(f"old.{c}" for c in colunas)
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({lista}, "
+            f"content='{origem}', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {origem} BEGIN "
+            f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {origem} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); END"
+        ))
+        conn.execute(text(
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE ON {origem} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {lista}) VALUES ('delete', old.id, {antigos}); "
+            f"INSERT INTO {fts}(rowid, {lista}) VALUES (new.id, {novos}); END"
+        ))
+        # Indexa as linhas que já existiam antes da migração
+        conn.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+def _colunas(conn, tabela):
+    return {linha[1] for linha in conn.execute(text(f"PRAGMA table_info({tabela})"))}
+
+def _m004_metadados_documentos(conn):
+    """Tipo MIME e data de envio dos documentos anexados."""
+    colunas = _colunas(conn, "documentos")
+    if "mime" not in colunas:
+        conn.execute(text("ALTER TABLE documentos ADD COLUMN mime VARCHAR"))
+    if "enviado_em" not in colunas:
+        conn.execute(text("ALTER TABLE documentos ADD COLUMN enviado_em DATETIME"))
+
+def _m005_armazenamento_por_conteudo(conn):
+    """Move os anexos gravados nas pastas dos processos para o armazenamento por conteúdo."""
+    import armazenamento
+    armazenamento.importar_legado()
+
+def _m006_catalogo_documentos(conn):
+    """Índice do catálogo de documentos por processo ordenado pela data de envio."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_documentos_pasta_enviado_em ON documentos (pasta, enviado_em)"))
+
+def _m007_papel_usuarios(conn):
+    """Papel (admin/usuario) de cada usuário; quem já existia mantém o acesso completo."""
+    if "papel" not in _colunas(conn, "usuarios"):
+        conn.execute(text("ALTER TABLE usuarios ADD COLUMN papel VARCHAR NOT NULL DEFAULT 'usuario'"))
+        conn.execute(text("UPDATE usuarios SET papel = 'admin'"))
+
+def _m008_agenda_por_data(conn):
+    """Índice da agenda por data (janelas com concluídos e feed iCalendar)."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_audiencias_data_hora ON audiencias (data_hora)"))
+
+def _m009_versao_sessao(conn):
+    """Versão de sessão dos usuários, conferida ao restaurar a sessão pelo token da URL."""
+    if "versao_sessao" not in _colunas(conn, "usuarios"):
+        conn.execute(text("ALTER TABLE usuarios ADD COLUMN versao_sessao INTEGER NOT NULL DEFAULT 0"))
+
+MIGRACOES = [
+    (1, "Índices dos filtros de agenda, financeiro e status de processos", _m001_indices_filtros),
+    (2, "Índices das chaves estrangeiras processo_id e cliente_id", _m002_indices_chaves_estrangeiras),
+    (3, "Busca textual (FTS5) em clientes, processos e diário", _m003_busca_textual),
+    (4, "Tipo MIME e data de envio dos documentos", _m004_metadados_documentos),
+    (5, "Anexos antigos movidos para o armazenamento por conteúdo", _m005_armazenamento_por_conteudo),
+    (6, "Índice do catálogo de documentos por data de envio", _m006_catalogo_documentos),
+    (7, "Papel (admin/usuario) dos usuários", _m007_papel_usuarios),
+    (8, "Índice da agenda por data", _m008_agenda_por_data),
+    (9, "Versão de sessão dos usuários", _m009_versao_sessao),
+]
+
+def versao_atual(conn):
+    """Retorna a maior versão de migração já aplicada (0 se nenhuma)."""
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_versao ("
+        "versao INTEGER PRIMARY KEY, descricao TEXT NOT NULL, aplicada_em TEXT NOT NULL)"
+    ))
+    return conn.execute(text("SELECT COALESCE(MAX(versao), 0) FROM schema_versao")).scalar()
+
+def aplicar_migracoes(engine):
+    """Aplica, cada uma em sua própria transação, as migrações ainda não registradas."""
+    with engine.begin() as conn:
+        atual = versao_atual(conn)
+
+    aplicadas = []
+    for versao, descricao, funcao in MIGRACOES:
+        if versao <= atual:
+            continue
+        with engine.begin() as conn:
+            funcao(conn)
+            # OR IGNORE: outra sessão do Streamlit pode ter aplicado a mesma versão ao mesmo tempo
+            conn.execute(
+                text("INSERT OR IGNORE INTO schema_versao (versao, descricao, aplicada_em) VALUES (:v, :d, :a)"),
+                {"v": versao, "d": descricao, "a": datetime.now().isoformat(timespec="seconds")}
+            )
+        aplicadas.append(versao)
+    return aplicadas
+
+# --- Verificação dos Planos de Consulta ---
+
+# Tabelas grandes que nunca devem ser percorridas inteiras pelas telas
+TABELAS_QUENTES = ("processos", "audiencias", "diario", "financeiro", "documentos")
+# Ex.: "SCAN audiencias" (versões antigas do SQLite: "SCAN TABLE audiencias")
+_VARREDURA_COMPLETA = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+def _consultas_das_telas():
+    """Retorna (descrição, função) para cada consulta de tela cujo plano deve usar índice."""
+    from sqlalchemy import func
+    import repositorio
+    from models import Financeiro
+
+    janela = (datetime(2024, 1, 1), datetime(2024, 2, 1))
+
+    def soma_honorarios(db):
+        return db.query(func.sum(Financeiro.valor)).filter(Financeiro.tipo == "Honorário", Financeiro.status == "Pago").scalar()
+
+    return [
+        ("Dashboard: próximos compromissos", lambda db: repositorio.proximos_compromissos(db, limite=5)),
+        ("Dashboard: soma de honorários (reconstruir-resumo)", soma_honorarios),
+        ("Processos: lista filtrada por status", lambda db: repositorio.listar_processos(db, status="Em andamento")),
+        ("Processo: agenda", lambda db: repositorio.compromissos_do_processo(db, 1)),
+        ("Processo: financeiro", lambda db: repositorio.lancamentos_do_processo(db, 1)),
+        ("Processo: diário", lambda db: repositorio.notas_do_processo(db, 1)),
+        ("Agenda: semana pendente", lambda db: repositorio.compromissos_da_janela(db, *janela, apos=(janela[0], 0))),
+        ("Agenda: mês com concluídos", lambda db: repositorio.compromissos_da_janela(db, *janela, incluir_concluidos=True)),
+        ("Agenda: contagem de atrasados", lambda db: repositorio.contar_atrasados(db, janela[0])),
+        ("Agenda: atrasados", lambda db: repositorio.compromissos_da_janela(db, datetime.min, janela[0])),
+        ("Agenda: feed iCalendar", lambda db: repositorio.compromissos_da_janela(db, janela[0], apos=(janela[0], 0), limite=500, incluir_concluidos=True)),
+        ("Processo: documentos por data", lambda db: repositorio.documentos_do_processo(db, "dados", ordenar_por="enviado_em")),
+        ("Processo: documentos PDF", lambda db: repositorio.documentos_do_processo(db, "dados", tipo="application/pdf")),
+    ]
+
+def verificar_planos(engine, session_factory):
+    """
+    Executa as consultas das telas, roda EXPLAIN QUERY PLAN em cada SQL emitido e
+    retorna uma lista de (descrição, sql, linhas do plano, ok).
+    Uma consulta falha se fizer SCAN completo em alguma das TABELAS_QUENTES.
+    """
+    resultados = []
+    for descricao, consulta in _consultas_das_telas():
+        capturados = []
+
+        def capturar(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                capturados.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capturar)
+        db = session_factory()
+        try:
+            consulta(db)
+        finally:
+            db.close()
+            event.remove(engine, "before_cursor_execute", capturar)
+
+        with engine.connect() as conn:
+            for statement, parameters in capturados:
+                cursor = conn.connection.cursor()
+                try:
+                    plano = [linha[-1] for linha in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                finally:
+                    cursor.close()
+                varreduras = [
+                    m.group(1) for m in (_VARREDURA_COMPLETA.match(linha) for linha in plano)
+                    if m and m.group(1) in TABELAS_QUENTES
+                ]
+                resultados.append((descricao, statement, plano, not varreduras))
+    return resultados
@@ -1,21 +1,102 @@
+import os
+import threading
+import time
 import sqlalchemy
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Date, Float
-from sqlalchemy.orm import declarative_base, sessionmaker, relationship
+from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, ForeignKey, Date, Float, Index, UniqueConstraint, event, func, update, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import declarative_base, sessionmaker, relationship, Session
 from datetime import datetime
+from migracoes import aplicar_migracoes
+import instrumentacao
 
 # --- Configuração do Banco de Dados SQLite ---
-DATABASE_URL = "sqlite:///juris_gestao.db"
+# Todos os valores podem ser sobrescritos por variáveis de ambiente
+DATABASE_URL = os.environ.get("JURIS_DATABASE_URL", "sqlite:///juris_gestao.db")
+DB_BUSY_TIMEOUT_MS = int(os.environ.get("JURIS_DB_BUSY_TIMEOUT_MS", "5000"))
+DB_SYNCHRONOUS = os.environ.get("JURIS_DB_SYNCHRONOUS", "NORMAL")
+DB_CACHE_SIZE_KB = int(os.environ.get("JURIS_DB_CACHE_SIZE_KB", "65536"))
+DB_POOL_SIZE = int(os.environ.get("JURIS_DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.environ.get("JURIS_DB_MAX_OVERFLOW", "20"))
 
 # Cria a base declarativa do SQLAlchemy
 Base = declarative_base()
 
+def criar_engine(url=DATABASE_URL, busy_timeout_ms=DB_BUSY_TIMEOUT_MS, synchronous=DB_SYNCHRONOUS,
+                 cache_size_kb=DB_CACHE_SIZE_KB, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    """
+    Cria o motor de conexão com os PRAGMAs de concorrência aplicados em cada conexão.
+    Em modo WAL os leitores não esperam pelos escritores; o busy_timeout faz o escritor
+    aguardar a vez em vez de falhar com 'database is locked'.
+    """
+    # check_same_thread=False é necessário para que o SQLite funcione corretamente com o Streamlit,
+    # que executa cada sessão de navegador em uma thread própria e devolve a conexão ao pool
+    motor = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": busy_timeout_ms / 1000},
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=busy_timeout_ms / 1000,
+    )
+
+    @event.listens_for(motor, "connect")
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA cache_size=-{int(cache_size_kb)}")  # valor negativo = KiB
+        cursor.close()
+
+    # Conta e cronometra cada consulta na medição da execução atual (instrumentacao.py).
+    # O início fica no contexto da própria execução, descartado com ela: uma consulta que
+    # falha (after_cursor_execute não é chamado) não deixa nada na conexão do pool.
+    @event.listens_for(motor, "before_cursor_execute")
+    def _iniciar_consulta(conn, cursor, statement, parameters, context, executemany):
+        context._inicio_consulta = time.perf_counter()
+
+    @event.listens_for(motor, "after_cursor_execute")
+    def _finalizar_consulta(conn, cursor, statement, parameters, context, executemany):
+        instrumentacao.registrar_consulta(statement, time.perf_counter() - context._inicio_consulta)
+
+    return motor
+
 # Cria o motor de conexão
-# check_same_thread=False é necessário para que o SQLite funcione corretamente com o Streamlit
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+engine = criar_engine()
 
 # Cria a fábrica de sessões
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# --- Caminho Único de Escrita ---
+# O SQLite aceita um escritor por vez. Todas as gravações do processo passam por esta
+# trava, então as sessões do Streamlit fazem fila aqui em vez de disputar o lock do arquivo.
+_trava_escrita = threading.Lock()
+
+def confirmar(db):
+    """Confirma (commit) as alterações pendentes da sessão pelo caminho único de escrita."""
+    with _trava_escrita:
+        db.commit()
+
+def executar_escrita(funcao, tentativas=3, espera=0.2):
+    """
+    Executa funcao(db) em uma sessão nova e confirma pelo caminho único de escrita.
+    Se outro processo mantiver o banco bloqueado além do busy_timeout, a transação
+    inteira é refeita. Retorne apenas valores simples: a sessão é fechada ao final.
+    """
+    for tentativa in range(1, tentativas + 1):
+        db = SessionLocal()
+        try:
+            with _trava_escrita:
+                resultado = funcao(db)
+                db.commit()
+            return resultado
+        except OperationalError as e:
+            db.rollback()
+            if "database is locked" not in str(e) or tentativa == tentativas:
+                raise
+            time.sleep(espera * tentativa)
+        finally:
+            db.close()
+
 def get_db():
     """
     Função geradora para obter uma sessão do banco de dados de forma segura.
@@ -29,6 +110,11 @@ def get_db():
 
 # --- Definição das Tabelas (Models) ---
 
+# Papéis de usuário (coluna Usuario.papel)
+PAPEL_ADMIN = "admin"
+PAPEL_USUARIO = "usuario"
+PAPEIS = (PAPEL_ADMIN, PAPEL_USUARIO)
+
 class Usuario(Base):
     """Tabela de usuários para login e autenticação."""
     __tablename__ = "usuarios"
@@ -36,6 +122,9 @@ class Usuario(Base):
     id = Column(Integer, primary_key=True, index=True)
     username = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
+    papel = Column(String, nullable=False, default=PAPEL_USUARIO, server_default=PAPEL_USUARIO)
+    # Incrementada no logout e na troca de senha ou papel: invalida os tokens de sessão emitidos
+    versao_sessao = Column(Integer, nullable=False, default=0, server_default="0")
 
 class Advogado(Base):
     """Tabela para cadastro da banca de advogados (usado nas procurações)."""
@@ -89,6 +178,12 @@ class Processo(Base):
     diario = relationship("DiarioProcessual", back_populates="processo", cascade="all, delete-orphan")
     financeiro = relationship("Financeiro", back_populates="processo", cascade="all, delete-orphan")
 
+    # Índices dos filtros mais usados (bancos antigos recebem via migracoes.py)
+    __table_args__ = (
+        Index("ix_processos_status", "status"),
+        Index("ix_processos_cliente_id", "cliente_id"),
+    )
+
 class Audiencia(Base):
     """Tabela de Compromissos (Audiências, Prazos, Reuniões)."""
     __tablename__ = "audiencias"
@@ -103,6 +198,12 @@ class Audiencia(Base):
 
     processo = relationship("Processo", back_populates="audiencias")
 
+    __table_args__ = (
+        Index("ix_audiencias_concluido_data_hora", "concluido", "data_hora"),
+        Index("ix_audiencias_processo_id_data_hora", "processo_id", "data_hora"),
+        Index("ix_audiencias_data_hora", "data_hora"),
+    )
+
 class DiarioProcessual(Base):
     """Tabela para anotações diárias e andamentos do processo."""
     __tablename__ = "diario"
@@ -114,6 +215,10 @@ class DiarioProcessual(Base):
 
     processo = relationship("Processo", back_populates="diario")
 
+    __table_args__ = (
+        Index("ix_diario_processo_id_data_registro", "processo_id", "data_registro"),
+    )
+
 class Financeiro(Base):
     """Tabela para controle de Honorários e Despesas por processo."""
     __tablename__ = "financeiro"
@@ -128,9 +233,205 @@ class Financeiro(Base):
 
     processo = relationship("Processo", back_populates="financeiro")
 
+    __table_args__ = (
+        Index("ix_financeiro_tipo_status", "tipo", "status"),
+        Index("ix_financeiro_processo_id", "processo_id"),
+    )
+
+class Documento(Base):
+    """
+    Referência de um arquivo anexado a um processo (pasta lógica + nome) ao seu conteúdo
+    no armazenamento por conteúdo (ver armazenamento.py). O hash também é a chave dos caches.
+    """
+    __tablename__ = "documentos"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pasta = Column(String, nullable=False)   # Pasta lógica do processo (ex: dados/clientes/.../arquivos_anexados)
+    nome = Column(String, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    tamanho = Column(Integer)
+    modificado_em = Column(Float)            # mtime do arquivo quando o hash foi calculado (anexos antigos)
+    mime = Column(String)
+    enviado_em = Column(DateTime)            # Data do upload (ou do primeiro registro do arquivo)
+
+    __table_args__ = (
+        UniqueConstraint("pasta", "nome", name="uq_documentos_pasta_nome"),
+        Index("ix_documentos_sha256", "sha256"),
+        Index("ix_documentos_pasta_enviado_em", "pasta", "enviado_em"),
+    )
+
+class TextoExtraido(Base):
+    """Cache do texto extraído de PDFs, indexado pelo hash do conteúdo do arquivo."""
+    __tablename__ = "textos_extraidos"
+
+    sha256 = Column(String(64), primary_key=True)
+    texto = Column(Text, nullable=False)
+    paginas = Column(Integer)                # Total de páginas do PDF
+    paginas_lidas = Column(Integer)          # Páginas efetivamente extraídas
+    tempo_extracao = Column(Float)           # Segundos gastos na extração
+    extraido_em = Column(DateTime, default=datetime.now)
+
+class ResumoIA(Base):
+    """Cache dos resumos gerados pela IA, por (hash do documento, modelo, versão do prompt)."""
+    __tablename__ = "resumos_ia"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False)
+    modelo = Column(String, nullable=False)
+    versao_prompt = Column(Integer, nullable=False)
+    texto = Column(Text, nullable=False)
+    criado_em = Column(DateTime, default=datetime.now)
+    acessado_em = Column(DateTime, default=datetime.now)  # Usado para descartar os menos usados
+
+    __table_args__ = (
+        UniqueConstraint("sha256", "modelo", "versao_prompt", name="uq_resumos_ia_chave"),
+        Index("ix_resumos_ia_acessado_em", "acessado_em"),
+    )
+
+class TarefaExtracao(Base):
+    """Fila de extração de texto dos PDFs enviados (processada em segundo plano por extracao.py)."""
+    __tablename__ = "tarefas_extracao"
+
+    id = Column(Integer, primary_key=True, index=True)
+    pasta = Column(String, nullable=False)
+    nome = Column(String, nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    status = Column(String, nullable=False, default="Na fila") # 'Na fila', 'Processando', 'Pronto' ou 'Falhou'
+    erro = Column(Text)
+    criada_em = Column(DateTime, default=datetime.now)
+    atualizada_em = Column(DateTime, default=datetime.now)
+
+    __table_args__ = (
+        UniqueConstraint("pasta", "nome", name="uq_tarefas_extracao_pasta_nome"),
+        Index("ix_tarefas_extracao_status", "status", "id"),
+    )
+
+class ResumoDashboard(Base):
+    """Tabela de linha única com os totais do dashboard, mantida pelos eventos do ORM."""
+    __tablename__ = "resumo_dashboard"
+
+    id = Column(Integer, primary_key=True)
+    total_clientes = Column(Integer, nullable=False, default=0)
+    processos_ativos = Column(Integer, nullable=False, default=0)
+    honorarios_recebidos = Column(Float, nullable=False, default=0.0)
+    honorarios_a_receber = Column(Float, nullable=False, default=0.0)
+    atualizado_em = Column(DateTime, default=datetime.now)
+
+# --- Manutenção Incremental do Resumo do Dashboard ---
+# Cada flush que insere, altera ou exclui Cliente, Processo ou Financeiro aplica a
+# diferença na linha do resumo. Alterações feitas fora do ORM (UPDATE/DELETE em massa,
+# SQL direto) não disparam os eventos: use reconstruir_resumo() para corrigir.
+
+RESUMO_ID = 1
+
+def _valor_anterior(obj, campo):
+    """Retorna o valor que o atributo tinha antes das alterações pendentes do objeto."""
+    historico = inspect(obj).attrs[campo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    if historico.unchanged:
+        return historico.unchanged[0]
+    return getattr(obj, campo)
+
+def _peso_processo(status):
+    """Retorna 1 se o processo conta como 'Em andamento' no dashboard."""
+    return 1 if status == "Em andamento" else 0
+
+def _peso_financeiro(tipo, status, valor):
+    """Retorna a contribuição (recebido, a receber) de um lançamento para o dashboard."""
+    if tipo != "Honorário":
+        return 0.0, 0.0
+    valor = valor or 0.0
+    return (valor if status == "Pago" else 0.0, valor if status == "Pendente" else 0.0)
+
+def _carregar_valor_anterior(target, value, oldvalue, initiator):
+    """Listener vazio: existe apenas para ativar o active_history do atributo."""
+
+# Com active_history o ORM carrega o valor antigo mesmo se o atributo estiver expirado
+# (ex.: após um commit), permitindo calcular a diferença no flush.
+for _atributo in (Processo.status, Financeiro.tipo, Financeiro.status, Financeiro.valor):
+    event.listen(_atributo, "set", _carregar_valor_anterior, active_history=True)
+
+@event.listens_for(Session, "after_flush")
+def _atualizar_resumo(session, flush_context):
+    """Aplica na tabela de resumo a variação causada pelo flush atual."""
+    clientes = processos = 0
+    recebidos = a_receber = 0.0
+
+    for obj in session.new:
+        if isinstance(obj, Cliente):
+            clientes += 1
+        elif isinstance(obj, Processo):
+            processos += _peso_processo(obj.status)
+        elif isinstance(obj, Financeiro):
+            pago, pendente = _peso_financeiro(obj.tipo, obj.status, obj.valor)
+            recebidos += pago
+            a_receber += pendente
+
+    for obj in session.deleted:
+        if isinstance(obj, Cliente):
+            clientes -= 1
+        elif isinstance(obj, Processo):
+            processos -= _peso_processo(_valor_anterior(obj, "status"))
+        elif isinstance(obj, Financeiro):
+            pago, pendente = _peso_financeiro(*(_valor_anterior(obj, c) for c in ("tipo", "status", "valor")))
+            recebidos -= pago
+            a_receber -= pendente
+
+    for obj in session.dirty:
+        if isinstance(obj, Processo):
+            processos += _peso_processo(obj.status) - _peso_processo(_valor_anterior(obj, "status"))
+        elif isinstance(obj, Financeiro):
+            pago_ant, pendente_ant = _peso_financeiro(*(_valor_anterior(obj, c) for c in ("tipo", "status", "valor")))
+            pago, pendente = _peso_financeiro(obj.tipo, obj.status, obj.valor)
+            recebidos += pago - pago_ant
+            a_receber += pendente - pendente_ant
+
+    if clientes or processos or recebidos or a_receber:
+        session.connection().execute(
+            update(ResumoDashboard)
+            .where(ResumoDashboard.id == RESUMO_ID)
+            .values(
+                total_clientes=ResumoDashboard.total_clientes + clientes,
+                processos_ativos=ResumoDashboard.processos_ativos + processos,
+                honorarios_recebidos=ResumoDashboard.honorarios_recebidos + recebidos,
+                honorarios_a_receber=ResumoDashboard.honorarios_a_receber + a_receber,
+                atualizado_em=datetime.now()
+            )
+        )
+
+def reconstruir_resumo(db):
+    """Recalcula o resumo do dashboard a partir das tabelas de origem (corrige divergências)."""
+    def soma_honorarios(status):
+        return db.query(func.sum(Financeiro.valor)).filter(Financeiro.tipo == "Honorário", Financeiro.status == status).scalar() or 0.0
+
+    resumo = db.get(ResumoDashboard, RESUMO_ID)
+    if resumo is None:
+        resumo = ResumoDashboard(id=RESUMO_ID)
+        db.add(resumo)
+
+    resumo.total_clientes = db.query(func.count(Cliente.id)).scalar()
+    resumo.processos_ativos = db.query(func.count(Processo.id)).filter(Processo.status == "Em andamento").scalar()
+    resumo.honorarios_recebidos = soma_honorarios("Pago")
+    resumo.honorarios_a_receber = soma_honorarios("Pendente")
+    resumo.atualizado_em = datetime.now()
+    confirmar(db)
+    return resumo
+
 def init_db():
     """Função para criar todas as tabelas no banco de dados se elas não existirem."""
     Base.metadata.create_all(bind=engine)
 
+    # create_all não altera tabelas existentes: índices e mudanças de esquema vêm das migrações
+    aplicar_migracoes(engine)
+
+    # Bancos antigos ainda não têm a linha do resumo: calcula uma vez a partir dos dados
+    db = SessionLocal()
+    try:
+        if db.get(ResumoDashboard, RESUMO_ID) is None:
+            reconstruir_resumo(db)
+    finally:
+        db.close()
+
 if __name__ == "__main__":
     init_db()
\ No newline at end of file
@@ -0,0 +1,120 @@
+import os
+import threading
+from datetime import date
+
+import numpy as np
+import holidays
+
+# --- Calendário de Dias Úteis Forenses ---
+# Para uma faixa de anos, o calendário guarda em arrays NumPy quais dias são úteis e quantos
+# dias úteis existem até cada data (soma acumulada). "N dias úteis após a data D" vira duas
+# consultas por índice, sem percorrer o prazo dia a dia.
+
+# Recesso forense (CPC, art. 220): prazos suspensos de 20 de dezembro a 20 de janeiro
+RECESSO_INICIO = (12, 20)
+RECESSO_FIM = (1, 20)
+
+# Faixa inicial de anos do calendário; consultas fora dela ampliam a faixa automaticamente
+ANOS_ANTES = 2
+ANOS_DEPOIS = 5
+
+# Configuração padrão do escritório: UF (subdivisão do 'holidays') e feriados municipais "DD/MM"
+UF_PADRAO = os.environ.get("JURIS_PRAZOS_UF") or None
+FERIADOS_MUNICIPAIS_PADRAO = os.environ.get("JURIS_PRAZOS_FERIADOS_MUNICIPAIS", "")
+
+def ler_feriados_municipais(texto):
+    """Converte "20/01, 25/01" em ((1, 20), (1, 25)) (mês, dia). Lança ValueError se inválido."""
+    feriados = []
+    for item in (texto or "").replace(";", ",").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        dia, mes = (int(parte) for parte in item.split("/"))
+        date(2024, mes, dia)  # Valida o dia (2024 é bissexto: aceita 29/02)
+        feriados.append((mes, dia))
+    return tuple(sorted(set(feriados)))
+
+class CalendarioForense:
+    """
+    Dias úteis de ano_inicio a ano_fim: segunda a sexta, exceto feriados nacionais,
+    estaduais (uf), municipais ((mês, dia) repetidos todo ano) e, opcionalmente, o recesso.
+    """
+
+    def __init__(self, ano_inicio, ano_fim, uf=None, feriados_municipais=(), recesso=True):
+        self.ano_inicio, self.ano_fim = ano_inicio, ano_fim
+        self.uf, self.feriados_municipais, self.recesso = uf, tuple(feriados_municipais), recesso
+
+        anos = range(ano_inicio, ano_fim + 1)
+        feriados = list(holidays.BR(subdiv=uf, years=anos).keys())
+        feriados += [date(ano, mes, dia) for ano in anos for mes, dia in self.feriados_municipais if (mes, dia) != (2, 29) or ano % 4 == 0]
+
+        self.inicio = np.datetime64(date(ano_inicio, 1, 1), "D")
+        dias = np.arange(self.inicio, np.datetime64(date(ano_fim + 1, 1, 1), "D"))
+        util = np.is_busday(dias, holidays=np.array(feriados, dtype="datetime64[D]"))
+
+        if recesso:
+            meses = dias.astype("datetime64[M]").astype(int) % 12 + 1
+            dias_mes = (dias - dias.astype("datetime64[M]")).astype(int) + 1
+            util &= ~(((meses == RECESSO_INICIO[0]) & (dias_mes >= RECESSO_INICIO[1])) | ((meses == RECESSO_FIM[0]) & (dias_mes <= RECESSO_FIM[1])))
+
+        # acumulado[i]: dias úteis do início até o dia i (inclusive); uteis[k]: índice do (k+1)-ésimo dia útil
+        self.acumulado = np.cumsum(util)
+        self.uteis = np.flatnonzero(util)
+
+    def _indices(self, datas):
+        return (np.asarray(datas, dtype="datetime64[D]") - self.inicio).astype(np.int64)
+
+    def cobre(self, datas, dias_uteis):
+        """Indica se todas as consultas (datas, dias úteis) cabem na faixa do calendário."""
+        indices = self._indices(datas)
+        if indices.size == 0:
+            return True
+        if indices.min() < 0 or indices.max() >= len(self.acumulado):
+            return False
+        return bool(np.all(self.acumulado[indices] + np.asarray(dias_uteis) <= len(self.uteis)))
+
+    def somar_dias_uteis(self, datas, dias_uteis):
+        """
+        Versão vetorizada: para cada data, o dia em que termina o prazo de N dias úteis
+        (a contagem começa no dia seguinte à data). Aceita escalares ou arrays; N <= 0
+        devolve a própria data.
+        """
+        indices = self._indices(datas)
+        dias_uteis = np.asarray(dias_uteis, dtype=np.int64)
+        posicao = np.clip(self.acumulado[indices] + dias_uteis - 1, 0, None)
+        finais = self.inicio + self.uteis[posicao]
+        return np.where(dias_uteis > 0, finais, np.asarray(datas, dtype="datetime64[D]"))
+
+_calendarios = {}
+_trava = threading.Lock()
+
+def obter_calendario(datas, dias_uteis, uf=None, feriados_municipais=(), recesso=True):
+    """Retorna o calendário em cache da configuração, ampliando a faixa de anos se preciso."""
+    chave = (uf, tuple(feriados_municipais), recesso)
+    with _trava:
+        calendario = _calendarios.get(chave)
+        if calendario is not None and calendario.cobre(datas, dias_uteis):
+            return calendario
+
+        datas_np = np.atleast_1d(np.asarray(datas, dtype="datetime64[D]"))
+        anos = datas_np.astype("datetime64[Y]").astype(int) + 1970
+        hoje = date.today().year
+        ano_inicio = min(hoje - ANOS_ANTES, int(anos.min()) if anos.size else hoje)
+        # Cada ano tem ao menos ~200 dias úteis: folga suficiente para o maior prazo pedido
+        ano_fim = max(hoje + ANOS_DEPOIS, (int(anos.max()) if anos.size else hoje) + int(np.max(dias_uteis, initial=0)) // 200 + 1)
+        if calendario is not None:
+            ano_inicio, ano_fim = min(ano_inicio, calendario.ano_inicio), max(ano_fim, calendario.ano_fim)
+
+        calendario = CalendarioForense(ano_inicio, ano_fim, uf, feriados_municipais, recesso)
+        _calendarios[chave] = calendario
+        return calendario
+
+def calcular_vencimentos(datas, dias_uteis, uf=None, feriados_municipais=(), recesso=True):
+    """Calcula em uma só passada os vencimentos de vários prazos (arrays de datas e dias úteis)."""
+    calendario = obter_calendario(datas, dias_uteis, uf, feriados_municipais, recesso)
+    return calendario.somar_dias_uteis(datas, dias_uteis)
+
+def calcular_vencimento(data_inicio, dias_uteis, uf=None, feriados_municipais=(), recesso=True):
+    """Retorna (date) o último dia de um prazo de 'dias_uteis' dias úteis contados após data_inicio."""
+    data_inicio = np.datetime64(data_inicio, "D")
+    return calcular_vencimentos(data_inicio, dias_uteis, uf, feriados_municipais, recesso).item()
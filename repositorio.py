@@ -0,0 +1,162 @@
+from sqlalchemy import or_, desc, func, tuple_
+from sqlalchemy.orm import Session, contains_eager
+
+from pathlib import Path
+
+from models import Cliente, Processo, Audiencia, DiarioProcessual, Financeiro, Advogado, Documento, ResumoDashboard, RESUMO_ID, reconstruir_resumo
+
+# Camada de acesso a dados: cada função devolve exatamente o que uma tela precisa
+# em um número fixo de consultas (sem acessos preguiçosos a relacionamentos).
+
+# --- 1. Dashboard ---
+
+def resumo_dashboard(db: Session):
+    """Retorna os indicadores do dashboard: clientes, processos ativos, recebido e a receber."""
+    # Lê a linha única mantida pelos eventos do ORM (ver models.ResumoDashboard)
+    resumo = db.get(ResumoDashboard, RESUMO_ID)
+    if resumo is None:
+        resumo = reconstruir_resumo(db)
+
+    return resumo.total_clientes, resumo.processos_ativos, resumo.honorarios_recebidos, resumo.honorarios_a_receber
+
+def proximos_compromissos(db: Session, limite=5):
+    """Retorna (data_hora, tipo, cliente, título) dos próximos compromissos pendentes em uma única consulta."""
+    return (
+        db.query(Audiencia.data_hora, Audiencia.tipo, Cliente.nome, Audiencia.titulo)
+        .join(Processo, Audiencia.processo_id == Processo.id)
+        .join(Cliente, Processo.cliente_id == Cliente.id)
+        .filter(Audiencia.concluido == 0)
+        .order_by(Audiencia.data_hora)
+        .limit(limite)
+        .all()
+    )
+
+# --- 2. Clientes e Advogados ---
+
+def listar_clientes(db: Session, termo_busca=""):
+    """Retorna os clientes, opcionalmente filtrados por nome ou CPF/CNPJ."""
+    query = db.query(Cliente)
+    if termo_busca:
+        query = query.filter(or_(Cliente.nome.ilike(f"%{termo_busca}%"), Cliente.cpf_cnpj.ilike(f"%{termo_busca}%")))
+    return query.all()
+
+def opcoes_clientes(db: Session):
+    """Retorna apenas (id, nome, cpf_cnpj) dos clientes, para uso em seletores."""
+    return db.query(Cliente.id, Cliente.nome, Cliente.cpf_cnpj).order_by(Cliente.nome).all()
+
+def clientes_por_ids(db: Session, ids):
+    """Retorna os clientes dos ids informados, em ordem alfabética."""
+    return db.query(Cliente).filter(Cliente.id.in_(list(ids))).order_by(Cliente.nome).all()
+
+def listar_advogados(db: Session):
+    """Retorna todos os advogados cadastrados."""
+    return db.query(Advogado).all()
+
+# --- 3. Processos ---
+
+def listar_processos(db: Session, status=None, tribunal=None, cliente=None, numero=None, pagina=1, por_pagina=25):
+    """
+    Retorna (total, processos da página) aplicando os filtros no SQL.
+    O cliente de cada processo já vem carregado no mesmo JOIN.
+    """
+    query = db.query(Processo).join(Processo.cliente).options(contains_eager(Processo.cliente))
+    if status:
+        query = query.filter(Processo.status == status)
+    if tribunal:
+        query = query.filter(Processo.tribunal.ilike(f"%{tribunal}%"))
+    if cliente:
+        query = query.filter(or_(Cliente.nome.ilike(f"%{cliente}%"), Cliente.cpf_cnpj.ilike(f"%{cliente}%")))
+    if numero:
+        query = query.filter(Processo.numero_processo.ilike(f"%{numero}%"))
+
+    total = query.count()
+    processos = (
+        query.order_by(desc(Processo.id))
+        .offset((pagina - 1) * por_pagina)
+        .limit(por_pagina)
+        .all()
+    )
+    return total, processos
+
+def opcoes_processos(db: Session, termo="", limite=50):
+    """
+    Retorna (id, número do processo, nome do cliente) para seletores: os que contêm o termo
+    no número ou no nome do cliente, ou os mais recentes sem termo. Limitado, então o seletor
+    não carrega a tabela inteira.
+    """
+    query = db.query(Processo.id, Processo.numero_processo, Cliente.nome).join(Cliente, Processo.cliente_id == Cliente.id)
+    if termo:
+        query = query.filter(or_(Processo.numero_processo.ilike(f"%{termo}%"), Cliente.nome.ilike(f"%{termo}%")))
+        query = query.order_by(Processo.numero_processo)
+    else:
+        query = query.order_by(desc(Processo.id))
+    return query.limit(limite).all()
+
+def compromissos_do_processo(db: Session, processo_id):
+    """Retorna os compromissos de um processo em ordem cronológica."""
+    return db.query(Audiencia).filter(Audiencia.processo_id == processo_id).order_by(Audiencia.data_hora).all()
+
+def lancamentos_do_processo(db: Session, processo_id):
+    """Retorna os lançamentos financeiros de um processo."""
+    return db.query(Financeiro).filter(Financeiro.processo_id == processo_id).all()
+
+def notas_do_processo(db: Session, processo_id):
+    """Retorna as notas do diário de um processo, da mais recente para a mais antiga."""
+    return db.query(DiarioProcessual).filter(DiarioProcessual.processo_id == processo_id).order_by(desc(DiarioProcessual.data_registro)).all()
+
+# Ordenações aceitas pelo catálogo de documentos
+ORDENACAO_DOCUMENTOS = {
+    "nome": Documento.nome,
+    "enviado_em": desc(Documento.enviado_em),
+    "tamanho": desc(Documento.tamanho),
+}
+
+def documentos_do_processo(db: Session, pasta, tipo=None, desde=None, ate=None, ordenar_por="nome"):
+    """
+    Retorna (nome, tamanho, mime, enviado_em) dos documentos da pasta do processo, direto do
+    catálogo (sem ler o disco). 'tipo' é um prefixo do MIME (ex: "application/pdf", "image/").
+    """
+    query = db.query(Documento.nome, Documento.tamanho, Documento.mime, Documento.enviado_em).filter(Documento.pasta == Path(pasta).as_posix())
+    if tipo:
+        query = query.filter(Documento.mime.startswith(tipo, autoescape=True))
+    if desde:
+        query = query.filter(Documento.enviado_em >= desde)
+    if ate:
+        query = query.filter(Documento.enviado_em < ate)
+    return query.order_by(ORDENACAO_DOCUMENTOS[ordenar_por], Documento.nome).all()
+
+# --- 4. Agenda ---
+
+def compromissos_da_janela(db: Session, inicio, fim=None, apos=None, limite=20, incluir_concluidos=False):
+    """
+    Retorna (compromissos, cursor da próxima página) entre inicio (inclusive) e fim (sem fim:
+    todos os seguintes), em ordem cronológica. Paginação por chave: 'apos' é o (data_hora, id) do último compromisso da página
+    anterior, então qualquer página custa o mesmo que a primeira (sem OFFSET). Cada item traz
+    só as colunas da tela, com o número do processo e o cliente do mesmo JOIN. O cursor é None
+    na última página.
+    """
+    query = (
+        db.query(
+            Audiencia.id, Audiencia.data_hora, Audiencia.titulo, Audiencia.tipo, Audiencia.concluido,
+            Audiencia.observacoes, Processo.numero_processo, Cliente.nome.label("cliente_nome"),
+        )
+        .join(Processo, Audiencia.processo_id == Processo.id)
+        .join(Cliente, Processo.cliente_id == Cliente.id)
+        .filter(Audiencia.data_hora >= inicio)
+    )
+    if fim is not None:
+        query = query.filter(Audiencia.data_hora < fim)
+    if not incluir_concluidos:
+        query = query.filter(Audiencia.concluido == 0)
+    if apos is not None:
+        query = query.filter(tuple_(Audiencia.data_hora, Audiencia.id) > tuple(apos))
+
+    itens = query.order_by(Audiencia.data_hora, Audiencia.id).limit(limite + 1).all()
+    if len(itens) <= limite:
+        return itens, None
+    ultimo = itens[limite - 1]
+    return itens[:limite], (ultimo.data_hora, ultimo.id)
+
+def contar_atrasados(db: Session, antes):
+    """Retorna quantos compromissos pendentes são anteriores a 'antes' (só o índice, sem JOIN)."""
+    return db.query(func.count(Audiencia.id)).filter(Audiencia.concluido == 0, Audiencia.data_hora < antes).scalar()
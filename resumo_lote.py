@@ -0,0 +1,95 @@
+import os
+import time
+import queue
+import asyncio
+import threading
+
+import ia
+import services
+
+# --- Resumo em Lote dos PDFs de um Processo ---
+# Os documentos são processados ao mesmo tempo (asyncio + threads para a leitura do PDF e
+# para as chamadas à API). Todas as chamadas passam por ia.limitador_api, que respeita a
+# cota de chamadas por minuto. Cada resultado é entregue assim que o documento termina.
+
+# Máximo de documentos sendo lidos/resumidos ao mesmo tempo
+DOCUMENTOS_SIMULTANEOS = int(os.environ.get("JURIS_IA_DOCUMENTOS_SIMULTANEOS", "4"))
+
+EM_CACHE = "Em cache"
+GERADO = "Gerado"
+ERRO = "Erro"
+
+def pdfs_do_processo(cliente_nome, cliente_id, numero_processo):
+    """Retorna (nome, caminho do conteúdo) dos PDFs do processo, em ordem alfabética."""
+    return [
+        (nome, services.get_caminho_arquivo(cliente_nome, cliente_id, numero_processo, nome))
+        for nome in sorted(services.listar_arquivos(cliente_nome, cliente_id, numero_processo))
+        if nome.lower().endswith(".pdf")
+    ]
+
+def _resultado(arquivo, situacao, resumo, inicio):
+    nome, caminho = arquivo
+    return {"arquivo": nome, "caminho": caminho, "situacao": situacao, "resumo": resumo, "segundos": time.perf_counter() - inicio}
+
+async def resumir_arquivos(arquivos, api_key, cliente=None, simultaneos=None):
+    """
+    Gerador assíncrono: entrega um resultado (dicionário) por PDF (nome, caminho), na ordem
+    em que terminam. PDFs que já têm resumo em cache são entregues primeiro, sem chamar a API.
+    """
+    inicio = time.perf_counter()
+    pendentes = []
+    for arquivo in arquivos:
+        resumo = await asyncio.to_thread(services.resumo_em_cache, arquivo[1])
+        if resumo is not None:
+            yield _resultado(arquivo, EM_CACHE, resumo, inicio)
+        else:
+            pendentes.append(arquivo)
+    if not pendentes:
+        return
+
+    if cliente is None and api_key:
+        cliente = ia.criar_cliente(api_key)
+    if cliente is not None:
+        cliente = ia.ClienteLimitado(cliente, ia.limitador_api)
+
+    semaforo = asyncio.Semaphore(simultaneos or DOCUMENTOS_SIMULTANEOS)
+
+    async def resumir(arquivo):
+        async with semaforo:
+            inicio_doc = time.perf_counter()
+            try:
+                resumo = await asyncio.to_thread(services.resumir_documento, arquivo[1], api_key, False, cliente)
+            except Exception as e:
+                return _resultado(arquivo, ERRO, f"Erro ao resumir: {str(e)}", inicio_doc)
+            # resumir_documento devolve os erros (PDF ilegível, API) como texto
+            return _resultado(arquivo, ERRO if resumo.startswith("Erro") else GERADO, resumo, inicio_doc)
+
+    for tarefa in asyncio.as_completed([asyncio.create_task(resumir(a)) for a in pendentes]):
+        yield await tarefa
+
+def resumir_em_lote(arquivos, api_key, cliente=None, simultaneos=None):
+    """
+    Versão síncrona de resumir_arquivos, para o Streamlit e a linha de comando.
+    O laço asyncio roda em uma thread própria e os resultados chegam por uma fila; se quem
+    consome parar no meio (ex.: rerun do Streamlit), os resumos restantes continuam sendo
+    gerados e gravados no cache.
+    """
+    fila = queue.Queue()
+
+    def executar():
+        async def consumir():
+            async for resultado in resumir_arquivos(arquivos, api_key, cliente, simultaneos):
+                fila.put(resultado)
+
+        try:
+            asyncio.run(consumir())
+        except Exception as e:
+            fila.put(e)
+        finally:
+            fila.put(None)
+
+    threading.Thread(target=executar, name="resumo-lote", daemon=True).start()
+    while (item := fila.get()) is not None:
+        if isinstance(item, Exception):
+            raise item
+        yield item
@@ -1,18 +1,29 @@
 import os
-import shutil
 import re
+import hashlib
+import mimetypes
 from pathlib import Path
-from datetime import datetime, timedelta
-import holidays
-from docxtpl import DocxTemplate
+from datetime import datetime, time
 import io
-from pypdf import PdfReader
-from google import genai  # Biblioteca oficial do Google (v1.0+)
+from sqlalchemy import insert
+from models import executar_escrita, Processo, Audiencia
+import armazenamento
+import backup
+import extracao
+import ia
+import instrumentacao
+
+# Dependências pesadas (pandas, numpy, holidays, docxtpl) são importadas dentro das funções
+# que as usam: quem importa services para anexos ou backups não paga o carregamento delas.
 
 # Configuração de Diretórios Básicos
-BASE_DIR = Path("dados")
+BASE_DIR = armazenamento.BASE_DIR
 TEMPLATES_DIR = Path("templates")
 
+# Uploads: tamanho dos blocos gravados em disco e limite por arquivo (0 = sem limite)
+TAMANHO_BLOCO_UPLOAD = 1024 * 1024
+LIMITE_UPLOAD_MB = int(os.environ.get("JURIS_UPLOAD_LIMITE_MB", "200"))
+
 # --- 1. Manipulação de Arquivos e Diretórios ---
 
 def sanitize_filename(name):
@@ -57,167 +68,341 @@ def criar_estrutura_processo(cliente_nome, cliente_id, numero_processo):
     path.mkdir(parents=True, exist_ok=True)
 
 def salvar_arquivo(uploaded_file, cliente_nome, cliente_id, numero_processo):
-    """Salva um arquivo enviado pelo Streamlit na pasta correta do processo."""
+    """
+    Salva um arquivo enviado pelo Streamlit no processo.
+    O conteúdo é gravado em blocos em um arquivo temporário (calculando o SHA-256 no
+    caminho) e publicado no armazenamento por conteúdo com uma renomeação atômica: uma
+    falha no meio nunca deixa um arquivo incompleto com aparência de válido. Conteúdos já
+    armazenados (ex: a mesma procuração em outro processo) não são gravados de novo.
+    Lança ValueError se o arquivo passar de LIMITE_UPLOAD_MB.
+    """
     target_dir = get_processo_dir(cliente_nome, cliente_id, numero_processo)
-    
-    # Cria a pasta se ela não existir
-    if not target_dir.exists():
-        target_dir.mkdir(parents=True, exist_ok=True)
-    
-    file_path = target_dir / uploaded_file.name
-    with open(file_path, "wb") as f:
-        f.write(uploaded_file.getbuffer())
-    return file_path
+    temporario, sha256, tamanho = armazenamento.gravar_temporario(
+        uploaded_file, LIMITE_UPLOAD_MB * 1024 * 1024, TAMANHO_BLOCO_UPLOAD, uploaded_file.name
+    )
+    mime = getattr(uploaded_file, "type", None) or mimetypes.guess_type(uploaded_file.name)[0]
+
+    # Um reenvio com outro conteúdo troca a referência (e libera o conteúdo antigo, se órfão)
+    armazenamento.adicionar_referencia(target_dir, uploaded_file.name, temporario, sha256, tamanho, mime)
+
+    # PDFs têm o texto extraído em segundo plano, antes de alguém pedir o resumo
+    if uploaded_file.name.lower().endswith(".pdf"):
+        extracao.enfileirar(target_dir / uploaded_file.name, sha256)
+        extracao.iniciar_worker()
+    return armazenamento.caminho_blob(sha256)
 
 def listar_arquivos(cliente_nome, cliente_id, numero_processo):
-    """Retorna uma lista com os nomes dos arquivos na pasta do processo."""
-    target_dir = get_processo_dir(cliente_nome, cliente_id, numero_processo)
-    if not target_dir.exists():
-        return []
-    return [f.name for f in target_dir.iterdir() if f.is_file()]
+    """Retorna uma lista com os nomes dos arquivos do processo."""
+    return armazenamento.listar(get_processo_dir(cliente_nome, cliente_id, numero_processo))
 
 def get_caminho_arquivo(cliente_nome, cliente_id, numero_processo, filename):
-    """Retorna o caminho completo (Path) para um arquivo específico."""
+    """Retorna o caminho completo (Path) do conteúdo de um arquivo específico do processo."""
     target_dir = get_processo_dir(cliente_nome, cliente_id, numero_processo)
-    return target_dir / filename
+    return armazenamento.resolver(target_dir, filename) or target_dir / filename
 
 def excluir_arquivo(cliente_nome, cliente_id, numero_processo, filename):
-    """Exclui permanentemente um arquivo do disco."""
+    """Exclui permanentemente um arquivo do processo (o conteúdo some junto com a última referência)."""
     target_dir = get_processo_dir(cliente_nome, cliente_id, numero_processo)
-    file_path = target_dir / filename
-    if file_path.exists():
-        file_path.unlink()
+    if armazenamento.remover_referencia(target_dir, filename):
+        extracao.cancelar(target_dir / filename)
         return True
     return False
 
+def calcular_sha256(filepath, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 do conteúdo de um arquivo, lendo em blocos."""
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+def sha256_do_arquivo(filepath):
+    """SHA-256 do conteúdo; para blobs do armazenamento é o próprio nome, sem ler o arquivo."""
+    if armazenamento.eh_blob(filepath):
+        return Path(filepath).name
+    return calcular_sha256(filepath)
+
 def criar_backup():
-    """Compacta a pasta 'dados' e o banco SQLite em um arquivo .zip."""
-    backup_dir = Path("backups")
-    backup_dir.mkdir(exist_ok=True)
-    
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    zip_name = backup_dir / f"backup_completo_{timestamp}"
-    
-    # Faz uma cópia segura do banco de dados antes de zipar
-    if os.path.exists("juris_gestao.db"):
-        shutil.copy("juris_gestao.db", BASE_DIR / "database_backup.db")
-        
-    # Cria o arquivo ZIP
-    shutil.make_archive(str(zip_name), 'zip', BASE_DIR)
-    
-    # Remove a cópia temporária do banco
-    if (BASE_DIR / "database_backup.db").exists():
-        (BASE_DIR / "database_backup.db").unlink()
-        
-    return f"{zip_name}.zip"
+    """
+    Cria um snapshot incremental de 'dados' e do banco (só o que mudou é copiado) e aplica
+    a política de retenção. Retorna o manifesto do snapshot (ver backup.py).
+    """
+    manifesto = backup.criar_snapshot()
+    backup.aplicar_retencao()
+    return manifesto
 
 # --- 2. Funcionalidades Jurídicas (Prazos e Documentos) ---
 
-def calcular_prazo_util(data_inicio, dias_uteis):
-    """Calcula a data final de um prazo em dias úteis, considerando feriados BR."""
-    feriados_br = holidays.BR()
-    data_atual = data_inicio
-    dias_restantes = dias_uteis
-    
-    while dias_restantes > 0:
-        data_atual += timedelta(days=1)
-        # Se for fim de semana (5=Sábado, 6=Domingo) ou feriado, não desconta do prazo
-        if data_atual.weekday() < 5 and data_atual not in feriados_br:
-            dias_restantes -= 1
-            
-    return data_atual
+def calcular_prazo_util(data_inicio, dias_uteis, uf=None, feriados_municipais=None, recesso=True):
+    """
+    Calcula a data final de um prazo em dias úteis, considerando feriados nacionais, estaduais
+    (uf) e municipais e o recesso forense (CPC, art. 220). Sem uf/feriados_municipais, usa a
+    configuração padrão do escritório (ver prazos.py).
+    """
+    import prazos
 
-def gerar_procuracao(dados_cliente, dados_advogado):
+    if uf is None:
+        uf = prazos.UF_PADRAO
+    if feriados_municipais is None:
+        feriados_municipais = prazos.ler_feriados_municipais(prazos.FERIADOS_MUNICIPAIS_PADRAO)
+    return prazos.calcular_vencimento(data_inicio, dias_uteis, uf, feriados_municipais, recesso)
+
+# Colunas esperadas na planilha de intimações (CSV ou XLSX); "titulo" é opcional
+COLUNAS_PRAZOS_LOTE = ["numero_processo", "data_publicacao", "dias_uteis"]
+HORA_PRAZO = time(23, 59)  # Prazos lançados na agenda vencem no fim do dia
+
+def ler_planilha_prazos(arquivo, nome_arquivo=None):
     """
-    Preenche um template Word (.docx) com os dados do Cliente e do Advogado.
-    Requer o arquivo 'templates/template_procuracao.docx'.
+    Lê uma planilha de intimações (CSV ou XLSX) com as colunas de COLUNAS_PRAZOS_LOTE.
+    'arquivo' pode ser um caminho ou um arquivo enviado pelo Streamlit. Lança ValueError
+    se faltar alguma coluna.
     """
-    template_path = TEMPLATES_DIR / "template_procuracao.docx"
-    
-    if not template_path.exists():
-        return None
+    import pandas as pd
 
-    doc = DocxTemplate(template_path)
-    
-    # Dicionário de Contexto (Merge Fields)
-    # Aqui unimos os dados do cliente e do advogado
-    context = {
+    nome_arquivo = str(nome_arquivo or getattr(arquivo, "name", arquivo))
+    if nome_arquivo.lower().endswith((".xlsx", ".xls")):
+        df = pd.read_excel(arquivo, dtype={"numero_processo": str})
+    else:
+        # sep=None detecta vírgula ou ponto e vírgula (padrão do Excel em português)
+        df = pd.read_csv(arquivo, sep=None, engine="python", dtype={"numero_processo": str})
+
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    faltando = [c for c in COLUNAS_PRAZOS_LOTE if c not in df.columns]
+    if faltando:
+        raise ValueError(f"Colunas ausentes na planilha: {', '.join(faltando)}")
+    return df
+
+def _ler_datas(serie):
+    """Converte a coluna de datas (DD/MM/AAAA, ISO ou datas do Excel); inválidas viram NaT."""
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    texto = serie.astype(str).str.strip()
+    # ISO (AAAA-MM-DD) primeiro: o dayfirst=True abaixo leria "2024-03-05" como 3 de maio
+    datas = pd.to_datetime(texto, format="ISO8601", errors="coerce")
+    restantes = datas.isna() & serie.notna()
+    if restantes.any():
+        datas[restantes] = pd.to_datetime(texto[restantes], format="%d/%m/%Y", errors="coerce")
+    restantes = datas.isna() & serie.notna()
+    if restantes.any():
+        datas[restantes] = pd.to_datetime(texto[restantes], dayfirst=True, errors="coerce", format="mixed")
+    return datas
+
+def calcular_prazos_lote(df, uf=None, feriados_municipais=None, recesso=True):
+    """
+    Versão em lote de calcular_prazo_util: calcula em uma só passada o vencimento de cada
+    linha (numero_processo, data_publicacao, dias_uteis). Retorna uma cópia do DataFrame
+    com as colunas 'vencimento' (date) e 'erro' (linhas com data ou prazo inválido).
+    """
+    import numpy as np
+    import pandas as pd
+    import prazos
+
+    if uf is None:
+        uf = prazos.UF_PADRAO
+    if feriados_municipais is None:
+        feriados_municipais = prazos.ler_feriados_municipais(prazos.FERIADOS_MUNICIPAIS_PADRAO)
+
+    resultado = df.copy()
+    datas = _ler_datas(resultado["data_publicacao"])
+    dias = pd.to_numeric(resultado["dias_uteis"], errors="coerce")
+    validas = (datas.notna() & dias.notna() & (dias > 0) & (dias % 1 == 0)).to_numpy()
+
+    resultado["vencimento"] = None
+    resultado["erro"] = None
+    resultado.loc[~validas, "erro"] = "Data de publicação ou prazo inválido"
+    if validas.any():
+        vencimentos = prazos.calcular_vencimentos(
+            datas[validas].to_numpy().astype("datetime64[D]"), dias[validas].to_numpy().astype(np.int64),
+            uf, feriados_municipais, recesso
+        )
+        resultado.loc[validas, "vencimento"] = pd.Series(vencimentos.astype("datetime64[D]").tolist(), index=resultado.index[validas])
+    resultado["data_publicacao"] = datas.dt.date.where(datas.notna(), resultado["data_publicacao"])
+    return resultado
+
+def registrar_prazos_lote(resultado):
+    """
+    Lança na agenda (tipo "Prazo") as linhas calculadas por calcular_prazos_lote, em uma
+    única transação. Processos não cadastrados e prazos já lançados (mesmo processo,
+    vencimento e título) são ignorados. Retorna uma cópia com a coluna 'situacao'.
+    """
+    import pandas as pd
+
+    resultado = resultado.copy()
+    resultado["numero_processo"] = resultado["numero_processo"].astype(str).str.strip()
+    if "titulo" in resultado.columns:
+        titulos = resultado["titulo"].fillna("").astype(str).str.strip()
+    else:
+        titulos = pd.Series("", index=resultado.index)
+    resultado["titulo"] = titulos.where(titulos != "", "Prazo (" + resultado["dias_uteis"].astype(str) + " dias úteis)")
+
+    def gravar(db):
+        numeros = resultado.loc[resultado["erro"].isna(), "numero_processo"].unique().tolist()
+        ids = dict(db.query(Processo.numero_processo, Processo.id).filter(Processo.numero_processo.in_(numeros))) if numeros else {}
+        existentes = set()
+        if ids:
+            existentes = set(db.query(Audiencia.processo_id, Audiencia.data_hora, Audiencia.titulo).filter(
+                Audiencia.processo_id.in_(list(ids.values())), Audiencia.tipo == "Prazo"
+            ))
+
+        situacoes, linhas = [], []
+        for numero, vencimento, titulo, erro, publicacao in zip(
+            resultado["numero_processo"], resultado["vencimento"], resultado["titulo"], resultado["erro"], resultado["data_publicacao"]
+        ):
+            if pd.notna(erro):
+                situacoes.append(erro)
+                continue
+            if numero not in ids:
+                situacoes.append("Processo não cadastrado")
+                continue
+            chave = (ids[numero], datetime.combine(vencimento, HORA_PRAZO), titulo)
+            if chave in existentes:
+                situacoes.append("Já lançado")
+                continue
+            existentes.add(chave)
+            linhas.append({
+                "processo_id": chave[0], "data_hora": chave[1], "titulo": titulo, "tipo": "Prazo",
+                "observacoes": f"Publicação em {publicacao.strftime('%d/%m/%Y')}", "concluido": 0,
+            })
+            situacoes.append("Lançado")
+
+        if linhas:
+            db.execute(insert(Audiencia), linhas)
+        return situacoes
+
+    resultado["situacao"] = executar_escrita(gravar)
+    return resultado
+
+def contexto_documento(dados_cliente, dados_advogado):
+    """
+    Dicionário de contexto (merge fields) dos modelos Word: une os dados do cliente e do
+    advogado. Só tem valores simples, para poder ser enviado a outros processos.
+    """
+    return {
         # Dados do Cliente
         'nome_cliente': dados_cliente.nome,
         'cpf_cliente': dados_cliente.cpf_cnpj,
         'endereco_cliente': dados_cliente.endereco,
         'email_cliente': dados_cliente.email,
-        
+
         # Dados do Advogado
         'nome_advogado': dados_advogado.nome,
         'oab_advogado': dados_advogado.oab,
         'end_advogado': dados_advogado.endereco,
         'nac_advogado': dados_advogado.nacionalidade,
         'ec_advogado': dados_advogado.estado_civil,
-        
+
         # Dados Gerais
         'data_hoje': datetime.now().strftime("%d/%m/%Y")
     }
-    
-    # Renderiza o documento
-    doc.render(context)
-    
-    # Salva em memória (BytesIO) para permitir download direto
-    output = io.BytesIO()
-    doc.save(output)
-    output.seek(0)
-    return output
+
+def gerar_documento(modelo, dados_cliente, dados_advogado):
+    """
+    Preenche o modelo Word (.docx) da pasta 'templates' com os dados do Cliente e do
+    Advogado (ver documentos.py). Retorna um BytesIO, ou None se o modelo não existir.
+    """
+    import documentos
+
+    try:
+        docx = documentos.renderizar(modelo, contexto_documento(dados_cliente, dados_advogado))
+    except FileNotFoundError:
+        return None
+    # Em memória (BytesIO) para permitir download direto
+    return io.BytesIO(docx)
+
+def gerar_procuracao(dados_cliente, dados_advogado):
+    """
+    Preenche um template Word (.docx) com os dados do Cliente e do Advogado.
+    Requer o arquivo 'templates/template_procuracao.docx'.
+    """
+    return gerar_documento("procuracao", dados_cliente, dados_advogado)
+
+def gerar_documentos_lote(modelo, clientes, dados_advogado, saida):
+    """
+    Gera o documento do modelo para cada cliente (com o mesmo advogado) e grava todos em um
+    .zip em 'saida'. Retorna quantos documentos foram gerados. Lança FileNotFoundError se o
+    modelo não existir.
+    """
+    import documentos
+
+    itens = [
+        (f"{sanitize_filename(documentos.titulo_modelo(modelo))}_{sanitize_filename(cliente.nome)}_{cliente.id}.docx",
+         contexto_documento(cliente, dados_advogado))
+        for cliente in clientes
+    ]
+    return documentos.gerar_lote(modelo, itens, saida)
 
 # --- 3. Inteligência Artificial (Google GenAI - Gemma 3) ---
 
 def extrair_texto_pdf(filepath):
-    """Lê o texto de um arquivo PDF, limitando a 40 páginas para performance."""
+    """
+    Lê o texto de um arquivo PDF (páginas separadas por extracao.SEPARADOR_PAGINA).
+    O resultado fica em cache pelo hash do conteúdo: pedidos repetidos e cópias
+    idênticas do arquivo em outros processos retornam sem reprocessar o PDF.
+    """
     try:
-        reader = PdfReader(filepath)
-        text = ""
-        # Limite de segurança: lê apenas as primeiras 40 páginas
-        for page in reader.pages[:40]:
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-        return text
+        texto = obter_texto_extraido(filepath)
+        if texto is not None:
+            return texto
+
+        sha256, texto, paginas, paginas_lidas, tempo = extracao.extrair_pdf(filepath)
+        executar_escrita(lambda db: extracao.gravar_texto(db, sha256, texto, paginas, paginas_lidas, tempo))
+        return texto
     except Exception as e:
         return f"Erro ao ler PDF: {str(e)}"
 
-def resumir_com_google(texto, api_key):
+def obter_texto_extraido(filepath):
+    """Retorna o texto já extraído (em cache) do PDF, ou None se ainda não estiver pronto."""
+    return extracao.obter_texto(sha256_do_arquivo(filepath))
+
+def status_extracao(cliente_nome, cliente_id, numero_processo):
+    """Retorna {nome do arquivo: (status, erro)} da extração em segundo plano dos PDFs do processo."""
+    return extracao.status_da_pasta(get_processo_dir(cliente_nome, cliente_id, numero_processo))
+
+def resumir_com_google(texto, api_key, cliente=None):
     """
     Envia o texto para a API do Google AI Studio usando a nova biblioteca 'google-genai'.
-    Modelo configurado: gemma-3-27b-it
+    Modelo configurado: gemma-3-27b-it. 'cliente' permite usar outro cliente (ex: ia.ClienteIALocal).
     """
-    if not api_key:
+    if cliente is None and not api_key:
         return "Erro: API Key não configurada. Verifique os Secrets ou a configuração lateral."
     
     try:
-        # Inicializa o Cliente com a nova SDK (v1.0+)
-        client = genai.Client(api_key=api_key)
-        
-        # Define o modelo alvo (Gemma 3)
-        model_name = 'gemma-3-27b-it' 
-        
-        prompt = f"""
-        Atue como um Assessor Jurídico Sênior experiente.
-        Analise o texto jurídico abaixo extraído de um arquivo PDF:
-        
-        {texto[:60000]}
-        
-        Produza um resumo estruturado e profissional contendo:
-        1. 📄 **Tipo de Peça**: (Ex: Sentença, Petição Inicial, Agravo, Contestação)
-        2. ⚖️ **Resumo dos Fatos**: Uma narrativa cronológica breve do que aconteceu.
-        3. 🎯 **Dispositivo/Pedidos**: O que foi decidido pelo juiz ou solicitado pelas partes.
-        4. ⚠️ **Prazos e Riscos**: Destaque datas fatais, multas ou obrigações urgentes.
-        """
-        
-        # Chamada de geração de conteúdo
-        response = client.models.generate_content(
-            model=model_name,
-            contents=prompt
-        )
-        return response.text
+        return ia.gerar_resumo(texto, cliente or ia.criar_cliente(api_key))
+    except Exception as e:
+        return f"Erro na IA Google: {str(e)}. Verifique se a API Key está correta e se o modelo '{ia.MODELO_PADRAO}' está acessível."
 
+def resumo_em_cache(filepath):
+    """Retorna o resumo já gerado para o conteúdo deste PDF, sem chamar a API (ou None)."""
+    return ia.obter_resumo_em_cache(sha256_do_arquivo(filepath))
+
+def resumir_documento(filepath, api_key, regenerar=False, cliente=None):
+    """
+    Resume um PDF usando o cache persistente de resumos (hash do conteúdo, modelo e versão
+    do prompt). Só chama a API se não houver resumo válido ou se 'regenerar' for True.
+    """
+    sha256 = sha256_do_arquivo(filepath)
+    if not regenerar:
+        resumo = ia.obter_resumo_em_cache(sha256)
+        if resumo is not None:
+            return resumo
+
+    if cliente is None and not api_key:
+        return "Erro: API Key não configurada. Verifique os Secrets ou a configuração lateral."
+
+    texto = extrair_texto_pdf(filepath)
+    if texto.startswith("Erro ao ler PDF"):
+        return texto
+
+    try:
+        resumo = ia.gerar_resumo(texto, cliente or ia.criar_cliente(api_key))
     except Exception as e:
-        return f"Erro na IA Google: {str(e)}. Verifique se a API Key está correta e se o modelo '{model_name}' está acessível."
\ No newline at end of file
+        return f"Erro na IA Google: {str(e)}. Verifique se a API Key está correta e se o modelo '{ia.MODELO_PADRAO}' está acessível."
+
+    ia.guardar_resumo(sha256, resumo)
+    return resumo
+
+# --- Instrumentação ---
+# Cada função pública acima é cronometrada na medição da execução atual (painel de desempenho)
+instrumentacao.instrumentar_modulo(globals(), "services")
@@ -0,0 +1,27 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Os testes usam um banco e uma pasta 'dados' temporários: o motor do SQLAlchemy é criado na
+# importação de models, então a URL é definida aqui, antes de os módulos do app serem importados.
+
+RAIZ_REPOSITORIO = Path(__file__).resolve().parent.parent
+PASTA_TESTES = Path(tempfile.mkdtemp(prefix="jurisflow_testes_"))
+os.environ["JURIS_DATABASE_URL"] = f"sqlite:///{(PASTA_TESTES / 'juris_gestao.db').as_posix()}"
+sys.path.insert(0, str(RAIZ_REPOSITORIO))
+
+@pytest.fixture(scope="session", autouse=True)
+def banco():
+    """Cria o esquema e roda os testes de dentro da pasta temporária ('dados' é relativo a ela)."""
+    import models
+
+    diretorio_original = os.getcwd()
+    os.chdir(PASTA_TESTES)
+    try:
+        models.init_db()
+        yield PASTA_TESTES
+    finally:
+        os.chdir(diretorio_original)
@@ -0,0 +1,24 @@
+from datetime import datetime, timedelta
+
+import models
+import repositorio
+from models import Cliente, Processo, Audiencia
+
+def test_pendentes_anteriores_a_janela_contam_como_atrasados():
+    hoje = datetime.combine(datetime.now().date(), datetime.min.time())
+    db = models.SessionLocal()
+    try:
+        processo = Processo(numero_processo="0000001-00.2024.8.26.0001", cliente=Cliente(nome="Cliente da Agenda", cpf_cnpj="000.000.000-01"))
+        db.add_all([
+            Audiencia(processo=processo, titulo="Prazo vencido", tipo="Prazo", data_hora=hoje - timedelta(days=40)),
+            Audiencia(processo=processo, titulo="Prazo cumprido", tipo="Prazo", data_hora=hoje - timedelta(days=30), concluido=1),
+            Audiencia(processo=processo, titulo="Audiência futura", tipo="Audiência", data_hora=hoje + timedelta(days=3)),
+        ])
+        models.confirmar(db)
+
+        assert repositorio.contar_atrasados(db, hoje) == 1
+        atrasados, cursor = repositorio.compromissos_da_janela(db, datetime.min, hoje)
+        assert [a.titulo for a in atrasados] == ["Prazo vencido"] and cursor is None
+        assert repositorio.contar_atrasados(db, hoje - timedelta(days=60)) == 0
+    finally:
+        db.close()
@@ -0,0 +1,41 @@
+import io
+
+import pytest
+
+import armazenamento
+import models
+
+def _anexar(pasta, nome, conteudo):
+    temporario, sha256, tamanho = armazenamento.gravar_temporario(io.BytesIO(conteudo))
+    armazenamento.adicionar_referencia(pasta, nome, temporario, sha256, tamanho)
+    return sha256
+
+def test_blob_so_e_apagado_depois_da_confirmacao(monkeypatch):
+    sha256 = _anexar("testes/falha", "a.txt", b"conteudo que nao pode sumir")
+
+    def commit_falho(self):
+        raise RuntimeError("falha no commit")
+
+    # A remoção da referência falha na confirmação: o banco volta atrás e o blob continua lá
+    with monkeypatch.context() as m:
+        m.setattr(models.Session, "commit", commit_falho)
+        with pytest.raises(RuntimeError):
+            armazenamento.remover_referencia("testes/falha", "a.txt")
+    assert armazenamento.resolver("testes/falha", "a.txt") == armazenamento.caminho_blob(sha256)
+    assert armazenamento.caminho_blob(sha256).exists()
+
+    assert armazenamento.remover_referencia("testes/falha", "a.txt")
+    assert not armazenamento.caminho_blob(sha256).exists()
+
+def test_conteudo_compartilhado_so_sai_com_a_ultima_referencia():
+    sha256 = _anexar("testes/p1", "doc.txt", b"mesmo conteudo")
+    _anexar("testes/p2", "doc.txt", b"mesmo conteudo")
+
+    # Reenvio com outro conteúdo em p1: o anterior segue referenciado por p2
+    novo = _anexar("testes/p1", "doc.txt", b"conteudo novo")
+    assert armazenamento.caminho_blob(sha256).exists()
+
+    assert armazenamento.remover_referencia("testes/p2", "doc.txt")
+    assert not armazenamento.caminho_blob(sha256).exists()
+    assert armazenamento.caminho_blob(novo).exists()
+    assert not armazenamento.remover_referencia("testes/p2", "doc.txt")
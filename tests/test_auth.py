@@ -0,0 +1,50 @@
+from streamlit.testing.v1 import AppTest
+
+import auth
+
+def _pagina_de_login():
+    import auth
+    import streamlit as st
+
+    st.write("entrou" if auth.login_page() else "formulário")
+
+def _restaurar(token):
+    at = AppTest.from_function(_pagina_de_login, default_timeout=30)
+    at.query_params[auth.PARAMETRO_SESSAO] = token
+    at.run()
+    return at.session_state["logged_in"]
+
+def test_token_vale_ate_a_troca_de_senha(monkeypatch):
+    monkeypatch.setattr(auth, "CUSTO_BCRYPT", 4)
+    auth.definir_senha("maria", "senha1")
+    usuario = auth.check_login("maria", "senha1")
+    token = auth.emitir_token(usuario["username"], usuario["papel"], usuario["versao"])
+    assert _restaurar(token)
+
+    auth.definir_senha("maria", "senha2")
+
+    assert auth.validar_token(token) is not None  # Assinatura e validade continuam ok...
+    assert not _restaurar(token)  # ...mas a versão de sessão mudou
+    novo = auth.check_login("maria", "senha2")
+    assert _restaurar(auth.emitir_token(novo["username"], novo["papel"], novo["versao"]))
+
+def test_logout_e_troca_de_papel_invalidam_o_token(monkeypatch):
+    monkeypatch.setattr(auth, "CUSTO_BCRYPT", 4)
+    auth.definir_senha("jose", "senha")
+    usuario = auth.check_login("jose", "senha")
+    token = auth.emitir_token(usuario["username"], usuario["papel"], usuario["versao"])
+
+    auth.encerrar_sessoes("jose")
+    assert not _restaurar(token)
+
+    usuario = auth.check_login("jose", "senha")
+    token = auth.emitir_token(usuario["username"], usuario["papel"], usuario["versao"])
+    auth.definir_senha("jose", "senha", auth.ADMIN)
+    assert not _restaurar(token)
+
+def test_token_adulterado_ou_vencido_e_recusado():
+    token = auth.emitir_token("ana|x", "usuario", 0)
+    assert auth.validar_token(token)["username"] == "ana|x"
+    assert auth.validar_token(token[:-2] + "AA") is None
+    assert auth.validar_token("lixo") is None
+    assert auth.validar_token(auth.emitir_token("ana", "usuario", 0, validade_horas=-1)) is None
@@ -0,0 +1,32 @@
+import threading
+
+import armazenamento
+import backup
+
+def test_retencao_espera_o_snapshot_em_andamento():
+    armazenamento.BASE_DIR.mkdir(parents=True, exist_ok=True)
+    (armazenamento.BASE_DIR / "nota.txt").write_text("versão 1", encoding="utf-8")
+    backup.criar_snapshot()
+
+    # Outro processo (ou o cron) está no meio de um snapshot: a retenção não pode começar
+    terminou = threading.Event()
+    with backup._trava_repositorio():
+        tarefa = threading.Thread(target=lambda: (backup.aplicar_retencao(ultimos=1, diarios=0, semanais=0, mensais=0), terminou.set()))
+        tarefa.start()
+        assert not terminou.wait(0.3)
+    tarefa.join(5)
+    assert terminou.is_set()
+
+def test_retencao_mantem_os_objetos_dos_snapshots_retidos():
+    armazenamento.BASE_DIR.mkdir(parents=True, exist_ok=True)
+    nota = armazenamento.BASE_DIR / "nota.txt"
+    nota.write_text("versão antiga", encoding="utf-8")
+    backup.criar_snapshot()
+    nota.write_text("versão nova", encoding="utf-8")
+    recente = backup.criar_snapshot()
+
+    apagados, _ = backup.aplicar_retencao(ultimos=1, diarios=0, semanais=0, mensais=0)
+
+    assert recente["nome"] not in apagados
+    for arquivo in recente["arquivos"].values():
+        assert backup.caminho_objeto(arquivo["sha256"]).exists()
@@ -0,0 +1,39 @@
+import io
+import zipfile
+
+import docx
+
+import documentos
+
+def _modelo(pasta, nome):
+    """Modelo com o nome do cliente no corpo e no título do documento."""
+    modelo = docx.Document()
+    modelo.add_paragraph("Outorgante: {{ nome_cliente }}")
+    modelo.core_properties.title = "Procuração - {{ nome_cliente }}"
+    pasta.mkdir(exist_ok=True)
+    modelo.save(pasta / f"{documentos.PREFIXO_MODELO}{nome}.docx")
+
+def _ler(conteudo):
+    gerado = docx.Document(io.BytesIO(conteudo))
+    return "\n".join(p.text for p in gerado.paragraphs), gerado.core_properties.title
+
+def test_valores_com_caracteres_especiais_no_corpo_e_nas_propriedades(tmp_path, monkeypatch):
+    monkeypatch.setattr(documentos, "TEMPLATES_DIR", tmp_path / "templates")
+    _modelo(documentos.TEMPLATES_DIR, "teste_escape")
+
+    texto, titulo = _ler(documentos.renderizar("teste_escape", {"nome_cliente": "Silva & Filhos <Ltda>"}))
+
+    assert texto == "Outorgante: Silva & Filhos <Ltda>"
+    assert titulo == "Procuração - Silva & Filhos <Ltda>"
+
+def test_lote_pequeno_gerado_no_proprio_processo(tmp_path, monkeypatch):
+    monkeypatch.setattr(documentos, "TEMPLATES_DIR", tmp_path / "templates")
+    _modelo(documentos.TEMPLATES_DIR, "teste_lote")
+    itens = [(f"doc_{i}.docx", {"nome_cliente": f"Cliente {i}"}) for i in range(3)]
+
+    saida = io.BytesIO()
+    assert documentos.gerar_lote("teste_lote", itens, saida) == 3
+
+    with zipfile.ZipFile(saida) as zf:
+        assert zf.namelist() == ["doc_0.docx", "doc_1.docx", "doc_2.docx"]
+        assert _ler(zf.read("doc_2.docx"))[0] == "Outorgante: Cliente 2"
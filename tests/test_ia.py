@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import ia
+import models
+from extracao import SEPARADOR_PAGINA
+
+def _documento(paginas, tamanho):
+    return SEPARADOR_PAGINA.join(f"Página {i}: " + "x" * tamanho for i in range(1, paginas + 1))
+
+def test_documento_longo_passa_pelo_map_reduce(monkeypatch):
+    monkeypatch.setattr(ia, "TAMANHO_BLOCO", 1000)
+    cliente = ia.ClienteIALocal(resposta=lambda prompt: "resumo final" if "resumos parciais" in prompt else "parcial")
+
+    resumo = ia.gerar_resumo(_documento(10, 400), cliente, concorrencia=2)
+
+    prompts = [prompt for _, prompt in cliente.chamadas]
+    parciais = [p for p in prompts if "é o trecho das páginas" in p]
+    assert resumo == "resumo final"
+    assert len(parciais) == len(ia.dividir_em_blocos(_documento(10, 400))) > 1
+    assert len(prompts) == len(parciais) + 1
+    assert all(len(p) <= 1000 + len(ia.PROMPT_PARCIAL) for p in parciais)
+
+def test_consolidacao_termina_se_os_resumos_nao_encolhem(monkeypatch):
+    monkeypatch.setattr(ia, "TAMANHO_BLOCO", 1000)
+    # Cada resumo parcial já ocupa o bloco inteiro: reagrupar não faz progresso
+    cliente = ia.ClienteIALocal(resposta=lambda prompt: "final" if "resumos parciais" in prompt else "y" * 1000)
+
+    assert ia.gerar_resumo(_documento(10, 400), cliente, concorrencia=2) == "final"
+
+    consolidacao = cliente.chamadas[-1][1]
+    assert "resumos parciais" in consolidacao
+    assert len(consolidacao) <= 1000 + len(ia.PROMPT_CONSOLIDACAO)
+    assert consolidacao.count("### Páginas") == len(cliente.chamadas) - 1
+
+def test_consolidacao_limita_os_niveis(monkeypatch):
+    monkeypatch.setattr(ia, "TAMANHO_BLOCO", 1000)
+    monkeypatch.setattr(ia, "NIVEIS_CONSOLIDACAO", 2)
+    # Resumos que encolhem pouco: sem o limite, seriam muitos níveis de consolidação
+    cliente = ia.ClienteIALocal(resposta=lambda prompt: "final" if "resumos parciais" in prompt else "z" * 450)
+
+    assert ia.gerar_resumo(_documento(40, 900), cliente, concorrencia=4) == "final"
+
+    # 40 blocos (map), um nível de reagrupamento (pares de resumos) e a consolidação final
+    reagrupados = [p for _, p in cliente.chamadas if "é o trecho das páginas" in p and "### Páginas" in p]
+    assert len(reagrupados) == 20
+    assert len(cliente.chamadas) == 40 + 20 + 1
+    assert "resumos parciais" in cliente.chamadas[-1][1]
+
+def test_leitura_do_cache_nao_passa_pelo_caminho_de_escrita(monkeypatch):
+    ia.guardar_resumo("a" * 64, "resumo em cache")
+    escritas = []
+    monkeypatch.setattr(ia, "executar_escrita", lambda funcao, **kw: escritas.append(funcao))
+
+    assert ia.obter_resumo_em_cache("a" * 64) == "resumo em cache"
+    assert ia.obter_resumo_em_cache("b" * 64) is None
+    assert escritas == []
+
+def test_acesso_antigo_e_atualizado_e_vencido_sai_na_retencao():
+    ia.guardar_resumo("c" * 64, "acessado há dias")
+    ia.guardar_resumo("d" * 64, "vencido")
+
+    def envelhecer(db):
+        db.query(models.ResumoIA).filter(models.ResumoIA.sha256 == "c" * 64).update({models.ResumoIA.acessado_em: datetime.now() - timedelta(days=3)})
+        db.query(models.ResumoIA).filter(models.ResumoIA.sha256 == "d" * 64).update({models.ResumoIA.criado_em: datetime.now() - timedelta(days=ia.VALIDADE_RESUMO_DIAS + 1)})
+
+    models.executar_escrita(envelhecer)
+
+    assert ia.obter_resumo_em_cache("c" * 64) == "acessado há dias"
+    assert ia.obter_resumo_em_cache("d" * 64) is None
+
+    db = models.SessionLocal()
+    try:
+        acessado_em = db.query(models.ResumoIA.acessado_em).filter(models.ResumoIA.sha256 == "c" * 64).scalar()
+        assert acessado_em > datetime.now() - timedelta(minutes=1)
+    finally:
+        db.close()
+
+    ia.guardar_resumo("e" * 64, "novo")
+    db = models.SessionLocal()
+    try:
+        assert db.query(models.ResumoIA).filter(models.ResumoIA.sha256 == "d" * 64).first() is None
+    finally:
+        db.close()
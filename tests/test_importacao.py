@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+import cli
+
+# Orçamento de importação dos módulos (o mesmo do "cli.py verificar-importacao"): cada módulo
+# é importado em um interpretador novo, e dependências pesadas só podem entrar quando usadas.
+# Em máquinas lentas, JURIS_IMPORTACAO_TOLERANCIA multiplica os orçamentos (como --tolerancia).
+TOLERANCIA = float(os.environ.get("JURIS_IMPORTACAO_TOLERANCIA", "1"))
+
+@pytest.mark.parametrize("modulo", list(cli.ORCAMENTO_IMPORTACAO_MS))
+def test_importacao_dentro_do_orcamento(modulo):
+    tempo, pesados = cli.medir_importacao(modulo)
+
+    assert [m for m in pesados if m not in cli.PESADOS_PERMITIDOS.get(modulo, ())] == []
+    assert tempo <= cli.ORCAMENTO_IMPORTACAO_MS[modulo] * TOLERANCIA
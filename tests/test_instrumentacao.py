@@ -0,0 +1,23 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+import instrumentacao
+import models
+
+def test_consultas_com_erro_nao_deixam_estado_na_conexao():
+    medicao = instrumentacao.iniciar("teste")
+    try:
+        with models.engine.connect() as conn:
+            for _ in range(5):
+                with pytest.raises(OperationalError):
+                    conn.execute(text("SELECT * FROM tabela_inexistente"))
+            conn.execute(text("SELECT 1")).scalar()
+            conn.execute(text("SELECT 1")).scalar()
+            assert not any(isinstance(valor, list) for valor in conn.info.values())
+    finally:
+        instrumentacao.finalizar()
+
+    # Só as consultas concluídas entram na medição
+    assert medicao.total_consultas == 2
+    assert medicao.consultas == {"SELECT 1": [2, pytest.approx(medicao.tempo_consultas)]}
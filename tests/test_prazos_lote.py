@@ -0,0 +1,19 @@
+from datetime import date
+
+import pandas as pd
+
+import services
+
+def test_datas_iso_e_brasileiras_na_mesma_planilha():
+    df = pd.DataFrame({
+        "numero_processo": ["1", "2"],
+        "data_publicacao": ["2024-03-05", "05/03/2024"],
+        "dias_uteis": [15, 15],
+    })
+
+    resultado = services.calcular_prazos_lote(df, uf=None, feriados_municipais=[])
+
+    assert resultado["erro"].isna().all()
+    assert list(resultado["data_publicacao"]) == [date(2024, 3, 5), date(2024, 3, 5)]
+    assert resultado["vencimento"][0] == resultado["vencimento"][1]
+    assert resultado["vencimento"][0] == services.calcular_prazo_util(date(2024, 3, 5), 15, uf=None, feriados_municipais=[])
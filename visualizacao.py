@@ -0,0 +1,74 @@
+import os
+import tempfile
+from pathlib import Path
+
+import armazenamento
+
+# --- Pré-visualização de Anexos ---
+# Páginas de PDF e imagens são convertidas em PNGs reduzidos sob demanda e guardadas em
+# dados/previews/<prefixo>/<sha256>/, então cada página é renderizada uma única vez por
+# conteúdo. O navegador recebe só a imagem da página pedida, nunca o arquivo inteiro.
+# Páginas de PDF dependem do 'pypdfium2'; sem ele, a tela usa o visualizador do navegador.
+
+LARGURA_MINIATURA = 240
+LARGURA_PAGINA = 1100
+
+def suporta_pdf():
+    """Indica se o renderizador de páginas de PDF (pypdfium2) está instalado."""
+    try:
+        import pypdfium2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _salvar_png(imagem, destino):
+    """Grava a imagem PIL de forma atômica (outra sessão pode estar lendo o mesmo arquivo)."""
+    destino.parent.mkdir(parents=True, exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=destino.parent, suffix=".parcial")
+    try:
+        with os.fdopen(descritor, "wb") as f:
+            imagem.save(f, format="PNG", optimize=True)
+        os.replace(temporario, destino)
+    except BaseException:
+        Path(temporario).unlink(missing_ok=True)
+        raise
+    return destino
+
+def numero_paginas(caminho):
+    """Retorna o número de páginas do PDF (lê só a estrutura do arquivo)."""
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(str(caminho))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+def pagina_pdf(caminho, sha256, pagina, largura=LARGURA_PAGINA):
+    """Retorna o PNG (Path) da página (começando em 1) do PDF na largura pedida, renderizando se preciso."""
+    destino = armazenamento.caminho_previews(sha256) / f"p{pagina}_w{largura}.png"
+    if destino.exists():
+        return destino
+
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(str(caminho))
+    try:
+        page = pdf[pagina - 1]
+        imagem = page.render(scale=largura / page.get_width()).to_pil()
+        page.close()
+    finally:
+        pdf.close()
+    return _salvar_png(imagem, destino)
+
+def miniatura_imagem(caminho, sha256, largura=LARGURA_PAGINA):
+    """Retorna uma cópia reduzida (PNG) da imagem, para não enviar fotos de vários MB ao navegador."""
+    destino = armazenamento.caminho_previews(sha256) / f"img_w{largura}.png"
+    if destino.exists():
+        return destino
+
+    from PIL import Image
+
+    with Image.open(caminho) as imagem:
+        imagem.thumbnail((largura, largura * 4))
+        return _salvar_png(imagem.convert("RGBA") if imagem.mode == "P" else imagem, destino)
@@ -0,0 +1,151 @@
+import os
+import zlib
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# --- Escrita de ZIP com Compressão Paralela ---
+# Cada arquivo é lido em blocos e os blocos são comprimidos (deflate) ao mesmo tempo em
+# várias threads (o zlib libera o GIL). Cada bloco usa um compressor próprio terminado com
+# Z_SYNC_FLUSH, então a concatenação dos blocos, na ordem, é um único fluxo deflate válido
+# (a técnica do pigz). O ZIP é escrito sequencialmente com "data descriptors" (tamanhos e
+# CRC depois do conteúdo), então a saída pode ser um pipe ou um socket: nada é relido nem
+# precisa de seek. Arquivos ou posições acima de 4 GB usam as extensões ZIP64.
+
+TAMANHO_BLOCO = 1024 * 1024
+NIVEL_PADRAO = 6
+
+_LIMITE_32 = 0xFFFFFFFF
+_FLAG_DESCRITOR = 0x08
+_FLAG_UTF8 = 0x800
+
+def _data_dos(mtime_ns):
+    data = datetime.fromtimestamp(mtime_ns / 1e9) if mtime_ns else datetime.now()
+    if data.year < 1980:
+        data = datetime(1980, 1, 1)
+    hora = (data.hour << 11) | (data.minute << 5) | (data.second // 2)
+    dia = ((data.year - 1980) << 9) | (data.month << 5) | data.day
+    return hora, dia
+
+def _comprimir(dados, nivel, ultimo):
+    compressor = zlib.compressobj(nivel, zlib.DEFLATED, -15)
+    return compressor.compress(dados) + compressor.flush(zlib.Z_FINISH if ultimo else zlib.Z_SYNC_FLUSH)
+
+def _blocos(caminho, tamanho_bloco):
+    """Lê o arquivo em blocos, indicando qual é o último (um arquivo vazio gera um bloco vazio)."""
+    with open(caminho, "rb") as f:
+        atual = f.read(tamanho_bloco)
+        while True:
+            proximo = f.read(tamanho_bloco)
+            yield atual, not proximo
+            if not proximo:
+                return
+            atual = proximo
+
+class EscritorZipParalelo:
+    """
+    Escreve um .zip em 'saida' (qualquer objeto com write) a partir de arquivos em disco.
+    Uso: EscritorZipParalelo(saida).escrever([(nome no zip, caminho, mtime_ns), ...]).
+    """
+
+    def __init__(self, saida, nivel=NIVEL_PADRAO, trabalhadores=None, tamanho_bloco=TAMANHO_BLOCO):
+        self.saida = saida
+        self.nivel = nivel
+        self.trabalhadores = trabalhadores or os.cpu_count() or 1
+        self.tamanho_bloco = tamanho_bloco
+        self.posicao = 0
+        self.entradas = []
+
+    def _gravar(self, dados):
+        self.saida.write(dados)
+        self.posicao += len(dados)
+
+    def escrever(self, membros):
+        """Comprime e grava os membros (nome, caminho, mtime_ns) e fecha o zip. Retorna o total de bytes escritos."""
+        membros = list(membros)
+
+        def tarefas():
+            for indice, (_, caminho, _) in enumerate(membros):
+                for dados, ultimo in _blocos(caminho, self.tamanho_bloco):
+                    yield indice, dados, ultimo
+
+        # Janela limitada de blocos em andamento: a memória não cresce com o tamanho do backup
+        janela = deque()
+        with ThreadPoolExecutor(max_workers=self.trabalhadores, thread_name_prefix="zip") as executor:
+            for indice, dados, ultimo in tarefas():
+                janela.append((indice, dados, ultimo, executor.submit(_comprimir, dados, self.nivel, ultimo)))
+                if len(janela) >= self.trabalhadores * 4:
+                    self._consumir(janela.popleft(), membros)
+            while janela:
+                self._consumir(janela.popleft(), membros)
+
+        self._fechar()
+        return self.posicao
+
+    def _consumir(self, item, membros):
+        indice, dados, ultimo, futuro = item
+        if not self.entradas or self.entradas[-1]["indice"] != indice:
+            self._iniciar_membro(indice, *membros[indice])
+        entrada = self.entradas[-1]
+        comprimido = futuro.result()
+        entrada["crc"] = zlib.crc32(dados, entrada["crc"])
+        entrada["tamanho"] += len(dados)
+        entrada["comprimido"] += len(comprimido)
+        self._gravar(comprimido)
+        if ultimo:
+            self._finalizar_membro(entrada)
+
+    def _iniciar_membro(self, indice, nome, caminho, mtime_ns):
+        nome = nome.encode("utf-8")
+        # O tamanho final ainda não é conhecido: arquivos grandes já começam em ZIP64
+        zip64 = os.path.getsize(caminho) >= _LIMITE_32 - (1 << 24)
+        hora, dia = _data_dos(mtime_ns)
+        entrada = {"indice": indice, "nome": nome, "hora": hora, "dia": dia, "zip64": zip64,
+                   "deslocamento": self.posicao, "crc": 0, "tamanho": 0, "comprimido": 0}
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if zip64 else b""
+        tamanhos = _LIMITE_32 if zip64 else 0
+        self._gravar(struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if zip64 else 20, _FLAG_DESCRITOR | _FLAG_UTF8, zlib.DEFLATED,
+            hora, dia, 0, tamanhos, tamanhos, len(nome), len(extra),
+        ) + nome + extra)
+        self.entradas.append(entrada)
+
+    def _finalizar_membro(self, entrada):
+        if entrada["zip64"]:
+            self._gravar(struct.pack("<IIQQ", 0x08074B50, entrada["crc"], entrada["comprimido"], entrada["tamanho"]))
+        else:
+            self._gravar(struct.pack("<IIII", 0x08074B50, entrada["crc"], entrada["comprimido"], entrada["tamanho"]))
+
+    def _fechar(self):
+        inicio_diretorio = self.posicao
+        for entrada in self.entradas:
+            campos, extra = [], b""
+            tamanho, comprimido, deslocamento = entrada["tamanho"], entrada["comprimido"], entrada["deslocamento"]
+            for valor in (tamanho, comprimido):
+                if valor >= _LIMITE_32:
+                    campos.append(valor)
+            if deslocamento >= _LIMITE_32:
+                campos.append(deslocamento)
+            if campos:
+                extra = struct.pack(f"<HH{len(campos)}Q", 0x0001, 8 * len(campos), *campos)
+            versao = 45 if campos or entrada["zip64"] else 20
+            self._gravar(struct.pack(
+                "<IHHHHHHIIIHHHHHII", 0x02014B50, (3 << 8) | versao, versao, _FLAG_DESCRITOR | _FLAG_UTF8, zlib.DEFLATED,
+                entrada["hora"], entrada["dia"], entrada["crc"],
+                min(comprimido, _LIMITE_32), min(tamanho, _LIMITE_32),
+                len(entrada["nome"]), len(extra), 0, 0, 0, 0o100644 << 16, min(deslocamento, _LIMITE_32),
+            ) + entrada["nome"] + extra)
+
+        tamanho_diretorio = self.posicao - inicio_diretorio
+        total = len(self.entradas)
+        if total >= 0xFFFF or inicio_diretorio >= _LIMITE_32 or tamanho_diretorio >= _LIMITE_32:
+            fim_zip64 = self.posicao
+            self._gravar(struct.pack(
+                "<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0, total, total, tamanho_diretorio, inicio_diretorio,
+            ))
+            self._gravar(struct.pack("<IIQI", 0x07064B50, 0, fim_zip64, 1))
+        self._gravar(struct.pack(
+            "<IHHHHIIH", 0x06054B50, 0, 0, min(total, 0xFFFF), min(total, 0xFFFF),
+            min(tamanho_diretorio, _LIMITE_32), min(inicio_diretorio, _LIMITE_32), 0,
+        ))